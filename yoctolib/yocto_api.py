@@ -49,8 +49,8 @@ from __future__ import annotations
 __all__ = (
     'xarray', 'xbytearray', 'xmemoryview', 'xlist', 'xdict', 'xStringIO', 'xBytesIO',
     'ticks_ms', 'ticks_add', 'ticks_diff', 'ticks_past', 'print_exception',
-    'YAPIContext', 'YAPI', 'YRefParam', 'YAPI_Exception', 'YAPI_aio', 'YSyncProxy',
-    'YHub', 'YFunction', 'YModule', 'YFirmwareUpdate', 'YSensor', 'YMeasure',  # noqa
+    'YAPIContext', 'YAPI', 'YRefParam', 'YAPI_Exception', 'YAPI_aio', 'YSyncProxy', 'YSyncBatch',
+    'YHub', 'YFunction', 'YAttrBatch', 'YModule', 'YFirmwareUpdate', 'YSensor', 'YMeasure',  # noqa
     'YDataLogger', 'YDataStream', 'YDataSet', 'YConsolidatedDataSet'  # noqa
 )
 
@@ -65,6 +65,7 @@ if sys.implementation.name != "micropython":
     # In CPython, enable edit-time type checking, including Final declaration
     from typing import Any, Union, Final
     from collections.abc import Callable, Awaitable, Coroutine
+    import threading, weakref
 
     const = lambda obj: obj
     _IS_MICROPYTHON = False
@@ -84,6 +85,7 @@ from .yocto_api_aio import (
     YAPIContext as YAPIContext_aio,
     YAPI as YAPI_aio,
     YFunction as YFunction_aio,
+    YAttrBatch as YAttrBatch_aio,
     YModule as YModule_aio,
     YHub as YHub_aio,
     YFirmwareUpdate as YFirmwareUpdate_aio,
@@ -94,31 +96,107 @@ from .yocto_api_aio import (
     YConsolidatedDataSet as YConsolidatedDataSet_aio,
 )
 
+if _IS_MICROPYTHON:
+    # There are no threads in our MicroPython VM, locks are not needed
+    class _YNoLock:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc_val, exc_tb):
+            return None
+
+
+# Raised by YSyncProxy._run to interrupt a synchronous method captured by a YSyncBatch
+class _YCallCaptured(BaseException):
+    pass
+
+
 # Magic parent class to create a synchronous version of an async object
 #
-# Synchronous methods are created when used for the first time,
-# and cached into the sync proxy object
+# When not explicitly defined, synchronous methods are created when
+# used for the first time, and cached into the sync proxy class
+#
+# In CPython, the async objects are run by an event loop owned by a
+# background thread, so that the synchronous API can be used from any thread.
+# Methods that do not need the event loop run in the calling thread: they only
+# read attributes of the object itself, or the device and function indexes,
+# which are protected by YAPIContext._indexLock. Queued events are detached
+# from the event loop thread using _call(), and their callbacks are invoked
+# in the thread calling HandleEvents/Sleep/UpdateDeviceList, under _dispatchLock
 class YSyncProxy:
     # class attributes:
-    _proxies = dict()  # dictionary of reusable instances
+    if _IS_MICROPYTHON:
+        _proxies = dict()  # dictionary of reusable instances
+    else:
+        # sync instances are only kept as long as they are used
+        _proxies = weakref.WeakValueDictionary()
     _eventloop = None
+    _batches = dict()  # YSyncBatch currently capturing calls, by thread identifier
+    if _IS_MICROPYTHON:
+        _dispatchLock = _YNoLock()
+        _proxyLock = _YNoLock()
+    else:
+        _loopThread: Union[threading.Thread, None] = None  # thread running _eventloop
+        _loopLock = threading.Lock()  # protects the creation of the event loop thread
+        _dispatchLock = threading.RLock()  # serializes the dispatch of events and callbacks
+        _proxyLock = threading.Lock()  # ensures that a single proxy is created per async object
 
     # the only attribute is a reference to the async object
     _aio: any
 
     @staticmethod
     def _run(coroutine: Coroutine):
-        eventloop = YSyncProxy._eventloop
-        if not eventloop:
-            if _IS_MICROPYTHON:
+        if YSyncProxy._batches:
+            batch: Union[YSyncBatch, None] = YSyncProxy._batches.get(YSyncProxy._threadId())
+            if batch is not None:
+                batch._capture(coroutine)
+        if _IS_MICROPYTHON:
+            eventloop = YSyncProxy._eventloop
+            if not eventloop:
                 eventloop = asyncio.get_event_loop()
-            else:
-                try:
-                    eventloop = asyncio.get_running_loop()
-                except RuntimeError:
+                YSyncProxy._eventloop = eventloop
+            return eventloop.run_until_complete(coroutine)
+        eventloop = YSyncProxy._eventloop or YSyncProxy._startEventLoop()
+        if threading.current_thread() is YSyncProxy._loopThread:
+            coroutine.close()
+            raise RuntimeError("The synchronous API cannot be used from async code, use the async API instead")
+        future = asyncio.run_coroutine_threadsafe(coroutine, eventloop)
+        try:
+            return future.result()
+        except BaseException:
+            # make sure the coroutine does not keep running when the caller is interrupted
+            future.cancel()
+            raise
+
+    @staticmethod
+    def _call(fun: Callable, *args):
+        # Invoke a plain (non-async) function of the async layer, from the thread running the event loop
+        if _IS_MICROPYTHON or threading.current_thread() is YSyncProxy._loopThread:
+            return fun(*args)
+        eventloop = YSyncProxy._eventloop or YSyncProxy._startEventLoop()
+        return asyncio.run_coroutine_threadsafe(YSyncProxy._invoke(fun, args), eventloop).result()
+
+    @staticmethod
+    async def _invoke(fun: Callable, args: tuple):
+        return fun(*args)
+
+    @staticmethod
+    def _threadId() -> int:
+        if _IS_MICROPYTHON:
+            return 0
+        return threading.get_ident()
+
+    if not _IS_MICROPYTHON:
+        @staticmethod
+        def _startEventLoop():
+            with YSyncProxy._loopLock:
+                if not YSyncProxy._eventloop:
                     eventloop = asyncio.new_event_loop()
-            YSyncProxy._eventloop = eventloop
-        return eventloop.run_until_complete(coroutine)
+                    thread = threading.Thread(target=eventloop.run_forever, name='YAPI-eventloop', daemon=True)
+                    thread.start()
+                    YSyncProxy._loopThread = thread
+                    YSyncProxy._eventloop = eventloop
+            return YSyncProxy._eventloop
 
     @staticmethod
     def _proxy(subclass, aio_obj):
@@ -128,8 +206,13 @@ class YSyncProxy:
             return None
         sync_obj = YSyncProxy._proxies.get(aio_obj)
         if sync_obj is None:
-            sync_obj = subclass(aio_obj)
-            YSyncProxy._proxies[aio_obj] = sync_obj
+            # WeakValueDictionary.setdefault() is not atomic, so look up again under the lock,
+            # in case another thread has created the same proxy in between
+            with YSyncProxy._proxyLock:
+                sync_obj = YSyncProxy._proxies.get(aio_obj)
+                if sync_obj is None:
+                    sync_obj = subclass(aio_obj)
+                    YSyncProxy._proxies[aio_obj] = sync_obj
         return sync_obj
 
     @staticmethod
@@ -148,30 +231,133 @@ class YSyncProxy:
 
     if _DYNAMIC_HELPERS:
         def __getattr__(self, attr: str):
+            if attr == '_aio':
+                raise AttributeError(attr)
             aio_method = getattr(self._aio, attr)
-            sync_fun = lambda *args: self._run(aio_method(*args))
-            setattr(self, attr, sync_fun)
-            return sync_fun
+            # define the method once for all instances of the class, to save on RAM
+            setattr(type(self), attr, lambda obj, *args: obj._run(getattr(obj._aio, attr)(*args)))
+            return lambda *args: self._run(aio_method(*args))
 
 
-#### Another way to save on RAM by defining methods "on demand":
-#
-#    def __getattr__(self, attr: str):
-#        func = None
-#        if attr == "inc":
-#            def inc(self):
-#                self.x += 1
-#            func = inc
-#        elif attr == "dec":
-#            def dec(self):
-#                self.x -= 1
-#            func = dec
-#        if func:
-#            setattr(type(self), attr, func)
-#            return lambda *args: func(self, *args)
-#        raise AttributeError(attr)
-#
-####
+# Group of synchronous calls, run concurrently on the event loop
+# noinspection PyProtectedMember
+class YSyncBatch:
+    """
+    Group of synchronous API calls, executed concurrently as a single asynchronous
+    operation. Calls to different devices are run in parallel, and calls to the same
+    device are sent back-to-back, each one as soon as the hub has answered the previous
+    one, whatever the protocol used. Use YAPI.batch() to create a batch, add calls to it
+    using call(), then execute all calls at once using run(), or use the batch
+    with a with statement to execute the calls at the end of the block.
+
+    Only methods that simply return the result of the asynchronous library can be
+    batched: get_xxx, set_xxx, load and isXxx methods, except those returning other
+    objects of the library, such as get_module(). The results are the values
+    returned by the asynchronous methods.
+    """
+    # methods returning the result of their asynchronous counterpart as is
+    _BATCHABLE_PREFIXES = ('get_', 'set_', 'load', 'is')
+    # methods with a batchable prefix, but converting the result into objects of the synchronous API
+    _NOT_BATCHABLE = ('get_module', 'get_dataLogger', 'get_recordedData', 'get_display',
+                      'get_displayLayer', 'get_messages', 'get_results')
+    _calls: list  # pending coroutines (or immediate results for non-async methods)
+    _results: list
+
+    def __init__(self):
+        self._calls = []
+        self._results = []
+
+    def __enter__(self) -> YSyncBatch:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None:
+            self.run()
+        else:
+            self.discard()
+
+    def _capture(self, coroutine: Coroutine) -> None:
+        self._calls.append(coroutine)
+        raise _YCallCaptured()
+
+    def call(self, method: Callable, *args) -> int:
+        """
+        Adds a call to the batch, without executing it. For instance,
+        batch.call(sensor.get_currentValue) or batch.call(relay.set_state, 1).
+
+        @param method : a method of an object of the synchronous API
+        @param args : the arguments to pass to the method
+
+        @return the index of the call result in the list returned by run()
+        """
+        name: str = getattr(method, '__name__', '<lambda>')
+        if _DYNAMIC_HELPERS and name == '<lambda>':
+            # methods created by __getattr__ return the result of the asynchronous method as is
+            pass
+        elif not name.startswith(YSyncBatch._BATCHABLE_PREFIXES) or name in YSyncBatch._NOT_BATCHABLE:
+            raise YAPI_Exception(YAPI.INVALID_ARGUMENT, "%s() cannot be added to a batch" % name)
+        threadId: int = YSyncProxy._threadId()
+        idx: int = len(self._calls)
+        YSyncProxy._batches[threadId] = self
+        try:
+            res = method(*args)
+            # method did not need the event loop, keep the result as is
+            self._calls.append(res)
+        except _YCallCaptured:
+            pass
+        finally:
+            del YSyncProxy._batches[threadId]
+        return idx
+
+    def discard(self) -> None:
+        """
+        Drops all calls added to the batch, without executing them.
+        """
+        for coroutine in self._calls:
+            if asyncio.iscoroutine(coroutine):
+                coroutine.close()
+        self._calls = []
+
+    def run(self) -> list:
+        """
+        Executes concurrently all calls added to the batch, and waits until they are
+        all completed. If some calls failed, the first exception is raised once all
+        calls are completed.
+
+        @return the list of the call results, in the order of the calls
+        """
+        calls: list = self._calls
+        self._calls = []
+        self._results = YSyncProxy._run(YSyncBatch._gather(calls))
+        for res in self._results:
+            if isinstance(res, BaseException):
+                raise res
+        return self._results
+
+    @staticmethod
+    async def _gather(calls: list) -> list:
+        results: list = await asyncio.gather(*[call for call in calls if asyncio.iscoroutine(call)],
+                                             return_exceptions=True)
+        # merge back immediate results
+        res: list = []
+        pos: int = 0
+        for call in calls:
+            if asyncio.iscoroutine(call):
+                res.append(results[pos])
+                pos += 1
+            else:
+                res.append(call)
+        return res
+
+    def get_results(self) -> list:
+        """
+        Returns the results of the calls executed by the last invocation of run(),
+        including the exceptions raised by the calls that failed.
+
+        @return the list of the call results, in the order of the calls
+        """
+        return self._results
+
 
 #################################################################################
 #                                                                               #
@@ -376,6 +562,120 @@ class YAPIContext(YSyncProxy):
 
     # --- (end of generated code: YAPIContext implementation)
 
+    if not _IS_MICROPYTHON:
+        def RegisterTraceCallback(self, traceCallback: YTraceCallback) -> None:
+            """
+            Registers a callback function, to be called at each step of the library internals:
+            "request.start", "request.queue" (the request has left the device queue),
+            "request.send", "request.firstByte" and "request.complete" for device requests,
+            "notification.receive" and "notification.dispatch" for notifications,
+            "hub.connect" and "hub.reconnect" for hub connections, and "datalogger.load"
+            for datalogger stream downloads. Registering a callback also enables metrics.
+            The callback is invoked from the background thread of the library, and must return quickly.
+
+            @param traceCallback : a procedure taking an event name and a dictionary of attributes,
+                    or None to unregister a previously registered callback.
+            """
+            return self._aio.RegisterTraceCallback(traceCallback)
+
+    if not _IS_MICROPYTHON:
+        def EnableMetrics(self, enabled: bool) -> None:
+            """
+            Enables or disables the collection of counters and timings of the library internals,
+            such as the time spent by requests in the device queue and on the hub side.
+            Metrics are disabled by default.
+
+            @param enabled : True to collect metrics, False to stop collecting them.
+            """
+            return self._aio.EnableMetrics(enabled)
+
+    if not _IS_MICROPYTHON:
+        def GetMetrics(self) -> dict[str, Any]:
+            """
+            Returns a snapshot of the metrics collected since they have been enabled or reset.
+            The snapshot is a dictionary with the snapshot time ("time", in nanoseconds since
+            the epoch), the "counters" and the "timings". Each timing is given as a dictionary
+            with the number of occurrences ("count"), the total and the maximum duration
+            in milliseconds ("sum" and "max").
+
+            @return a dictionary, empty if metrics are not enabled.
+            """
+            return self._aio.GetMetrics()
+
+    if not _IS_MICROPYTHON:
+        def ResetMetrics(self) -> None:
+            """
+            Resets all counters and timings to zero.
+            """
+            return self._aio.ResetMetrics()
+
+    def SetLiveCacheValidity(self, liveCacheValidityMs: int) -> None:
+        """
+        Enables live device caches, kept up-to-date by hub notifications.
+        By default, the attributes of a device are reloaded from the device
+        whenever the standard cache validity has expired (see SetCacheValidity).
+        In live mode, the library keeps the attributes of each device in cache,
+        updates advertised values as soon as they are notified by the hub, and
+        reloads all attributes only when a configuration change is notified,
+        after a reconnection to the hub, or when the cache is older than the
+        specified duration. Other attributes that change without configuration
+        change, such as the current value of sensors or device uptime, are
+        therefore only refreshed at that pace.
+        Note: This function must be called after yInitAPI.
+
+        @param liveCacheValidityMs : the maximal age of live device caches,
+                in milliseconds, or 0 to disable live caches.
+        @noreturn
+        """
+        return self._aio.SetLiveCacheValidity(liveCacheValidityMs)
+
+    def GetLiveCacheValidity(self) -> int:
+        """
+        Returns the maximal age of live device caches, as set by SetLiveCacheValidity.
+
+        @return the maximal age of live device caches in milliseconds, or 0 if live caches are disabled.
+        """
+        return self._aio.GetLiveCacheValidity()
+
+    if not _IS_MICROPYTHON:
+        def SetDataLoggerMirror(self, mirrorPath: str) -> str:
+            """
+            Enables a local mirror of the data loggers, stored in an SQLite database file.
+            Once enabled, every closed data stream downloaded from a data logger is saved
+            in the mirror, and is never downloaded again by later calls to loadMore()
+            on a YDataSet. Only the stream list and streams still being recorded
+            are retrieved from the device, which makes periodic synchronizations
+            of a data logger very fast. Passing an empty string disables the mirror.
+
+            @param mirrorPath : the path of the SQLite database file used to store the mirror.
+                    The file is created if it does not exist.
+
+            @return an empty string if the mirror has been set up correctly.
+                    In case of error, returns a string starting with "error:".
+            """
+            return self._aio.SetDataLoggerMirror(mirrorPath)
+
+    def SetHttpPoolSize(self, poolSize: int) -> None:
+        """
+        Modifies the maximal number of keep-alive connections used in parallel
+        to send device requests to a hub in HTTP mode. By default, up to 3
+        connections are used per hub. The value applies to hubs registered
+        afterward, and can be changed for each hub using YHub.set_httpPoolSize().
+
+        @param poolSize : the maximal number of connections per hub (at least 1).
+        @noreturn
+        """
+        return self._aio.SetHttpPoolSize(poolSize)
+
+    def GetHttpPoolSize(self) -> int:
+        """
+        Returns the maximal number of keep-alive connections used in parallel
+        to send device requests to a hub in HTTP mode.
+
+        @return the maximal number of connections per hub.
+        """
+        return self._aio.GetHttpPoolSize()
+
     def DisableExceptions(self) -> None:
         """
         Disables the use of exceptions to report runtime errors.
@@ -484,11 +784,16 @@ class YAPIContext(YSyncProxy):
             function that will establish the connection as soon as it is available.
 
 
-            <b>callback</b>: that keyword make the API run in "<i>HTTP Callback</i>" mode.
-            This a special mode allowing to take control of Yoctopuce devices
-            through a NAT filter when using a VirtualHub or a networked YoctoHub. You only
-            need to configure your hub to call your server script on a regular basis.
-            This mode is currently available for PHP and Node.JS only.
+            <b>callback</b>, <b>ws://callback</b> or <b>http://callback</b>: that keyword make the API run
+            in "<i>Callback</i>" mode. This a special mode allowing to take control of Yoctopuce devices
+            through a NAT filter when using a VirtualHub or a networked YoctoHub. The API
+            listens for incoming connections (on port 4444 by default, or on the port given
+            in the URL, as in ws://user:pass@callback:8080/path). Hubs configured for
+            WebSocket callbacks are then used as any other registered hub. Hubs configured
+            for Yocto-API HTTP callbacks (in JSON format) only show up until their callback
+            has been answered: values are read from the callback content, and changes are
+            sent back to the hub in the answer. Credentials given in the URL are then expected
+            as HTTP basic authentication.
 
             Be aware that only one application can use direct USB access at a
             given time on a machine. Multiple access would cause conflicts
@@ -597,21 +902,31 @@ class YAPIContext(YSyncProxy):
         # Note: this function cannot simply delegate globally to the async object,
         #       as callbacks could cause reentrant calls to the async scheduler
         res: int = self._run(self._aio._updateDeviceList_internal(False, errmsg))
-        if res != YAPI.SUCCESS:
-            return res
-        # after processing all hubs, invoke pending callbacks if required
-        nbEvents = len(self._aio._pendingCallbacks)
-        for i in range(nbEvents):
-            evt: YPlugEv = self._aio._pendingCallbacks[i]
-            try:
-                retval: Union[Coroutine, None] = self._aio._handlePlugEvent(evt)
-                if asyncio.iscoroutine(retval):
-                    self._run(retval)
-            # noinspection PyBroadException
-            except Exception as exc:
-                self._aio._logCbError(evt.eventType, self, exc)
-        del self._aio._pendingCallbacks[0:nbEvents]
-        return YAPI.SUCCESS
+        # after processing all hubs, invoke pending callbacks if required,
+        # including for hubs that did answer when another one failed
+        with self._dispatchLock:
+            # events are queued by the event loop thread: detach them from there
+            for evt in self._call(self._aio._takePendingCallbacks):
+                try:
+                    retval: Union[Coroutine, None] = self._aio._handlePlugEvent(evt)
+                    if asyncio.iscoroutine(retval):
+                        self._run(retval)
+                # noinspection PyBroadException
+                except Exception as exc:
+                    self._aio._logCbError(evt.eventType, self, exc)
+        return res
+
+    def GetHubUpdateStatus(self) -> list[tuple[str, int, str]]:
+        """
+        Returns the outcome of the last device list refresh for each registered hub,
+        as performed by UpdateDeviceList(). Each entry includes the URL used
+        to register the hub, an error code (YAPI.SUCCESS if the hub answered
+        successfully, YAPI.TIMEOUT if it did not answer within its network timeout)
+        and the corresponding error message.
+
+        @return a list of tuples (registered URL, error code, error message).
+        """
+        return self._aio.GetHubUpdateStatus()
 
     def HandleEvents(self, errmsg: Union[YRefParam, None] = None) -> int:
         """
@@ -635,18 +950,20 @@ class YAPIContext(YSyncProxy):
         #       as callbacks could cause reentrant calls to the async scheduler
         try:
             self._run(self._aio._updateDeviceList_internal(False, errmsg))
-            evb: Union[bytearray, None] = self._aio._nextDataEvent()
-            # Handle ALL pending events
-            while evb:
-                recipient = None
-                try:
-                    recipient, retval = self._aio._handleEvent(evb)
-                    if asyncio.iscoroutine(retval):
-                        self._run(retval)
-                # noinspection PyBroadException
-                except Exception as exc:
-                    self._aio._logCbError(evb[0], recipient, exc)
-                evb = self._aio._nextDataEvent()
+            with self._dispatchLock:
+                # events are pushed by the event loop thread: pop them from there
+                evb: Union[bytearray, None] = self._call(self._aio._nextDataEvent)
+                # Handle ALL pending events
+                while evb:
+                    recipient = None
+                    try:
+                        recipient, retval = self._aio._handleEvent(evb)
+                        if asyncio.iscoroutine(retval):
+                            self._run(retval)
+                    # noinspection PyBroadException
+                    except Exception as exc:
+                        self._aio._logCbError(evb[0], recipient, exc)
+                    evb = self._call(self._aio._nextDataEvent)
         except YAPI_Exception as e:
             errmsg.value = e.errorMessage
             return e.errorType
@@ -675,7 +992,7 @@ class YAPIContext(YSyncProxy):
         # Note: this function cannot simply delegate globally to the async object,
         #       as callbacks could cause reentrant calls to the async scheduler
         try:
-            evb: Union[bytearray, None] = self._aio._nextDataEvent()
+            evb: Union[bytearray, None] = self._call(self._aio._nextDataEvent)
             endTicks: int = ticks_add(ticks_ms(), ms_duration)
             remaining: int = 1
             # Handle as many pending events as possible in given time (at least one)
@@ -684,30 +1001,42 @@ class YAPIContext(YSyncProxy):
                     # handle one event
                     self._run(self._aio._updateDeviceList_internal(False, errmsg))
                     recipient = None
-                    try:
-                        recipient, retval = self._aio._handleEvent(evb)
-                        if asyncio.iscoroutine(retval):
-                            self._run(retval)
-                    # noinspection PyBroadException
-                    except Exception as exc:
-                        self._aio._logCbError(evb[0], recipient, exc)
+                    with self._dispatchLock:
+                        try:
+                            recipient, retval = self._aio._handleEvent(evb)
+                            if asyncio.iscoroutine(retval):
+                                self._run(retval)
+                        # noinspection PyBroadException
+                        except Exception as exc:
+                            self._aio._logCbError(evb[0], recipient, exc)
                 remaining = ticks_diff(endTicks, ticks_ms())
                 if remaining <= 0:
                     # time expired during event processing
                     return YAPI.SUCCESS
                 # get next event
-                evb = self._aio._nextDataEvent()
+                evb = self._call(self._aio._nextDataEvent)
                 if not evb:
-                    if _IS_MICROPYTHON:
-                        self._run(asyncio.sleep_ms(min(remaining, 10)))  # noqa
-                    else:
-                        self._run(asyncio.sleep(min(remaining, 10) / 1000.0))
+                    self._run(self._aio._waitDataEvent(remaining))
                     remaining = ticks_diff(endTicks, ticks_ms())
         except YAPI_Exception as e:
             errmsg.value = e.errorMessage
             return e.errorType
         return YAPI.SUCCESS
 
+    def batch(self) -> YSyncBatch:
+        """
+        Creates a group of synchronous API calls, to be executed concurrently as a
+        single asynchronous operation, for instance:
+
+            with YAPI.batch() as batch:
+                for sensor in sensors:
+                    batch.call(sensor.get_currentValue)
+            values = batch.get_results()
+
+        @return a YSyncBatch object
+        """
+        return YSyncBatch()
+
     @staticmethod
     def GetTickCount() -> int:
         """
@@ -994,6 +1323,28 @@ class YHub(YSyncProxy):
 
     # --- (end of generated code: YHub implementation)
 
+    def set_httpPoolSize(self, poolSize: int) -> None:
+        """
+        Modifies the maximal number of keep-alive connections used in parallel
+        to send device requests to this hub in HTTP mode.
+        The default value is inherited from YAPI.SetHttpPoolSize
+        at the time when the hub is registered. Connections beyond the new
+        limit are not closed, but are not used anymore for new requests.
+
+        @param poolSize : the maximal number of connections (at least 1).
+        @noreturn
+        """
+        return self._aio.set_httpPoolSize(poolSize)
+
+    def get_httpPoolSize(self) -> int:
+        """
+        Returns the maximal number of keep-alive connections used in parallel
+        to send device requests to this hub in HTTP mode.
+
+        @return the maximal number of connections.
+        """
+        return self._aio.get_httpPoolSize()
+
 
 #################################################################################
 #                                                                               #
@@ -1095,6 +1446,18 @@ class YFunction(YSyncProxy):
     def __str__(self):
         return self._aio.__str__()
 
+    def batch(self) -> YAttrBatch:
+        """
+        Returns a transaction object to be used with a with statement, that collects all
+        attribute changes made by the current thread on the module hosting this function,
+        and on any of its functions, and sends them to the device at the end of the block. Attribute
+        changes are coalesced and sent back-to-back, and the result of each change is
+        available from the transaction object once the block is completed.
+
+        @return an YAttrBatch object
+        """
+        return YAttrBatch(self._aio.batch())
+
     # --- (generated code: YFunction implementation)
 
     @classmethod
@@ -1413,6 +1776,97 @@ class YFunction(YSyncProxy):
         return self._run(self._aio._download(pathname))
 
 
+# noinspection PyProtectedMember
+class YAttrBatch(YSyncProxy):
+    """
+    Transaction collecting attribute changes on the functions of a module, to be used
+    with a with statement. While the batch is open, all attribute changes made on the
+    module or on any of its functions (set_xxx methods) are recorded instead of being
+    sent to the device, and successive changes of the same attribute are coalesced.
+    When the block exits normally, the changes are sent back-to-back to the device, in
+    the order of their first change, and a result is recorded for each attribute. If
+    the block exits with an exception, the changes are discarded.
+
+    Only the changes made by the thread that opened the batch are recorded, changes
+    made by other threads are sent to the device immediately.
+    """
+    _aio: YAttrBatch_aio
+
+    def __enter__(self) -> YAttrBatch:
+        self._run(self._aio.__aenter__())
+        # the batch must be visible to the calls made from this thread
+        self._aio._bind()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._aio._unbind()
+        self._run(self._aio.__aexit__(exc_type, exc_val, exc_tb))
+
+    def setAttr(self, functionId: str, attrName: str, value: str) -> None:
+        """
+        Records the change of an attribute of a function of the module, identified
+        by its function identifier, without the need for a function object.
+
+        @param functionId : the hardware function identifier (for instance "relay1"),
+                or "module" for the module itself
+        @param attrName : the name of the attribute to change
+        @param value : the new value of the attribute, as a string
+        """
+        self._aio.setAttr(functionId, attrName, value)
+
+    def get_pendingCount(self) -> int:
+        """
+        Returns the number of attribute changes waiting to be sent to the device.
+
+        @return an integer corresponding to the number of pending changes
+        """
+        return self._aio.get_pendingCount()
+
+    def discard(self) -> None:
+        """
+        Drops all pending attribute changes, without sending them to the device.
+        """
+        self._aio.discard()
+
+    def get_results(self) -> dict[str, int]:
+        """
+        Returns the result of each attribute change sent to the device so far.
+
+        @return a dictionary of results (YAPI.SUCCESS or a negative error code),
+                indexed by "functionId.attrName"
+        """
+        return self._aio.get_results()
+
+    if not _DYNAMIC_HELPERS:
+        def getAttr(self, functionId: str, attrName: str) -> str:
+            """
+            Returns the value of an attribute of a function of the module, as the device
+            will have it once the batch is committed: the pending value if the attribute
+            has been changed in the batch, or the current device value otherwise. The
+            attributes of all functions are read using a single request to the device.
+
+            @param functionId : the hardware function identifier (for instance "relay1"),
+                    or "module" for the module itself
+            @param attrName : the name of the attribute
+
+            @return a string with the value of the attribute
+
+            On failure, throws an exception or returns an empty string.
+            """
+            return self._run(self._aio.getAttr(functionId, attrName))
+
+        def commit(self) -> dict[str, int]:
+            """
+            Sends all pending attribute changes to the device, and records the result
+            of each change. This method is invoked automatically at the end of the with
+            block, but can also be invoked explicitly to apply the changes made so far.
+
+            @return a dictionary of results (YAPI.SUCCESS or a negative error code),
+                    indexed by "functionId.attrName", for all changes sent so far
+            """
+            return self._run(self._aio.commit())
+
+
 #################################################################################
 #                                                                               #
 #                      YModule, YFirmwareUpdate                                 #
@@ -1429,6 +1883,7 @@ if not _IS_MICROPYTHON:
         YDeviceUpdateCallback = Union[Callable[["YModule"], Awaitable[None]], None]
         YDeviceLogCallback = Union[Callable[["YModule", str], Awaitable[None]], None]
         YModuleBeaconCallback = Union[Callable[["YModule", int], Awaitable[None]], None]
+        YTraceCallback = Union[Callable[[str, dict], Any], None]
     except TypeError:
         YProgressCallback = Union[Callable, None]
         YCalibrationCallback = Union[Callable, None]
@@ -1437,6 +1892,7 @@ if not _IS_MICROPYTHON:
         YDeviceUpdateCallback = Union[Callable, None]
         YDeviceLogCallback = Union[Callable, None]
         YModuleBeaconCallback = Union[Callable, None]
+        YTraceCallback = Union[Callable, None]
     YModuleLogCallback = YDeviceLogCallback
     YModuleConfigChangeCallback = YDeviceUpdateCallback
 
@@ -2278,6 +2734,28 @@ class YConsolidatedDataSet(YSyncProxy):
 
     # --- (end of generated code: YConsolidatedDataSet implementation)
 
+    if not _DYNAMIC_HELPERS:
+        def nextRecords(self, records: list[list[float]], maxRecords: int = 1000) -> int:
+            """
+            Extracts a block of consecutive data records from the data logger of all
+            sensors linked to this object. Each record has the same format as
+            the records returned by nextRecord(). Datasets from different sensors
+            are loaded concurrently when needed.
+
+            @param records : list that will be filled by the function with up to maxRecords
+                    records, each one being a list of floating point numbers with the timestamp
+                    of the measure in first position, followed by the measured values.
+            @param maxRecords : the maximal number of records to extract (default 1000).
+
+            @return an integer in the range 0 to 100 (percentage of completion),
+                    or a negative error code in case of failure. When 100 is returned,
+                    all records have been extracted, but the last block may still
+                    contain some records.
+
+            On failure, throws an exception or returns a negative error code.
+            """
+            return self._run(self._aio.nextRecords(records, maxRecords))
+
 
 #################################################################################
 #                                                                               #
@@ -3257,6 +3735,51 @@ class YDataSet(YSyncProxy):
 
     # --- (end of generated code: YDataSet implementation)
 
+    if not _IS_MICROPYTHON:
+        def set_prefetchDepth(self, depth: int) -> int:
+            """
+            Enables the download of data streams ahead of loadMore() calls. Up to depth
+            downloads are started in the background, and decoded as soon as they are received,
+            so that network round-trip time overlaps with the processing of previous streams.
+            When the device supports bulk loading, each download covers several streams.
+            Requests to a given device are still sent one at a time, in order.
+            Prefetching is disabled by default.
+
+            @param depth : the maximal number of downloads started in advance, or 0 to disable prefetching.
+
+            @return YAPI.SUCCESS when the call succeeds.
+            """
+            return self._aio.set_prefetchDepth(depth)
+
+        def set_columnarMode(self, enabled: bool) -> int:
+            """
+            Selects how loadMore() stores the measures of this YDataSet. In columnar mode,
+            measures are not stored as YMeasure objects anymore, but appended to arrays of
+            doubles available through get_measuresArray(). This is much faster and uses
+            far less memory for large amounts of measures. Must be called before the first
+            call to loadMore().
+
+            @param enabled : True to store measures in columns, False for YMeasure objects.
+
+            @return YAPI.SUCCESS when the call succeeds.
+            """
+            return self._aio.set_columnarMode(enabled)
+
+        def get_measuresArray(self) -> list:
+            """
+            Returns all measured values currently available for this DataSet in columnar
+            mode, as five arrays of doubles of the same length: start time of the measure
+            interval, end time of the measure interval (both in seconds since Jan 1, 1970),
+            minimal value, average value and maximal value observed during the interval.
+            The arrays can be wrapped without copy into NumPy arrays using numpy.frombuffer().
+
+            Before calling this method, you should enable columnar mode using
+            set_columnarMode() and call loadMore() until all rows are loaded.
+
+            @return a list of five array('d') objects, which are empty if columnar mode is disabled.
+            """
+            return self._aio.get_measuresArray()
+
 
 # --- (generated code: YDataLogger class start)
 if not _IS_MICROPYTHON:
@@ -3570,4 +4093,3 @@ class YDataLogger(YFunction):
             return self._run(self._aio.forgetAllDataStreams())
 
     # --- (end of generated code: YDataLogger implementation)
-
@@ -49,7 +49,7 @@ __all__ = (
     'xarray', 'xbytearray', 'xmemoryview', 'xlist', 'xdict', 'xStringIO', 'xBytesIO',
     'ticks_ms', 'ticks_add', 'ticks_diff', 'ticks_past', 'print_exception',
     'YAPIContext', 'YAPI', 'YRefParam', 'YAPI_Exception', 'HwId', 'hwid2str',
-    'YHub', 'YFunction', 'YModule', 'YFirmwareUpdate', 'YSensor', 'YMeasure',  # noqa
+    'YHub', 'YFunction', 'YAttrBatch', 'YModule', 'YFirmwareUpdate', 'YSensor', 'YMeasure',  # noqa
     'YDataLogger', 'YDataStream', 'YDataSet', 'YConsolidatedDataSet'  # noqa
 )
 
@@ -58,14 +58,18 @@ __all__ = (
 # - micropython (for inclusion in VirtualHub/YoctoHub)
 
 # Load common libraries
-import atexit, sys, time, math, json, re, random, binascii, asyncio, hashlib
+import atexit, sys, time, math, json, re, random, binascii, asyncio, hashlib, heapq
 
 # On MicroPython, code below will be optimized at compile time
 if sys.implementation.name != "micropython":
     # In CPython, enable edit-time type checking, including Final declaration
     from typing import Any, Union, Type, TypeVar, Final, NamedTuple
-    from collections import OrderedDict
+    from collections import OrderedDict, deque
     from collections.abc import Callable, Awaitable, Coroutine
+    import array  # used for columnar datalogger data
+    import threading  # device indexes can be read from the threads using the synchronous API
+    import concurrent.futures  # used to access the datalogger mirror outside of the event loop
+    import contextvars  # used to scope attribute batches to the task that opened them
     import ssl  # used to import CERT_* constants
     from ssl import SSLContext, SSLCertVerificationError as CertError
 
@@ -229,9 +233,10 @@ else:
 
     # Equivalents our micropython xarray objects, stored in external RAM
     #
-    # This code is not optimized for efficiency in CPython, which
-    # runs very fast anyway, but to replicate MicroPython behaviour
-    # in order to facilitate debugging
+    # This code replicates MicroPython behaviour in order to facilitate
+    # debugging, but maps directly to native CPython objects wherever the
+    # semantics are the same (views are created without going through the
+    # generic constructors, read-only attributes are plain properties)
 
     _BYTEARRAY_TYPECODE = '\001'
     _TRACK_XARRAY_LEAKS = False
@@ -289,34 +294,34 @@ else:
     # noinspection PyProtectedMember
     class xarray(metaclass=xarrayMetaClass):
         _obj: Union[array.array, bytearray, memoryview]
-        _classname: str
+        _classname: str = 'xarray'
         _typecode: str
         _itemsize: int
+        _jsonTree: Union[tuple, None] = None  # (content, parse tree) cached by YFunction._json_load
 
         # noinspection PyUnusedLocal
         def __init__(self, typecode: str, initializer=None, alloc=None):
-            if initializer is None:
-                initializer = []
-            elif isinstance(initializer, int):
-                initializer = [0] * initializer
+            obj: array.array
+            if isinstance(initializer, int):
+                obj = array.array(typecode)
+                obj.frombytes(bytes(initializer * obj.itemsize))
+            elif initializer is None:
+                obj = array.array(typecode)
             elif isinstance(initializer, xarray):
-                initializer = initializer._obj
-            self._classname = 'xarray'
-            self._obj = array.array(typecode, initializer)
-            self._typecode = self._obj.typecode
-            self._itemsize = self._obj.itemsize
-
-        def __getattr__(self, attr: str) -> Union[int, str]:
-            if attr == 'typecode':
-                return self._typecode
-            elif attr == 'itemsize':
-                return self._itemsize
-            raise AttributeError('there is no attribute ' + attr + ' in xarray objects')
-
-        def __setattr__(self, attr: str, value):
-            if attr == 'typecode' or attr == 'itemsize':
-                raise AttributeError('attribute ' + attr + ' is read-only')
-            super().__setattr__(attr, value)
+                obj = array.array(typecode, initializer._obj)
+            else:
+                obj = array.array(typecode, initializer)
+            self._obj = obj
+            self._typecode = obj.typecode
+            self._itemsize = obj.itemsize
+
+        @property
+        def typecode(self) -> str:
+            return self._typecode
+
+        @property
+        def itemsize(self) -> int:
+            return self._itemsize
 
         def __str__(self) -> str:
             plen: int = 64 // self._itemsize
@@ -350,11 +355,17 @@ else:
                 return False
             return res
 
+        # Create a view without going through xmemoryview constructor
+        def _view(self, obj: memoryview) -> xmemoryview:
+            res: xmemoryview = object.__new__(xmemoryview)
+            res._obj = obj
+            res._typecode = self._typecode
+            res._itemsize = self._itemsize
+            return res
+
         def __getitem__(self, key: Union[int, slice]):
             if isinstance(key, slice):
-                res = xmemoryview(self)
-                res._obj = memoryview(res._obj)[key]
-                return res
+                return self._view(memoryview(self._obj)[key])
             else:
                 return self._obj[key]
 
@@ -421,17 +432,20 @@ else:
             needle: bytearray
             barr: bytearray
             typeOK: bool = True
-            if isinstance(needle, int) or isinstance(needle, float):
+            if isinstance(needle, (bytes, bytearray)):
+                pass
+            elif isinstance(needle, int) or isinstance(needle, float):
                 if self._typecode == _BYTEARRAY_TYPECODE and isinstance(needle, int):
                     needle = bytearray([needle])
                 else:
                     needle = bytearray(array.array(self._typecode, [needle]))
-            try:
-                memoryview(needle)
-            except TypeError:
-                typeOK = False
-            if not typeOK:
-                raise TypeError("can't convert '%s' object to bytes implicitly" % type(needle).__name__)
+            else:
+                try:
+                    memoryview(needle)
+                except TypeError:
+                    typeOK = False
+                if not typeOK:
+                    raise TypeError("can't convert '%s' object to bytes implicitly" % type(needle).__name__)
             if isinstance(self._obj, bytearray):
                 barr = self._obj
             else:
@@ -482,7 +496,7 @@ else:
                 stop = len(barr.rstrip(*args))
             if start > stop:
                 start = stop = 0
-            return self[start:stop]
+            return self._view(memoryview(self._obj)[start:stop])
 
         def strip(self, *args) -> xmemoryview:
             return self._strip_ex(0, *args)
@@ -502,11 +516,12 @@ else:
             parts: list[bytearray] = barr.split(*args)
             # build xmemoryview corresponding to the splits
             res: list[xmemoryview] = []
+            view: memoryview = memoryview(self._obj)
             pos: int = 0
             for sub in parts:
                 start: int = barr.find(sub, pos)
                 stop: int = start + len(sub)
-                res.append(self[start:stop])
+                res.append(self._view(view[start:stop]))
                 pos = stop
             return res
 
@@ -516,7 +531,7 @@ else:
             if end - start < len(prefix):
                 return False
             end = start + len(prefix)
-            return self[start:end] == prefix
+            return memoryview(self._obj)[start:end] == (prefix._obj if isinstance(prefix, xarray) else prefix)
 
         def endswith(self, suffix: ByteArrayLike, start: int = 0, end: Union[int, None] = None) -> bool:
             if end is None:
@@ -524,7 +539,7 @@ else:
             if end - start < len(suffix):
                 return False
             start = end - len(suffix)
-            return self[start:end] == suffix
+            return memoryview(self._obj)[start:end] == (suffix._obj if isinstance(suffix, xarray) else suffix)
 
         def tobytes(self) -> bytes:
             return memoryview(self._obj).tobytes()
@@ -559,6 +574,9 @@ else:
             return jsonRoot
 
 
+    _HWID_PATTERN = re.compile('^[A-Z][A-Z0-9]{7}-(([XT][0-2][0-9](:[0-5][0-9]){2})|([0-9A-Fa-f]{4,12}))\\.[a-z][0-9A-Za-z]*$')
+
+
     class xjson:
         _root: xjson
         _obj: Union[list, dict]
@@ -573,15 +591,9 @@ else:
                 self._age = 1
             self._obj = content
 
-        def __getattr__(self, attr: str) -> Union[int, str]:
-            if attr == 'memsize':
-                return self._memsize(self._obj)
-            raise AttributeError('there is no attribute ' + attr + ' in xjson objects')
-
-        def __setattr__(self, attr: str, value):
-            if attr == 'memsize':
-                raise AttributeError('attribute ' + attr + ' is read-only')
-            super().__setattr__(attr, value)
+        @property
+        def memsize(self) -> int:
+            return self._memsize(self._obj)
 
         def dump(self, fp, separators: Union[tuple, None] = None):
             json.dump(self._obj, fp, separators=separators)
@@ -605,42 +617,41 @@ else:
             return res
 
         # Map an optimized JZON reply to a previously known JSON structure
+        # (atomic values need no mapping: they are kept as is, without recursion)
         @staticmethod
-        def _jzon2json(jzon: Any, jsn: dict) -> Any:
+        def _jzon2json(jzon: Any, jsn: Any) -> Any:
             if isinstance(jzon, list):
-                sz: int = len(jzon)
                 if isinstance(jsn, list):
                     # Array in both sides
                     defval = jsn[0] if len(jsn) > 0 else None
-                    res: list = []
-                    for idx in range(sz):
-                        res.append(xjson._jzon2json(jzon[idx], defval))
-                    return res
+                    if not isinstance(defval, (list, dict)):
+                        return jzon
+                    return [xjson._jzon2json(item, defval) for item in jzon]
                 elif isinstance(jsn, dict):
                     # Typical optimization case: array in jzon, struct in json
-                    res: dict = OrderedDict()
+                    if len(jzon) < len(jsn):
+                        raise IndexError("list index out of range")
+                    res: dict = {}
                     idx: int = 0
                     for key, val in jsn.items():
-                        res[key] = xjson._jzon2json(jzon[idx], val)
+                        item = jzon[idx]
+                        res[key] = xjson._jzon2json(item, val) if isinstance(val, (list, dict)) else item
                         idx += 1
                     return res
                 else:
                     return jzon
             elif isinstance(jzon, dict):
-                if isinstance(jsn, list):
-                    return jzon
-                elif isinstance(jsn, dict):
+                if isinstance(jsn, dict):
                     defval = None
                     for val in jsn.values():
                         defval = val
                         break
-                    res: dict = OrderedDict()
+                    res: dict = {}
                     for key, val in jzon.items():
-                        other = jsn.get(key, [])
-                        if other != []:
-                            res[key] = xjson._jzon2json(val, other)  # noqa
-                        else:
-                            res[key] = xjson._jzon2json(val, defval)
+                        other = jsn.get(key, defval)
+                        if isinstance(other, list) and not other:
+                            other = defval
+                        res[key] = xjson._jzon2json(val, other) if isinstance(other, (list, dict)) else val
                     return res
                 else:
                     return jzon
@@ -667,19 +678,24 @@ else:
             return self._obj
 
         def _sub(self, subval):
+            if isinstance(subval, str):
+                # a hardware id always has a dash right after the 8-char serial prefix:
+                # check that first, as most values are not hardware ids
+                if subval[8:9] == '-' and _HWID_PATTERN.match(subval):
+                    return str2hwid(subval)
+                return subval
             if isinstance(subval, dict):
                 return xdict(subval, self._root)
             if isinstance(subval, list):
                 if self._age != self._root._age:
                     raise ValueError("outdated json object")
                 return xlist(subval, self._root)
-            if subval and isinstance(subval, str):
-                hwid = '^[A-Z][A-Z0-9]{7}-(([XT][0-2][0-9](:[0-5][0-9]){2})|([0-9A-Fa-f]{4,12}))\\.[a-z][0-9A-Za-z]*$'
-                if re.match(hwid, subval):
-                    return str2hwid(subval)
             return subval
 
 
+    _XDICT_MISSING = object()
+
+
     class xdict(xjson):
         def __init__(self, content: Union[dict, None] = None, root: Union[xjson, None] = None):
             if content is None:
@@ -713,9 +729,11 @@ else:
             return key in self._obj
 
         def __getitem__(self, key: str):
-            if key in self._obj:
-                return self._sub(self._obj[key])
-            raise KeyError('no key "' + key + '" found in xdict object')
+            try:
+                subval = self._obj[key]
+            except KeyError:
+                raise KeyError('no key "' + key + '" found in xdict object') from None
+            return self._sub(subval)
 
         def __setitem__(self, key: str, value):
             if key in self._obj:
@@ -724,9 +742,10 @@ else:
             raise KeyError('cannot add key "' + key + '" to xdict object')
 
         def get(self, key: str, defVal=None):
-            if key in self._obj:
-                return self._sub(self._obj[key])
-            return defVal
+            subval = self._obj.get(key, _XDICT_MISSING)
+            if subval is _XDICT_MISSING:
+                return defVal
+            return self._sub(subval)
 
         def keys(self):
             return xlist(list(self._obj.keys()), self._root)
@@ -793,41 +812,39 @@ else:
 
     # noinspection PyProtectedMember
     class xbytearray(xarray):
+        _classname: str = 'xbytearray'
+
         # noinspection PyUnusedLocal
         def __init__(self, source: Union[int, ByteArrayLike, str, None] = None, encoding: Union[str, None] = None, _=None, alloc=None):
             if source is None:
-                source = 0
-            elif isinstance(source, int):
-                source = [0] * source
+                self._obj = bytearray()
             elif isinstance(source, xarray):
-                source = source._obj
-            elif isinstance(source, str) and encoding is None:
-                raise TypeError('string argument without an encoding')
-            super().__init__('B', [])
-            self._classname = 'xbytearray'
-            if encoding is None:
+                self._obj = bytearray(source._obj)
+            elif encoding is None:
+                if isinstance(source, str):
+                    raise TypeError('string argument without an encoding')
                 self._obj = bytearray(source)
             else:
                 self._obj = bytearray(source, encoding)
             self._typecode = _BYTEARRAY_TYPECODE
+            self._itemsize = 1
 
 
     # noinspection PyProtectedMember
     class xmemoryview(xarray):
+        _classname: str = 'xmemoryview'
+
         def __init__(self, source: xarray, start: int = 0, end: Union[int, None] = None):
             if not isinstance(source, xarray):
                 raise TypeError('xmemoryview can only map to xbytearray or xarray')
-            super().__init__('B', [])
             if end is None:
                 end = len(source)
-            self._classname = 'xmemoryview'
             self._obj = memoryview(source._obj)[start:end]
-            self._typecode = source.typecode
-            self._itemsize = source.itemsize
+            self._typecode = source._typecode
+            self._itemsize = source._itemsize
 
         def cast(self, typecode) -> xmemoryview:
-            res: xmemoryview = xmemoryview(self)
-            res._obj = res._obj.cast(typecode)
+            res: xmemoryview = self._view(self._obj.cast(typecode))
             res._typecode = typecode
             res._itemsize = res._obj.itemsize
             return res
@@ -874,6 +891,12 @@ else:
 
 # Max length returned by StreamReader readuntil() and readline()
 _MAX_STREAM_READUNTIL: Final[int] = 512
+# Max size of a single socket read on CPython (MicroPython is limited to 256 bytes)
+_CPYTHON_MAX_RECV: Final[int] = 65536
+# Size of socket reads while waiting for response headers on CPython (128 on MicroPython)
+_CPYTHON_HEADER_RECV: Final[int] = 1024
+# Default max number of keep-alive connections used in parallel for device requests, per hub
+_HTTP_POOL_SIZE: Final[int] = 3
 
 
 class YUrl:
@@ -1059,26 +1082,159 @@ class HTTPState:
         ABORT: Final[int] = 0
 
 
+# Single task enforcing the timeout of all pending requests of a session (or of a
+# whole YAPI context), using a heap of deadlines rather than one polling task per request
+#
+# noinspection PyProtectedMember
+class RequestWatchdog:
+    _create_task: Callable[[Coroutine], asyncio.Task]
+    _heap: list[tuple[int, int]]  # (deadline relative to _epoch, watch sequence number)
+    _watched: dict[int, BaseResponse]  # watched requests, by sequence number
+    _epoch: int  # reference tick for heap keys, to survive ticks_ms() wrap-around
+    _seqNo: int
+    _wakeup: Union[asyncio.Event, None]
+    _task: Union[asyncio.Task, None]
+
+    def __init__(self, create_task: Callable[[Coroutine], asyncio.Task]):
+        self._create_task = create_task
+        self._heap = []
+        self._watched = {}
+        self._epoch = ticks_ms()
+        self._seqNo = 0
+        self._wakeup = None
+        self._task = None
+
+    # Start watching a request: the task will be cancelled if the request deadline expires
+    def watch(self, req: BaseResponse, task: asyncio.Task) -> None:
+        self._seqNo += 1
+        req._wdSeq = self._seqNo
+        req._watchdog = task
+        self._watched[self._seqNo] = req
+        self._schedule(req)
+
+    # Make sure the request deadline is in the heap (invoked when the deadline gets closer)
+    def _schedule(self, req: BaseResponse) -> None:
+        if not _IS_MICROPYTHON and self._task is not None and self._task.get_loop() is not asyncio.get_running_loop():
+            # previous event loop is gone, together with all requests it was watching
+            self._heap = []
+            self._watched = {req._wdSeq: req}
+            self._task = None
+        key: int = ticks_diff(req._endTicks, self._epoch)
+        req._wdKey = key
+        heap: list = self._heap
+        wakeup: bool = (len(heap) == 0 or key < heap[0][0])
+        heapq.heappush(heap, (key, req._wdSeq))
+        if self._task is None or self._task.done():
+            # the event must be created within the running event loop
+            self._wakeup = asyncio.Event()
+            self._task = self._create_task(self._run())
+        elif wakeup:
+            self._wakeup.set()
+
+    # Stop watching a request
+    @staticmethod
+    def unwatch(req: BaseResponse) -> None:
+        if req._wdSeq:
+            req._wdog._forget(req._wdSeq)
+        req._wdSeq = 0
+        req._watchdog = None
+
+    # Release a request as soon as it is not watched anymore. Its heap entry will
+    # be discarded when reaching the top of the heap, but stale entries are purged
+    # as soon as they make up most of the heap
+    def _forget(self, seqNo: int) -> None:
+        watched: dict = self._watched
+        if watched.pop(seqNo, None) is None:
+            return
+        heap: list = self._heap
+        if len(heap) > 64 and len(heap) > 2 * len(watched):
+            self._heap = [entry for entry in heap if entry[1] in watched]
+            heapq.heapify(self._heap)
+
+    # Deadline of a watched request has been moved
+    def update(self, req: BaseResponse) -> None:
+        if req._wdSeq and ticks_diff(req._endTicks, self._epoch) < req._wdKey:
+            self._schedule(req)
+
+    async def _run(self) -> None:
+        while self._heap:
+            # heap may be replaced when purged, always use the current one
+            heap: list = self._heap
+            key, seqNo = heap[0]
+            req: Union[BaseResponse, None] = self._watched.get(seqNo)
+            if req is None:
+                # request is not watched anymore
+                heapq.heappop(heap)
+                continue
+            now: int = ticks_ms()
+            remaining: int = ticks_diff(req._endTicks, now)
+            if remaining <= 0:
+                heapq.heappop(heap)
+                task: asyncio.Task = req._watchdog
+                RequestWatchdog.unwatch(req)
+                task.cancel()
+                continue
+            dueKey: int = ticks_diff(req._endTicks, self._epoch)
+            if dueKey > key:
+                # deadline has been postponed by keepAlive()
+                heapq.heappop(heap)
+                req._wdKey = dueKey
+                heapq.heappush(heap, (dueKey, seqNo))
+                continue
+            if ticks_diff(now, self._epoch) > 0x4000000:
+                # rebase heap keys long before ticks_diff() could overflow
+                self._epoch = now
+                newHeap: list = []
+                for seqNo, req in self._watched.items():
+                    key = ticks_diff(req._endTicks, now)
+                    req._wdKey = key
+                    newHeap.append((key, seqNo))
+                heapq.heapify(newHeap)
+                self._heap = newHeap
+                continue
+            # sleep until the deadline, or until an earlier deadline is scheduled
+            self._wakeup.clear()
+            try:
+                if _IS_MICROPYTHON:
+                    await asyncio.wait_for_ms(self._wakeup.wait(), remaining)  # noqa
+                else:
+                    await asyncio.wait_for(self._wakeup.wait(), remaining / 1000.0)
+            except asyncio.TimeoutError:
+                pass
+        self._task = None
+
+
 # noinspection PyProtectedMember
 class BaseChan:
     _session: BaseSession
     _base: YUrl
     _ssl: Union[SSLContext, None]
-    _pending: list[BaseResponse]
+    _pending: list[BaseResponse]  # FIFO queue (a deque in CPython)
     _current: Union[BaseResponse, None]
     _reader: Union[asyncio.StreamReader, None]
     _writer: Union[asyncio.StreamWriter, None]
     _task: Union[asyncio.Task, None]
+    _carry: Union[bytes, None]  # data received beyond the end of previous response (pipelining)
+    _sentAhead: Union[BaseResponse, None]  # next pending request, already sent (pipelining)
+    _sentAheadAuth: bool
+    _canPipeline: bool  # set when the connection has proven to keep alive with framed responses
 
     def __init__(self, session: BaseSession, baseurl: YUrl, sslctx: SSLContext):
         self._session = session
         self._base = baseurl
         self._ssl = sslctx
-        self._pending = []
+        if _IS_MICROPYTHON:
+            self._pending = []
+        else:
+            self._pending = deque()
         self._current = None
         self._reader = None
         self._writer = None
         self._task = None
+        self._carry = None
+        self._sentAhead = None
+        self._sentAheadAuth = False
+        self._canPipeline = False
 
     def matchUrl(self, url: YUrl) -> bool:
         if self._base.host != url.host:
@@ -1092,15 +1248,36 @@ class BaseChan:
         else:
             self._pending.append(request)
 
+    # Number of requests currently queued on the channel, including the active one
+    def queueLength(self) -> int:
+        if self._current is None:
+            return 0
+        return 1 + len(self._pending)
+
+    # Internal method to read from socket, starting with data carried over from previous response
+    async def _read(self, sz: int) -> bytes:
+        carry: Union[bytes, None] = self._carry
+        if carry:
+            if len(carry) > sz:
+                self._carry = carry[sz:]
+                return carry[:sz]
+            self._carry = None
+            return carry
+        return await self._reader.read(sz)
+
     # Internal method to receive data from socket for a given request
     async def _recv(self, req: BaseResponse, sz: int) -> bytes:
         if isinstance(req, BaseResponse) and self._current != req:
             raise OSError("HTTP request not active")
         if self._reader is None:
             raise OSError("Connection reset")
-        # Ensure we never read more than 256 bytes, to avoid out of memory errors
-        # FIXME: try to use read_into to read directly into extmem
-        res = await self._reader.read(min(sz, 256))
+        if _IS_MICROPYTHON:
+            # Ensure we never read more than 256 bytes, to avoid out of memory errors
+            # FIXME: try to use read_into to read directly into extmem
+            sz = min(sz, 256)
+        elif sz > _CPYTHON_MAX_RECV:
+            sz = _CPYTHON_MAX_RECV
+        res = await self._read(sz)
         if not res:
             raise EOFError()
         return res
@@ -1123,6 +1300,23 @@ class BaseChan:
             sent += len(blk)
             blk = dataViewer(sent, 128)
 
+    # Internal method to send the next pending request before the current response
+    # is received, if the session enables pipelining and the request is idempotent
+    async def _sendAheadIfPossible(self) -> None:
+        if not self._session._pipelining or not self._canPipeline:
+            return
+        if self._sentAhead is not None or len(self._pending) == 0:
+            return
+        req: BaseResponse = self._pending[0]
+        if req.status != HTTPState.NOT_SENT or req._method != 'GET' or req.hasData() or req._async is not None:
+            return
+        req.status = HTTPState.SEND_HEADERS
+        self._sentAheadAuth = req._prepHeaders(self._base, self._session._auth)
+        self._sentAhead = req
+        await self._sendView(req.getHeaderView)
+        req.prepRecv()
+        req.status = HTTPState.RECV_HEADERS
+
     # Start the background process
     def keepRunning(self) -> None:
         if self._task is None or self._task.done():
@@ -1136,9 +1330,15 @@ class BaseChan:
             req: BaseResponse = self._current
             try:
                 try:
+                    # check if the request has already been sent by pipelining
+                    sentAhead: bool = (req is self._sentAhead)
+                    has_auth_info: bool = False
+                    if sentAhead:
+                        self._sentAhead = None
+                        has_auth_info = self._sentAheadAuth
                     if req.status == HTTPState.NOT_SENT:
                         req.status = HTTPState.CONNECT
-                    if req.status < HTTPState.SEND_HEADERS:
+                    if req.status < HTTPState.SEND_HEADERS or sentAhead:
                         req.startWatchdog(self._session)
                     url = self._base
                     reuse_sock: bool = self._writer is not None
@@ -1152,24 +1352,29 @@ class BaseChan:
                             ssl_arg = None
                         self._reader, self._writer = await asyncio.open_connection(url.host, url.port, ssl=ssl_arg)
                     mustRestart = False
-                    if req.status < HTTPState.SEND_HEADERS:
-                        req.status = HTTPState.SEND_HEADERS
-                        has_auth_info = req._prepHeaders(self._base, self._session._auth)
-                        await self._sendView(req.getHeaderView)
-                        req.prepRecv()
-                        if len(req.getDataView(0, 128)) > 0:
-                            if req.status < HTTPState.SEND_DATA:
-                                req.status = HTTPState.SEND_DATA
-                            await self._sendView(req.getDataView)
-                        if req._async is not None:
-                            # asynchronous requests trigger the _ready Future as soon as fully sent
-                            req._ready.set()
-                        if req.status < HTTPState.RECV_HEADERS:
-                            req.status = HTTPState.RECV_HEADERS
+                    mustClose = False
+                    if req.status < HTTPState.SEND_HEADERS or sentAhead:
+                        if not sentAhead:
+                            req.status = HTTPState.SEND_HEADERS
+                            has_auth_info = req._prepHeaders(self._base, self._session._auth)
+                            await self._sendView(req.getHeaderView)
+                            req.prepRecv()
+                            if len(req.getDataView(0, 128)) > 0:
+                                if req.status < HTTPState.SEND_DATA:
+                                    req.status = HTTPState.SEND_DATA
+                                await self._sendView(req.getDataView)
+                            if req._async is not None:
+                                # asynchronous requests trigger the _ready Future as soon as fully sent
+                                req._ready.set()
+                            if req.status < HTTPState.RECV_HEADERS:
+                                req.status = HTTPState.RECV_HEADERS
+                        if req._async is None:
+                            await self._sendAheadIfPossible()
                         # trigger reading until headers are fully received or timeout
                         recvMore: bool = True
+                        hdrRecvSize: int = 128 if _IS_MICROPYTHON else _CPYTHON_HEADER_RECV
                         while recvMore:
-                            pkt: bytes = await self._reader.read(128)
+                            pkt: bytes = await self._read(hdrRecvSize)
                             if len(pkt) == 0:
                                 # connection closed by peer
                                 # it's a reusable socket ensure remote has not closed the socket since last read
@@ -1193,11 +1398,26 @@ class BaseChan:
                             if recvMore:
                                 # FIXME: could also be a connection closed by peer
                                 raise asyncio.TimeoutError
-                    if req._async is None and not mustRestart:
-                        await req.waitEndProcesssing()
+                            if req.isFramed():
+                                # keep data received beyond the end of this response for next request
+                                excess: Union[bytes, None] = req.takeExcess()
+                                if excess:
+                                    self._carry = excess + self._carry if self._carry else excess
+                                self._canPipeline = True
+                            else:
+                                # the end of the response cannot be located safely
+                                self._canPipeline = False
+                                mustClose = self._sentAhead is not None
+                    if not mustRestart:
+                        if req._async is None:
+                            await req.waitEndProcesssing()
+                        else:
+                            # nobody reads the content of asynchronous requests: skip it, so that the
+                            # request is released for the next one, and the connection can be reused
+                            await req.skipContent()
                     # cancel the watchdog thread when done
                     req.stopWatchdog()
-                    if req.requestMustBeClosed() or mustRestart:
+                    if req.requestMustBeClosed() or mustRestart or mustClose:
                         await self.close()
                     if mustRestart:
                         # reset request and start it again
@@ -1214,11 +1434,15 @@ class BaseChan:
                 if not req._ready.is_set():
                     req._except = exc
                     req._ready.set()
+                # requests queued after this one must not wait for it
+                req._done.set()
             retrycount = 0
-            if len(self._pending) > 0:
+            if len(self._pending) == 0:
+                self._current = None
+            elif _IS_MICROPYTHON:
                 self._current = self._pending.pop(0)
             else:
-                self._current = None
+                self._current = self._pending.popleft()
         self._task = None
 
     # Release a request; if request is current and content was not fully read, this will cause
@@ -1241,6 +1465,12 @@ class BaseChan:
         sock = self._writer
         self._reader = None
         self._writer = None
+        self._carry = None
+        self._canPipeline = False
+        if self._sentAhead is not None:
+            # request sent ahead is lost with the connection, it will be sent again
+            self._sentAhead.reset()
+            self._sentAhead = None
         if sock:
             try:
                 sock.close()
@@ -1269,7 +1499,10 @@ class BaseResponse:
     _headEnd: int  # when header received: end of header in _buff
     _except: Union[RuntimeError, OSError, BaseException, None]
     _endTicks: int  # absolute timeout end tick, when watchdog is started
-    _watchdog: Union[asyncio.Task, None]  # the request timeout task
+    _watchdog: Union[asyncio.Task, None]  # the task to cancel if the request times out
+    _wdog: Union[RequestWatchdog, None]
+    _wdSeq: int  # RequestWatchdog sequence number, 0 when not watched
+    _wdKey: int  # deadline key used by RequestWatchdog heap
     _async: Union[int, None]  # if not None, the request does not need to be awaited for completion
     _ready: asyncio.Event  # event set when the header is fully received (or fully sent, for async requests)
     _done: asyncio.Event  # event sset when the request is completed
@@ -1291,6 +1524,9 @@ class BaseResponse:
         self._except = None
         self._endTicks = -1
         self._watchdog = None
+        self._wdog = None
+        self._wdSeq = 0
+        self._wdKey = 0
         self._async = None
         self._ready = asyncio.Event()
         self._done = asyncio.Event()
@@ -1345,7 +1581,7 @@ class BaseResponse:
         self._headEnd = -1
         self._except = None
         self._endTicks = -1
-        self._watchdog = None
+        RequestWatchdog.unwatch(self)
         self.status = HTTPState.NOT_SENT
         self.reason = 'Not sent'
         self.ok = False
@@ -1362,27 +1598,18 @@ class BaseResponse:
         self.release()
         await self.released()
 
-    async def request_watchdog(self, task: asyncio.Task) -> None:
-        remaining = ticks_diff(self._endTicks, ticks_ms())
-        while remaining > 0:
-            if _IS_MICROPYTHON:
-                await asyncio.sleep_ms(min(remaining, 250))  # noqa
-            else:
-                await asyncio.sleep(min(remaining, 250) / 1000.0)
-            remaining = ticks_diff(self._endTicks, ticks_ms())
-        task.cancel()
-
     def startWatchdog(self, session: BaseSession):
         self._endTicks = ticks_add(ticks_ms(), self._timeout)
-        self._watchdog = session.create_task(self.request_watchdog(asyncio.current_task()))
+        self._wdog = session.getWatchdog()
+        self._wdog.watch(self, asyncio.current_task())
 
     def keepAlive(self, gracetime_ms: int) -> None:
         self._endTicks = ticks_add(ticks_ms(), gracetime_ms)
+        if self._wdSeq:
+            self._wdog.update(self)
 
     def stopWatchdog(self):
-        if self._watchdog:
-            self._watchdog.cancel()
-        self._watchdog = None
+        RequestWatchdog.unwatch(self)
 
     def getHeaderView(self, pos: int, maxLen: int) -> bytes:
         endPos = min(self._len, pos + maxLen)
@@ -1531,9 +1758,21 @@ class BaseResponse:
         self._ready.set()
         await self._done.wait()
 
+    # Skip the response content, for requests whose result is not needed
+    async def skipContent(self) -> None:
+        self._done.set()
+
     def requestMustBeClosed(self) -> bool:
         return True
 
+    # Tells if the end of the response can be located in the stream without closing the connection
+    def isFramed(self) -> bool:
+        return False
+
+    # Detach data received beyond the end of the response, if any
+    def takeExcess(self) -> Union[bytes, None]:
+        return None
+
 
 class BaseAuth:
     _type: str
@@ -1664,6 +1903,19 @@ class ClientResponse(BaseResponse):
             mustClose = (self.get('connection', '').lower() == 'close')
         return mustClose
 
+    def isFramed(self) -> bool:
+        return self._chunkRem < 0 and self._dataRem >= 0 and not self.requestMustBeClosed()
+
+    def takeExcess(self) -> Union[bytes, None]:
+        endPos: int = self._dataPos + self._dataRem
+        if self._len <= endPos:
+            return None
+        excess = self._buff[endPos:self._len]
+        self._len = endPos
+        if isinstance(excess, bytes):
+            return excess
+        return excess.tobytes()
+
     def __repr__(self) -> str:
         return "<%s %d %sdone>" % ('ClientResponse', self.status, "" if self._done.is_set() else "not ")
 
@@ -1699,6 +1951,23 @@ class ClientResponse(BaseResponse):
                     self._dataRem = int(length)
         return eoh
 
+    # Grow the work buffer to make room for size bytes after current read position
+    # (only used on CPython, MicroPython keeps a bounded work buffer)
+    def _growBuff(self, size: int) -> None:
+        needed: int = self._dataPos + size
+        if len(self._buff) >= needed:
+            return
+        if isinstance(self._buff, xbytearray):
+            # grow the buffer object in place, so that a reusable buffer
+            # provided with setBuff() keeps its larger size for next requests
+            newobj: bytearray = bytearray(max(needed, 2 * len(self._buff)))
+            newobj[:self._len] = memoryview(self._buff._obj)[:self._len]
+            self._buff._obj = newobj
+            return
+        newbuff: xbytearray = xbytearray(max(needed, 2 * len(self._buff)))
+        newbuff[:self._len] = self._buff[:self._len]
+        self._buff = newbuff
+
     # Read more data from TCP channel and store it in the work buffer
     # May raise EOFError in case of EOF, or OSError if work buffer is full
     async def _readMore(self):
@@ -1708,6 +1977,13 @@ class ClientResponse(BaseResponse):
         sz: int = len(self._buff) - self._len
         if sz == 0:
             raise OSError("input buffer full")
+        if self._chunkRem < 0 and self._dataRem >= 0:
+            # never read beyond the end of content, the stream may hold the next response
+            need: int = self._dataRem - (self._len - self._dataPos)
+            if need <= 0:
+                raise EOFError()
+            if sz > need:
+                sz = need
         pkt: bytes = await self._chan._recv(self, sz)
         pktlen: int = len(pkt)
         newlen = self._len + pktlen
@@ -1769,9 +2045,9 @@ class ClientResponse(BaseResponse):
                     # add 2 bytes for the last \r\n after the data
                     self._chunkRem += 2
 
-            # will read as much continuous data as available
-            if n > self._chunkRem:
-                n = self._chunkRem
+            # will read as much continuous data as available, up to the \r\n ending the chunk
+            if n > self._chunkRem - 2:
+                n = self._chunkRem - 2
         else:
             # HTTP encoding is natural
             if self._dataRem >= 0:
@@ -1797,18 +2073,26 @@ class ClientResponse(BaseResponse):
         prevPos: int = self._dataPos
         if readUntil >= 0:
             # make sure we stop after specified limit character (eg. LF)
-            endl = prevPos
             endPos = prevPos + n
-            while endl < endPos:
-                byte = self._buff[endl]
-                endl += 1
-                if byte == readUntil:
-                    n = endl - prevPos
-                    break
+            if _IS_MICROPYTHON:
+                endl = prevPos
+                while endl < endPos:
+                    byte = self._buff[endl]
+                    endl += 1
+                    if byte == readUntil:
+                        n = endl - prevPos
+                        break
+            else:
+                endl = self._buff.find(readUntil, prevPos, endPos)
+                if endl >= 0:
+                    n = endl + 1 - prevPos
         self._dataPos += n
         self._dataRem -= n
         if self._chunkRem >= 0:
             self._chunkRem -= n
+        elif self._dataRem == 0:
+            # end of content reached, the connection can be used for the next request
+            self._done.set()
         return self._buff[prevPos:self._dataPos]
 
     async def readuntil(self, separator: bytes) -> bytes:
@@ -1817,11 +2101,14 @@ class ClientResponse(BaseResponse):
         The separator is included in the returned bytes object
         """
         sepByte: int = separator[0]
-        res: bytes = (await self.read(128, sepByte)).tobytes()
+        blkSize: int = 128 if _IS_MICROPYTHON else _MAX_STREAM_READUNTIL
+        res: bytes = (await self.read(blkSize, sepByte)).tobytes()
         if len(res) == 0:
             return res
         while res[-1] != sepByte:
-            more: bytes = (await self.read(128, sepByte)).tobytes()
+            if not _IS_MICROPYTHON:
+                blkSize = _MAX_STREAM_READUNTIL - len(res)
+            more: bytes = (await self.read(blkSize, sepByte)).tobytes()
             if len(more) == 0:
                 return res
             res += more
@@ -1852,6 +2139,10 @@ class ClientResponse(BaseResponse):
             n = self._dataRem
         if n == 0:
             return self._buff[:0]
+        if not _IS_MICROPYTHON and self._chunkRem < 0 and n > 0 and self._chan is not None:
+            # on CPython, grow the internal buffer so that the content is received in place
+            # and returned as a view, without intermediate copies
+            self._growBuff(n + 1)
         if self._chunkRem < 0 and 0 < n < len(self._buff) - self._dataPos:
             # optimal case: we can read and return data from our internal buffer
             startPos: int = self._dataPos
@@ -1872,7 +2163,12 @@ class ClientResponse(BaseResponse):
                 res[pos:pos + rw] = blk
                 pos += rw
         else:
-            blk: xarray = await self.read(1024)
+            blkSize: int = 1024
+            if not _IS_MICROPYTHON and self._chan is not None:
+                # on CPython, use large socket reads for content of unknown size
+                blkSize = _CPYTHON_MAX_RECV
+                self._growBuff(blkSize)
+            blk: xarray = await self.read(blkSize)
             if not len(blk):
                 return blk
             res: xbytearray = xbytearray(1024)
@@ -1883,7 +2179,7 @@ class ClientResponse(BaseResponse):
                     print("blk sz=", len(blk), blk[:16], '...', blk[-16:])
                 res[pos:pos + rw] = blk
                 pos += rw
-                blk: xarray = await self.read(1024)
+                blk: xarray = await self.read(blkSize)
                 rw = len(blk)
             if _LOG_LEVEL >= 5:
                 print("res sz=", pos, res[:16], '...', res[-16:])
@@ -1937,6 +2233,12 @@ class ClientResponse(BaseResponse):
         # body reading must be handled by application
         await self._done.wait()
 
+    async def skipContent(self) -> None:
+        while not self._done.is_set():
+            if len(await self.read(1024)) == 0:
+                break
+        self._done.set()
+
 
 class WSMsgType:
     if not _IS_MICROPYTHON:
@@ -1956,6 +2258,14 @@ else:
         fin: bool
 
 
+    # Apply (or remove) a websocket mask to a whole payload at once (RFC 6455, section 5.3)
+    # using big integer arithmetic, which is much faster than masking word by word in Python
+    def _wsMask(data: Union[bytes, bytearray, memoryview], mask: bytes) -> bytes:
+        size: int = len(data)
+        key: bytes = (mask * ((size + 3) >> 2))[:size]
+        return (int.from_bytes(data, 'little') ^ int.from_bytes(key, 'little')).to_bytes(size, 'little')
+
+
 # To reduce memory footprint, we use a single polymorphic WebSocketResponse
 # object that also behaves as a context and as websocket connection manager
 #
@@ -1964,6 +2274,9 @@ class BaseWsResponse(BaseResponse):
     _gracetime: int
     _frame: bytearray
     _xframe: Union[xmemoryview, None]
+    _masked: bool  # client-side frames are masked, server-side frames are not
+    _rxData: Union[bytes, memoryview]  # CPython only: incoming data not yet consumed
+    _rxBuff: Union[bytearray, None]  # CPython only: reassembly buffer for split frames and messages
 
     def __init__(self, method: str, target: str, headers: dict, timeout: int, chan: BaseChan):
         super().__init__(method, target, headers, timeout)
@@ -1972,6 +2285,10 @@ class BaseWsResponse(BaseResponse):
         self._gracetime = timeout
         self._frame = bytearray(136)
         self._xframe = None
+        self._masked = True
+        if not _IS_MICROPYTHON:
+            self._rxData = b''
+            self._rxBuff = None
 
     def __repr__(self) -> str:
         return "<%s %d %sclosed>" % ('BaseWsResponse', self.status, "" if self._done.is_set() else "not ")
@@ -2025,13 +2342,28 @@ class BaseWsResponse(BaseResponse):
         return self._xframe[pos:endPos].tobytes()
 
     async def send(self, msg: WSMessage) -> None:
-        mask: int = random.getrandbits(32)
         data: Union[xarray, bytes, memoryview]
         data = msg.data.encode('utf-8') if isinstance(msg.data, str) else msg.data
         dataLen: int = len(data)
         firstByte: int = msg.type
         if msg.fin:
             firstByte |= 0x80
+        if not self._masked:
+            await self._sendUnmasked(firstByte, data, dataLen)
+            return
+        if not _IS_MICROPYTHON:
+            # mask the whole payload at once, and send the frame with a single write
+            if isinstance(data, xarray):
+                data = data._obj
+            maskBytes: bytes = random.getrandbits(32).to_bytes(4, 'little')
+            if dataLen < 0x7e:
+                hdr: bytes = bytes((firstByte, 0x80 + dataLen))
+            else:
+                assert dataLen <= 65535
+                hdr: bytes = bytes((firstByte, 0xfe, dataLen >> 8, dataLen & 0xff))
+            await self._chan._send(hdr + maskBytes + _wsMask(data, maskBytes))
+            return
+        mask: int = random.getrandbits(32)
         if dataLen < 0x7e:
             # header length = 6 (2 + mask)
             roundedLen = 6 + ((dataLen + 3) & 0xfffc)
@@ -2058,13 +2390,119 @@ class BaseWsResponse(BaseResponse):
             dwView: xmemoryview = buff[4:roundedLen].cast('I')
             dwView[0] = mask
             buff[8:8 + dataLen] = data
-            for i in range(1, roundedLen // 4):
+            for i in range(1, (roundedLen - 4) // 4):
                 dwView[i] ^= mask
             self._xframe = buff[:8 + dataLen]
             await self._chan._sendView(self.getFrameView)
             self._xframe = None
 
+    # Frames sent by the server side of a websocket must not be masked (RFC 6455, section 5.1)
+    async def _sendUnmasked(self, firstByte: int, data: Union[xarray, bytes, memoryview], dataLen: int) -> None:
+        if dataLen < 0x7e:
+            buff: memoryview = memoryview(self._frame)[:2 + dataLen]
+            buff[0] = firstByte
+            buff[1] = dataLen
+            buff[2:] = data
+            await self._chan._send(buff)
+        elif not _IS_MICROPYTHON:
+            assert dataLen <= 65535
+            if isinstance(data, xarray):
+                data = data._obj
+            await self._chan._send(bytes((firstByte, 0x7e, dataLen >> 8, dataLen & 0xff)) + data)
+        else:
+            assert dataLen <= 65535
+            buff: xbytearray = xbytearray(4 + dataLen)
+            buff[0] = firstByte
+            buff[1] = 0x7e
+            buff[2] = dataLen >> 8
+            buff[3] = dataLen & 0xff
+            buff[4:] = data
+            self._xframe = buff[:4 + dataLen]
+            await self._chan._sendView(self.getFrameView)
+            self._xframe = None
+
+    if not _IS_MICROPYTHON:
+        # Make sure that at least sz bytes of incoming data are pending, and return a view on them
+        async def _rxPending(self, sz: int) -> memoryview:
+            pending: Union[bytes, memoryview] = self._rxData
+            while len(pending) < sz:
+                pkt: bytes = await self._chan._recv(self, _CPYTHON_MAX_RECV)
+                pending = bytes(pending) + pkt if len(pending) > 0 else pkt
+            self._rxData = pending
+            return memoryview(pending)
+
+        # CPython implementation of recv(), reading large blocks from the socket.
+        # Frames fully available in the received block are returned without any copy,
+        # payloads are unmasked in bulk and split frames or fragmented messages are
+        # reassembled in place into a single reusable buffer. As for the MicroPython
+        # implementation, returned data is only valid until the next call to recv()
+        async def _recvFrames(self, partialFrames: bool) -> WSMessage:
+            if self._len > 0:
+                # data received together with the handshake response
+                self._rxData = self._buff[:self._len].tobytes()
+                self._len = 0
+            msgType: int = -1
+            msgLen: int = 0
+            while True:
+                hdr: memoryview = await self._rxPending(2)
+                isFin: bool = (hdr[0] & 0x80) != 0
+                isMasked: bool = (hdr[1] & 0x80) != 0
+                dataLen: int = hdr[1] & 0x7f
+                hdrLen: int = 2
+                if dataLen == 0x7e:
+                    hdr = await self._rxPending(4)
+                    dataLen = (hdr[2] << 8) + hdr[3]
+                    hdrLen = 4
+                elif dataLen == 0x7f:
+                    hdr = await self._rxPending(10)
+                    dataLen = int.from_bytes(hdr[2:10], 'big')
+                    hdrLen = 10
+                mask: bytes = b''
+                if isMasked:
+                    # note: server is not expected to send masked frames, but clients must do so
+                    hdr = await self._rxPending(hdrLen + 4)
+                    mask = hdr[hdrLen:hdrLen + 4].tobytes()
+                    hdrLen += 4
+                if msgType < 0:
+                    msgType = hdr[0] & 0x0f
+                pending: memoryview = hdr[hdrLen:]
+                # 1. Shortcut for the most frequent case: single frame fully received
+                if msgLen == 0 and (isFin or partialFrames) and len(pending) >= dataLen:
+                    self._rxData = pending[dataLen:]
+                    data: Union[bytes, memoryview] = pending[:dataLen]
+                    if isMasked:
+                        data = _wsMask(data, mask)
+                    self.keepAlive(self._gracetime)
+                    return WSMessage(msgType, data, isFin)
+                # 2. General case: collect the payload at the end of the reassembly buffer
+                endPos: int = msgLen + dataLen
+                if self._rxBuff is None or len(self._rxBuff) < endPos:
+                    newBuff: bytearray = bytearray(max(endPos, 4096, 2 * len(self._rxBuff or b'')))
+                    if msgLen > 0:
+                        newBuff[:msgLen] = self._rxBuff[:msgLen]
+                    self._rxBuff = newBuff
+                view: memoryview = memoryview(self._rxBuff)
+                rcvLen: int = min(len(pending), dataLen)
+                view[msgLen:msgLen + rcvLen] = pending[:rcvLen]
+                self._rxData = pending[rcvLen:]
+                pos: int = msgLen + rcvLen
+                while pos < endPos:
+                    pkt: memoryview = memoryview(await self._chan._recv(self, _CPYTHON_MAX_RECV))
+                    rcvLen = min(len(pkt), endPos - pos)
+                    view[pos:pos + rcvLen] = pkt[:rcvLen]
+                    pos += rcvLen
+                    self._rxData = pkt[rcvLen:]
+                if isMasked:
+                    view[msgLen:endPos] = _wsMask(view[msgLen:endPos], mask)
+                msgLen = endPos
+                # 3. Return when the message is complete, or if no merge is requested
+                if isFin or partialFrames:
+                    self.keepAlive(self._gracetime)
+                    return WSMessage(msgType, view[:msgLen], isFin)
+
     async def recv(self, partialFrames: bool = False) -> WSMessage:
+        if not _IS_MICROPYTHON:
+            return await self._recvFrames(partialFrames)
         pkt: bytes
         if self._len > 0:
             pkt = self._buff[:self._len].tobytes()
@@ -2091,7 +2529,10 @@ class BaseWsResponse(BaseResponse):
             hdrLen = 4
             dataLen = pkt[2] * 256 + pkt[3]
         if isMasked:
-            # note: server is not expected to send masked frames
+            # note: server is not expected to send masked frames, but clients must do so
+            while rcvLen < hdrLen + 4:
+                pkt += await self._chan._recv(self, 128)
+                rcvLen = len(pkt)
             mask = (pkt[hdrLen + 3] << 24) + (pkt[hdrLen + 2] << 16) + (pkt[hdrLen + 1] << 8) + pkt[hdrLen]
             hdrLen += 4
         frameLen: int = hdrLen + dataLen
@@ -2119,7 +2560,11 @@ class BaseWsResponse(BaseResponse):
             if extraLen > 0:
                 self._buff[:extraLen] = extraData
             roundedStart: int = (extraLen + 3) & 0xfffc
-            buff = self._buff[roundedStart:roundedStart + roundedLen]
+            if roundedStart + roundedLen <= len(self._buff):
+                buff = self._buff[roundedStart:roundedStart + roundedLen]
+            else:
+                buff = xbytearray(roundedLen)
+            buff[:dataLen] = memoryview(pkt)[hdrLen:frameLen]
         else:
             if dataLen <= len(self._buff):
                 buff = self._buff[:roundedLen]
@@ -2247,6 +2692,8 @@ class BaseSession:
     _headers: Union[Pairs, None]
     _auth: Union[BaseAuth, None]
     _httpver: str
+    _pipelining: bool  # send idempotent GET requests ahead on keep-alive connections
+    _wdog: Union[RequestWatchdog, None]
     _channels: list[Union[BaseChan, None]]
     _wschannels: list[BaseChan]
 
@@ -2254,7 +2701,8 @@ class BaseSession:
                  headers: Union[Pairs, None] = None,
                  ssl: Union[SSLContext, None] = None,
                  auth: Union[BaseAuth, None] = None,
-                 version: str = "HTTP/1.1"):
+                 version: str = "HTTP/1.1",
+                 pipelining: bool = False):
         if isinstance(base_url, YUrl):
             self._base = base_url
         elif len(base_url) == 0:
@@ -2275,6 +2723,8 @@ class BaseSession:
         else:
             self._auth = None
         self._httpver = version
+        self._pipelining = pipelining
+        self._wdog = None
         self._channels = []
         self._wschannels = []
 
@@ -2287,6 +2737,12 @@ class BaseSession:
     def create_task(self, coro: Coroutine) -> asyncio.Task:
         return asyncio.create_task(coro)
 
+    # Get the watchdog in charge of request timeouts
+    def getWatchdog(self) -> RequestWatchdog:
+        if self._wdog is None:
+            self._wdog = RequestWatchdog(self.create_task)
+        return self._wdog
+
     # Build the request line
     def _buildRequest(self, path: str, params: Union[Pairs, None]) -> str:
         if params is not None and len(params) > 0:
@@ -2303,7 +2759,7 @@ class BaseSession:
         if ssl is None:
             ssl = self._ssl
         chan: int = max(0, channel)
-        while chan < len(self._channels) and not self._channels[chan].matchUrl(baseUrl):
+        while chan < len(self._channels) and self._channels[chan] is not None and not self._channels[chan].matchUrl(baseUrl):
             chan += 1
         while chan >= len(self._channels):
             self._channels.append(None)
@@ -2457,6 +2913,7 @@ if not _IS_MICROPYTHON:
         YDeviceUpdateCallback = Union[Callable[["YModule"], Any], None]
         YDeviceLogCallback = Union[Callable[["YModule", str], Any], None]
         YModuleBeaconCallback = Union[Callable[["YModule", int], Any], None]
+        YTraceCallback = Union[Callable[[str, dict], Any], None]
     except TypeError:
         YProgressCallback = Union[Callable, None]
         YCalibrationCallback = Union[Callable, None]
@@ -2465,6 +2922,7 @@ if not _IS_MICROPYTHON:
         YDeviceUpdateCallback = Union[Callable, None]
         YDeviceLogCallback = Union[Callable, None]
         YModuleBeaconCallback = Union[Callable, None]
+        YTraceCallback = Union[Callable, None]
     YModuleLogCallback = YDeviceLogCallback
     YModuleConfigChangeCallback = YDeviceUpdateCallback
 
@@ -2580,6 +3038,8 @@ class YDevice:
     _funcIds: list[Union[str, None]]
     _cacheExpiration: int
     _cache_json: Union[xdict, None]
+    _liveConnID: str  # hub connection during which _cache_json is kept up-to-date by notifications
+    _liveExpiration: int  # timestamp of the next mandatory reload of _cache_json, in live mode
     _api_buff: Union[xbytearray, None]
     _upload_buff: Union[xbytearray, None]
     lastTimeRef: float
@@ -2606,6 +3066,8 @@ class YDevice:
         self._funcIds = funcIds
         self._cacheExpiration = 0
         self._cache_json = None
+        self._liveConnID = ''
+        self._liveExpiration = 0
         self._api_buff = None
         self._upload_buff = None
         self.lastTimeRef = 0
@@ -2628,6 +3090,12 @@ class YDevice:
     async def requestAPI(self) -> xdict:
         # This function raises an exception on error !
         self._ensureConnected()
+        if self._liveConnID:
+            # live copy is valid as long as no notification has been missed
+            hub: YGenericHub = self.hub
+            if self._liveConnID == hub._currentConnID and hub._isNotifWorking and not ticks_past(self._liveExpiration):
+                return self._cache_json
+            self._liveConnID = ''
         if ticks_past(self._cacheExpiration) or not self._cacheExpiration:
             reqUrl: str = "/api.json"
             if self._cache_json is not None:
@@ -2653,8 +3121,22 @@ class YDevice:
             except BaseException:
                 raise YAPI_Exception(YAPI.IO_ERROR, "Invalid JSON response")
             self._cacheExpiration = ticks_add(ticks_ms(), self.hub._yapi._defaultCacheValidity) | 1
+            liveValidity: int = self.hub._yapi._liveCacheValidity
+            if liveValidity > 0 and self.hub._isNotifWorking and self.hub._currentConnID:
+                self._liveConnID = self.hub._currentConnID
+                self._liveExpiration = ticks_add(ticks_ms(), liveValidity) | 1
         return self._cache_json
 
+    def _setLiveValue(self, funydx: int, value: str) -> None:
+        # Update the advertised value of a function in the live copy of /api.json
+        if not self._liveConnID or funydx >= len(self._funcIds):
+            return
+        funcId: Union[str, None] = self._funcIds[funydx]
+        if funcId:
+            node: Union[xdict, None] = self._cache_json.get(funcId)
+            if node is not None and 'advertisedValue' in node:
+                node['advertisedValue'] = value
+
     async def requestHTTPSync(self, reqUrl: str, body: Union[xarray, None], buff: Union[xbytearray, None] = None) -> ByteArrayLike:
         timeout: int = self.hub.networkTimeout
         if ("/testcb.txt" in reqUrl) or ("/logger.json" in reqUrl) or \
@@ -2669,10 +3151,16 @@ class YDevice:
         try:
             self._ensureConnected()
             res: ByteArrayLike = await self.hub.devRequestSync(yreq)
+        except BaseException as exc:
+            if yreq._trace is not None:
+                yreq._trace.complete(yreq.status, exc)
+            raise
         finally:
             if self._pendingReq == yreq:
                 # enable garbage collection asap
                 self._pendingReq = self._pendingReq.devNext
+        if yreq._trace is not None:
+            yreq._trace.complete(yreq.status, None)
         return res
 
     async def requestHTTPAsync(self, reqUrl: str, body: Union[xarray, None]) -> None:
@@ -2680,10 +3168,17 @@ class YDevice:
         try:
             self._ensureConnected()
             await self.hub.devRequestAsync(yreq)
+        except BaseException as exc:
+            if yreq._trace is not None:
+                yreq._trace.complete(yreq.status, exc)
+            raise
         finally:
             if self._pendingReq == yreq:
                 # enable garbage collection asap
                 self._pendingReq = self._pendingReq.devNext
+        if yreq._trace is not None:
+            # asynchronous requests are complete as soon as sent
+            yreq._trace.complete(yreq.status, None)
 
     async def initRequest(self, reqUrl: str, body: Union[xarray, None], msTimeout: int) -> YRequest:
         self._ensureConnected()
@@ -2691,6 +3186,9 @@ class YDevice:
         reqUrl = fmt % (self._networkUrl, reqUrl)
         method: str = "GET" if body is None else "POST"
         yreq: YRequest = self.hub.makeRequest(method, reqUrl, body, msTimeout)
+        tracer: Union[YTracer, None] = self.hub._yapi._tracer
+        if tracer is not None:
+            tracer.requestStart(yreq, self.hub, self._serial)
         if self._pendingReq:
             prevReq: YRequest = self._pendingReq
             while prevReq.devNext:
@@ -2698,6 +3196,8 @@ class YDevice:
             prevReq.devNext = yreq
             await prevReq.released()
         self._pendingReq = yreq
+        if yreq._trace is not None:
+            yreq._trace.queued()
         return yreq
 
     async def waitForPendingQueries(self) -> None:
@@ -2709,6 +3209,7 @@ class YDevice:
 
     def clearCache(self):
         self._cacheExpiration = 0
+        self._liveConnID = ''
 
     def setLastTimeRef(self, data: bytearray):
         sec: int = (data[0] & 0xff) + 0x100 * (data[1] & 0xff) + 0x10000 * (data[2] & 0xff) + 0x1000000 * (data[3] & 0xff)
@@ -2785,10 +3286,44 @@ if not _IS_MICROPYTHON:
         if eventLoop.is_closed():
             # Oops, original event loop is closed, we must recreate one to close sockets
             asyncio.run(yapi.FreeAPI())
+        elif eventLoop.is_running():
+            # event loop is owned by another thread (as used by the synchronous API)
+            future = asyncio.run_coroutine_threadsafe(yapi.FreeAPI(), eventLoop)
+            try:
+                future.result(yapi._networkTimeoutMs / 1000)
+            except Exception:
+                # do not hang nor complain at exit
+                future.cancel()
         else:
             eventLoop.run_until_complete(yapi.FreeAPI())
 
 
+    # Set an asyncio.Event from any thread. Asyncio objects are not thread-safe, so if
+    # the event is bound to a loop running in another thread, the call is deferred to it
+    def _setEvent(evt: asyncio.Event) -> None:
+        loop = getattr(evt, '_loop', None)
+        if loop is not None and not loop.is_closed():
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is not loop:
+                loop.call_soon_threadsafe(evt.set)
+                return
+        evt.set()
+else:
+    def _setEvent(evt: asyncio.Event) -> None:
+        evt.set()
+
+    # There are no threads in our MicroPython VM, locks are not needed
+    class _YNoLock:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc_val, exc_tb):
+            return None
+
+
 # --- (generated code: YAPIContext class start)
 # noinspection PyProtectedMember
 class YAPIContext:
@@ -2850,67 +3385,98 @@ class YAPIContext:
     _lastErrorMsg: str
     _hubs: list[YGenericHub]
     _registeredHubs: list[YGenericHub]  # List of hubs currently (Pre)Registered. TestHub should not add hub to this list
+    _callbackServers: list[YCallbackServer]  # servers waiting for hubs in HTTP or WebSocket callback mode
     _yhub_cache: dict[int, YHub]
     _pendingCallbacks: list[YPlugEv]
+    _indexLock: Any  # protects device and function indexes, read from any thread by the sync API
     _eventsBuff: xbytearray
     _eventsHead: int
     _eventsTail: int
+    _dataEvent: Union[asyncio.Event, None]  # set whenever a new event is pushed into _eventsBuff
+    _streamDispatch: int  # number of YEventStream iterators currently dispatching events
     _arrivalCallback: YDeviceUpdateCallback
     _namechgCallback: YDeviceUpdateCallback
     _removalCallback: YDeviceUpdateCallback
     _logCallback: YLogCallback
+    _tracer: Union[YTracer, None]  # collects timings and counters of the library internals, when enabled
     _ValueCallbackList: list[YFunction]
     _TimedReportCallbackList: list[YSensor]
     _moduleCallbackList: list[YModule]
     _deviceListValidityMs: int
     _networkTimeoutMs: int
+    _httpPoolSize: int  # default number of keep-alive connections per hub, for device requests
     _defaultCacheValidity: int
+    _liveCacheValidity: int  # max age of device /api.json kept up-to-date by notifications (0 = disabled)
     _networkSecurityOptions: int
     _sslContext: Union[SSLContext | None]
     _tasks: list[asyncio.Task]  # List of global asyncio background task objects
+    _watchdog: Union[RequestWatchdog, None]  # timeout handler for all hub requests
     _ExceptionsDisabled: bool
     # Device and functions hash tables
     _lastDevRef: int
     _devRecs: xlist  # white page records with corresponding yp records as sublists
     _devRecBySn: dict[str, xdict]  # hash table of devRec, by serial number, for connected devices
+    _devSnByName: dict[str, list[str]]  # serial numbers of connected devices, by logical name
+    _hwIdsByName: dict[str, list[HwId]]  # connected functions, by logical name
+    _hwIdsByClass: dict[str, list[HwId]]  # connected functions (and modules), by class, in enumeration order
+    _hwIdPosByClass: dict[str, dict[HwId, int]]  # position of each HwId in the _hwIdsByClass lists
     _devsBySn: dict[str, YDevice]  # hash table of instantiated devices, by serial number (kept on disconnect)
     _devsByRef: dict[int, YDevice]  # hash table of devices, by unique identifier (kept on disconnect)
     _connectedFns: dict[HwId, YFunction]  # functions requested and available, by Hardware Id
     _requestedFns: dict[str, YFunction]  # functions requested but not yet known, by any type of name
+    if _IS_MICROPYTHON:
+        _attrBatches: dict[str, YAttrBatch]  # attribute batches currently open, by device serial number
     # Attributes below are not used in YoctoHubs (global certificates, no SSDP client for now)
     if not _IS_MICROPYTHON:
         _trustedCertificate: list[str]
         _ssdp: Union[YSSDP, None]
         _HubDiscoveryCallback: YHubDiscoveryCallback
+        _dataMirror: Union[YDataLoggerMirror, None]  # local copy of datalogger streams, if enabled
+        _simulators: list[YHubSimulator]  # hub simulators started for sim:// URLs
 
     def __init__(self):
         self._ExceptionsDisabled = False
         self._lastErrorType = 0
         self._lastErrorMsg = ''
-        self._eventsBuff = xbytearray(4096)
+        if _IS_MICROPYTHON:
+            self._eventsBuff = xbytearray(4096)
+        else:
+            # a bare memoryview provides the same interface, without the cost of xarray emulation
+            self._eventsBuff = memoryview(bytearray(4096))
         self._deviceListValidityMs = 10000
         self._networkTimeoutMs = 20000
+        self._httpPoolSize = _HTTP_POOL_SIZE
         self._defaultCacheValidity = 5
+        self._liveCacheValidity = 0
         self._tasks = []
+        if _IS_MICROPYTHON:
+            self._attrBatches = {}
+        self._tracer = None
         if not _IS_MICROPYTHON:
             self._trustedCertificate = []
             self._ssdp = None
+            self._dataMirror = None
         self.resetContext()
 
     def resetContext(self):
         if not _IS_MICROPYTHON:
             self._trustedCertificate = []
             self._HubDiscoveryCallback = None
+            self._simulators = []
             if self._ssdp:
                 self._ssdp.reset()
         self._apiMode = 0
         self._atexit = None
+        self._watchdog = None
         self._hubs = []
         self._registeredHubs = []
+        self._callbackServers = []
         self._yhub_cache = OrderedDict()
         self._pendingCallbacks = []
         self._eventsHead = 0
         self._eventsTail = 0
+        self._dataEvent = None
+        self._streamDispatch = 0
         self._arrivalCallback = None
         self._namechgCallback = None
         self._removalCallback = None
@@ -2920,9 +3486,17 @@ class YAPIContext:
         self._moduleCallbackList = []
         self._networkSecurityOptions = 0
         # Device and functions hash tables
+        if _IS_MICROPYTHON:
+            self._indexLock = _YNoLock()
+        else:
+            self._indexLock = threading.RLock()
         self._lastDevRef = 0
         self._devRecs = xlist()
         self._devRecBySn = {}
+        self._devSnByName = {}
+        self._hwIdsByName = {}
+        self._hwIdsByClass = {}
+        self._hwIdPosByClass = {}
         self._devsBySn = {}
         self._devsByRef = {}
         self._connectedFns = {}
@@ -2952,6 +3526,11 @@ class YAPIContext:
         self._tasks.append(task)
         return task
 
+    def _getWatchdog(self) -> RequestWatchdog:
+        if self._watchdog is None:
+            self._watchdog = RequestWatchdog(self.create_task)
+        return self._watchdog
+
     # Default encoding when exchanging data through the Yoctopuce API
     DefaultEncoding: str = "latin-1"
 
@@ -3105,22 +3684,13 @@ class YAPIContext:
                                  _PUBVAL_4RAWBYTES,
                                  _PUBVAL_5RAWBYTES,
                                  _PUBVAL_6RAWBYTES):
-                # 1..5 hex bytes
-                for i in range(funcValType):
-                    c: int = funcval[ofs] & 0xff
-                    ofs += 1
-                    b: int = c >> 4
-                    buffer += b + ord('a') if b > 9 else b + ord('0')
-                    b = c & 0xf
-                    buffer += b + ord('a') if b > 9 else b + ord('0')
+                # 1..6 hex bytes
+                return binascii.hexlify(funcval[ofs:ofs + funcValType]).decode('ascii')
             elif funcValType in (_PUBVAL_C_LONG,
                                  _PUBVAL_YOCTO_FLOAT_E3):
                 # 32bit integer in little endian format or Yoctopuce 10-3 format
-                numVal: int = funcval[ofs] & 0xff
-                numVal += (funcval[ofs + 1] & 0xff) << 8
-                numVal += (funcval[ofs + 2] & 0xff) << 16
-                numVal += (funcval[ofs + 3] & 0xff) << 24
-                if numVal & 0x8000000:
+                numVal: int = int.from_bytes(funcval[ofs:ofs + 4], 'little')
+                if numVal & 0x80000000:
                     numVal -= 0x100000000
                 if funcValType == _PUBVAL_C_LONG:
                     return "%d" % numVal
@@ -3131,18 +3701,14 @@ class YAPIContext:
                         endp -= 1
                     if endp > 0 and buffer[endp - 1] == '.':
                         endp -= 1
-                        buffer = buffer[:endp]
-                    return buffer
+                    return buffer[:endp]
             elif funcValType == _PUBVAL_C_FLOAT:
                 # 32bit (short) float
-                v = funcval[ofs]
-                v += funcval[ofs + 1] << 8
-                v += funcval[ofs + 2] << 16
-                v += funcval[ofs + 3] << 24
-                if v & 0x8000000:
-                    v -= 0x100000000
-                fraction = (v & ((1 << 23) - 1)) + (1 << 23) * (v >> 31 | 1)
-                exp = (v >> 23 & 0xFF) - 127
+                v: int = int.from_bytes(funcval[ofs:ofs + 4], 'little')
+                fraction: int = (v & ((1 << 23) - 1)) + (1 << 23)
+                if v & 0x80000000:
+                    fraction = -fraction
+                exp: int = (v >> 23 & 0xFF) - 127
                 floatVal: float = fraction * pow(2, exp - 23)
                 buffer = "%.6f" % floatVal
                 endp: int = len(buffer)
@@ -3150,8 +3716,7 @@ class YAPIContext:
                     endp -= 1
                 if endp > 0 and buffer[endp - 1] == '.':
                     endp -= 1
-                    buffer = buffer[:endp]
-                return buffer
+                return buffer[:endp]
             else:
                 return "?"
         # Legacy handling: just pad with NUL up to 7 chars
@@ -3234,9 +3799,9 @@ class YAPIContext:
         return xbytearray(binascii.unhexlify(hex_str))
 
     def _findDevRecByName(self, logicalName: str) -> Union[xdict, None]:
-        for devrec in self._devRecBySn.values():
-            if devrec["logicalName"] == logicalName:
-                return devrec
+        serials: Union[list[str], None] = self._devSnByName.get(logicalName)
+        if serials:
+            return self._devRecBySn.get(serials[0])
         return None
 
     def _findFunRecByHwId(self, hwid: HwId) -> Union[xdict, None]:
@@ -3248,20 +3813,88 @@ class YAPIContext:
         return None
 
     def _resolveFuncName(self, className: str, logicalName: str) -> Union[HwId, None]:
-        if className in _YOCTO_BASETYPES:
-            for serial, devrec in self._devRecBySn.items():
-                for funrec in devrec["yellowPages"]:
-                    if funrec["logicalName"] == logicalName:
-                        if className == "Function" or funrec["baseType"] == className:
-                            return HwId(serial, funrec["functionId"])
-        else:
-            for serial, devrec in self._devRecBySn.items():
-                for funrec in devrec["yellowPages"]:
-                    if funrec["logicalName"] == logicalName:
-                        if funrec["functionType"] == className:
-                            return HwId(serial, funrec["functionId"])
+        hwids: Union[list[HwId], None] = self._hwIdsByName.get(logicalName)
+        if hwids:
+            members: Union[dict[HwId, int], None] = self._hwIdPosByClass.get(className)
+            if members:
+                for hwid in hwids:
+                    if hwid in members:
+                        return hwid
         return None
 
+    # Lookup indexes maintenance. Enumeration lists by class are kept in the same order
+    # as _devRecBySn, so that FirstX()/nextX() order does not depend on the indexes
+    @staticmethod
+    def _addToIndex(index: dict, key: str, value: Union[str, HwId]) -> None:
+        entries: Union[list, None] = index.get(key)
+        if entries is None:
+            index[key] = [value]
+        else:
+            entries.append(value)
+
+    @staticmethod
+    def _removeFromIndex(index: dict, key: str, value: Union[str, HwId]) -> None:
+        entries: Union[list, None] = index.get(key)
+        if entries and value in entries:
+            entries.remove(value)
+            if not entries:
+                del index[key]
+
+    def _renameInIndex(self, index: dict, oldName: str, newName: str, value: Union[str, HwId]) -> None:
+        if oldName == newName:
+            return
+        if oldName:
+            self._removeFromIndex(index, oldName, value)
+        if newName:
+            self._addToIndex(index, newName, value)
+
+    def _appendToClass(self, className: str, hwid: HwId) -> None:
+        hwids: Union[list[HwId], None] = self._hwIdsByClass.get(className)
+        if hwids is None:
+            hwids = []
+            self._hwIdsByClass[className] = hwids
+            self._hwIdPosByClass[className] = {}
+        self._hwIdPosByClass[className][hwid] = len(hwids)
+        hwids.append(hwid)
+
+    def _indexDevice(self, serial: str, devrec: xdict) -> None:
+        self._appendToClass("Module", HwId(serial, 'module'))
+        lname: str = devrec["logicalName"]
+        if lname:
+            self._addToIndex(self._devSnByName, lname, serial)
+        for funrec in devrec["yellowPages"]:
+            hwid: HwId = HwId(serial, funrec["functionId"])
+            functionType: str = funrec["functionType"]
+            baseType: str = funrec["baseType"]
+            self._appendToClass("Function", hwid)
+            if baseType != "Function":
+                self._appendToClass(baseType, hwid)
+            if functionType != baseType:
+                self._appendToClass(functionType, hwid)
+            lname = funrec["logicalName"]
+            if lname:
+                self._addToIndex(self._hwIdsByName, lname, hwid)
+
+    def _unindexDevice(self, serial: str, devrec: xdict) -> None:
+        self._removeFromIndex(self._devSnByName, devrec["logicalName"], serial)
+        classes: list[str] = ["Module", "Function"]
+        for funrec in devrec["yellowPages"]:
+            self._removeFromIndex(self._hwIdsByName, funrec["logicalName"], HwId(serial, funrec["functionId"]))
+            for className in (funrec["baseType"], funrec["functionType"]):
+                if className not in classes:
+                    classes.append(className)
+        for className in classes:
+            hwids: Union[list[HwId], None] = self._hwIdsByClass.get(className)
+            if hwids is None:
+                continue
+            hwids = [hwid for hwid in hwids if hwid.module != serial]
+            if hwids:
+                self._hwIdsByClass[className] = hwids
+                self._hwIdPosByClass[className] = {hwid: pos for pos, hwid in enumerate(hwids)}
+            else:
+                del self._hwIdsByClass[className]
+                del self._hwIdPosByClass[className]
+
     def _storeServices(self, hubRef: int, wprec: xdict, isNew: bool, yp: xdict) -> bool:
         serial: str = sys.intern(wprec["serialNumber"])
         lname: str = sys.intern(wprec["logicalName"])
@@ -3269,6 +3902,7 @@ class YAPIContext:
         # create or update device record
         newrec: Union[dict, None] = None
         devrec: Union[xdict, None] = self._devRecBySn.get(serial)
+        indexed: bool = devrec is not None
         if not devrec:
             isNew = True
             # Check if we can reuse an existing (inactive) devrec
@@ -3287,10 +3921,13 @@ class YAPIContext:
                 dev.hub = self.getGenHub(hubRef)
             devrec["hubRef"] = hubRef
             devrec["networkUrl"] = wprec["networkUrl"][:-4]
+            if indexed:
+                self._renameInIndex(self._devSnByName, devrec["logicalName"], lname, serial)
             devrec["logicalName"] = lname
         else:
             # Update information about connected device
             if devrec["logicalName"] != lname:
+                self._renameInIndex(self._devSnByName, devrec["logicalName"], lname, serial)
                 devrec["logicalName"] = lname
                 ischg = True
         devrec["index"] = wprec["index"]
@@ -3338,10 +3975,15 @@ class YAPIContext:
                     idx += 1
                 if idx >= len(yprecs):
                     continue
-                funrec["logicalName"] = sys.intern(yprec["logicalName"])
+                fname: str = sys.intern(yprec["logicalName"])
+                if indexed and funrec["logicalName"] != fname:
+                    self._renameInIndex(self._hwIdsByName, funrec["logicalName"], fname, HwId(serial, funcid))
+                funrec["logicalName"] = fname
                 funrec["advertisedValue"] = yprec["advertisedValue"]
                 idx += 1
         if isNew:
+            if not indexed:
+                self._indexDevice(serial, devrec)
             self._devRecBySn[serial] = devrec
             self._Log("HUB: device " + serial + " has been plugged")
             self._pushPlugEvent(serial)
@@ -3351,140 +3993,110 @@ class YAPIContext:
 
     # Remove a device by serial from all hash tables
     def _forgetDevice(self, serial: str):
-        try:
-            del self._devRecBySn[serial]
-        except KeyError:
-            pass
+        with self._indexLock:
+            devrec: Union[xdict, None] = self._devRecBySn.pop(serial, None)
+            if devrec is not None:
+                self._unindexDevice(serial, devrec)
 
     def _resolve(self, className: str, func: str) -> HwId:
         # Find the HwId for the specified function, if currently connected.
         # If device is not known as connected, return a clean error.
         # This function will not cause any network access.
-        parts: list[str] = func.split('.')
-        serial: str = parts[0]
-        funcid: str
-        if className == 'Module':
-            # Special case: retrieve a module object
-            funcid = 'module'
-        elif len(parts) == 1:
-            # Typical case: func is the logical name of a function
-            hwid = self._resolveFuncName(className, func)
-            if hwid:
-                return hwid
-            # fallback to assuming that func is a logical name or serial number of a module
-            # with an implicit function name (like serial.module for instance)
-            funcid = className[0].lower() + className[1:]
-        else:
-            # Second case: func is in the form: device_id.function_id
-            funcid = parts[1]
-        if serial:
-            devrec: Union[xdict, None] = self._devRecBySn.get(serial)
-            if not devrec:
-                # Might actually be a device name rather than a serial
-                devrec = self._findDevRecByName(serial)
-                if devrec:
-                    serial = devrec['serialNumber']
-                else:
-                    if self._hubs:
-                        errmsg = "Device [%s] not online" % serial
+        with self._indexLock:
+            parts: list[str] = func.split('.')
+            serial: str = parts[0]
+            funcid: str
+            if className == 'Module':
+                # Special case: retrieve a module object
+                funcid = 'module'
+            elif len(parts) == 1:
+                # Typical case: func is the logical name of a function
+                hwid = self._resolveFuncName(className, func)
+                if hwid:
+                    return hwid
+                # fallback to assuming that func is a logical name or serial number of a module
+                # with an implicit function name (like serial.module for instance)
+                funcid = className[0].lower() + className[1:]
+            else:
+                # Second case: func is in the form: device_id.function_id
+                funcid = parts[1]
+            if serial:
+                devrec: Union[xdict, None] = self._devRecBySn.get(serial)
+                if not devrec:
+                    # Might actually be a device name rather than a serial
+                    devrec = self._findDevRecByName(serial)
+                    if devrec:
+                        serial = devrec['serialNumber']
                     else:
-                        errmsg = "No hub has been registered"
-                    raise YAPI_Exception(YAPI.DEVICE_NOT_FOUND, errmsg)
-            if funcid == 'module':
-                return HwId(serial, funcid)
-            for funrec in devrec["yellowPages"]:
-                if funrec["functionId"] == funcid:
-                    return HwId(serial, funcid)
-                if funrec["logicalName"] == funcid:
-                    return HwId(serial, funrec["functionId"])
-        else:
-            # serial is empty (ie ".temperature")
-            for serial, devrec in self._devRecBySn.items():
-                for funrec in devrec["yellowPages"]:
-                    if funrec["functionId"] == funcid:
-                        return HwId(serial, funcid)
-        raise YAPI_Exception(YAPI.DEVICE_NOT_FOUND,
-                             "No function [%s] found on device [%s]" % (funcid, serial))
+                        if self._hubs:
+                            errmsg = "Device [%s] not online" % serial
+                        else:
+                            errmsg = "No hub has been registered"
+                        raise YAPI_Exception(YAPI.DEVICE_NOT_FOUND, errmsg)
+                hwid: HwId = HwId(serial, funcid)
+                if funcid == 'module' or hwid in self._hwIdPosByClass.get("Function", {}):
+                    return hwid
+                for hwid in self._hwIdsByName.get(funcid, ()):
+                    if hwid.module == serial:
+                        return hwid
+            else:
+                # serial is empty (ie ".temperature")
+                for hwid in self._hwIdsByClass.get("Function", ()):
+                    if hwid.function == funcid:
+                        return hwid
+            raise YAPI_Exception(YAPI.DEVICE_NOT_FOUND,
+                                 "No function [%s] found on device [%s]" % (funcid, serial))
 
     def _addToCache(self, className: str, func: str, yfunc: YFunction):
-        try:
-            hwid: HwId = self._resolve(className, func)
-            self._connectedFns[hwid] = yfunc
-        except YAPI_Exception:
-            self._requestedFns[func] = yfunc
+        with self._indexLock:
+            try:
+                hwid: HwId = self._resolve(className, func)
+                self._connectedFns[hwid] = yfunc
+            except YAPI_Exception:
+                self._requestedFns[func] = yfunc
 
     def _findInCache(self, className: str, func: str) -> Union[YFunction, None]:
-        try:
-            hwid: HwId = self._resolve(className, func)
-            # the function has been located on a device
-            fn: YFunction = self._connectedFns.get(hwid)
-            if fn:
-                return fn
-            fn = self._requestedFns.get(func)
-            if fn:
-                self._connectedFns[hwid] = fn
-                del self._requestedFns[func]
-                return fn
-        except YAPI_Exception:
-            # The function is still abstract. At this point we don't know
-            # if func is a true HwId or not, test for removal just in case
-            if '.' in func:
-                hwid: HwId = str2hwid(func)
-                if hwid in self._connectedFns:
-                    del self._connectedFns[hwid]
-            if func in self._requestedFns:
-                del self._requestedFns[func]
-        return None
+        with self._indexLock:
+            try:
+                hwid: HwId = self._resolve(className, func)
+                # the function has been located on a device
+                fn: YFunction = self._connectedFns.get(hwid)
+                if fn:
+                    return fn
+                fn = self._requestedFns.get(func)
+                if fn:
+                    self._connectedFns[hwid] = fn
+                    del self._requestedFns[func]
+                    return fn
+            except YAPI_Exception:
+                # The function is still abstract. At this point we don't know
+                # if func is a true HwId or not, test for removal just in case
+                if '.' in func:
+                    hwid: HwId = str2hwid(func)
+                    if hwid in self._connectedFns:
+                        del self._connectedFns[hwid]
+                if func in self._requestedFns:
+                    del self._requestedFns[func]
+            return None
 
     def _firstHwId(self, className: str) -> Union[HwId, None]:
-        if className == "Module":
-            for serial in self._devRecBySn.keys():
-                return HwId(serial, 'module')
-        elif className in _YOCTO_BASETYPES:
-            for serial, devrec in self._devRecBySn.items():
-                for funrec in devrec["yellowPages"]:
-                    if className == "Function" or funrec["baseType"] == className:
-                        return HwId(serial, funrec["functionId"])
-        else:
-            for serial, devrec in self._devRecBySn.items():
-                for funrec in devrec["yellowPages"]:
-                    if funrec["functionType"] == className:
-                        return HwId(serial, funrec["functionId"])
-        return None
+        with self._indexLock:
+            hwids: Union[list[HwId], None] = self._hwIdsByClass.get(className)
+            if hwids:
+                return hwids[0]
+            return None
 
     def _nextHwId(self, className: str, hwid: Union[HwId, None]) -> Union[HwId, None]:
-        if not hwid:
-            return None
-        currSerial: str = hwid.module
-        currFunctionId: str = hwid.function
-        found: bool = False
-        if className == "Module":
-            for serial in self._devRecBySn.keys():
-                if found:
-                    return HwId(serial, 'module')
-                else:
-                    found |= serial == currSerial
-        elif className in _YOCTO_BASETYPES:
-            for serial, devrec in self._devRecBySn.items():
-                if not found and serial != currSerial:
-                    continue
-                for funrec in devrec["yellowPages"]:
-                    if found:
-                        if className == "Function" or funrec["baseType"] == className:
-                            return HwId(serial, funrec["functionId"])
-                    else:
-                        found |= funrec["functionId"] == currFunctionId
-        else:
-            for serial, devrec in self._devRecBySn.items():
-                if not found and serial != currSerial:
-                    continue
-                for funrec in devrec["yellowPages"]:
-                    if found:
-                        if funrec["functionType"] == className:
-                            return HwId(serial, funrec["functionId"])
-                    else:
-                        found |= funrec["functionId"] == currFunctionId
-        return None
+        with self._indexLock:
+            if not hwid:
+                return None
+            hwids: Union[list[HwId], None] = self._hwIdsByClass.get(className)
+            if not hwids:
+                return None
+            pos: Union[int, None] = self._hwIdPosByClass[className].get(hwid)
+            if pos is None or pos + 1 >= len(hwids):
+                return None
+            return hwids[pos + 1]
 
     # Return a Device object for a specified serial number or logical device name,
     # if the device is known from past enumerations. Otherwise, return None.
@@ -3499,15 +4111,12 @@ class YAPIContext:
         # - a device by logical name
         found: Union[xdict, None] = self._devRecBySn.get(serialOrName)
         if not found:
-            for serial, devrec in self._devRecBySn.items():
-                if devrec["logicalName"] == serialOrName:
-                    dev = self._devsBySn.get(serial)
-                    if dev:
-                        return dev
-                    found = devrec
-                    break
-        if not found:
-            return None
+            found = self._findDevRecByName(serialOrName)
+            if not found:
+                return None
+            dev = self._devsBySn.get(found["serialNumber"])
+            if dev:
+                return dev
         # Build the list of function ids by funydx
         funcIds = []
         nfun = 0
@@ -3596,14 +4205,14 @@ class YAPIContext:
                 # function value ydx (tiny notification)
                 recipient: Union[YFunction, None] = ydev.callbackDict.get(funydx)
                 if recipient:
-                    retval = recipient._valueCallback(recipient, evb[4:].decode('latin-1'))
+                    retval = recipient._invokeValueCallback(evb[4:].decode('latin-1'))
             elif evb[0] == _NOTIFY_NETPKT_FUNCV2YDX:
                 # function value ydx (tiny notification)
                 recipient: Union[YFunction, None] = ydev.callbackDict.get(funydx)
                 if recipient:
                     rawval: Union[bytearray, None] = self.decodeNetFuncValV2(evb[4:])
                     if rawval:
-                        retval = recipient._valueCallback(recipient, self.decodePubVal(rawval[0], rawval, 1, 6))
+                        retval = recipient._invokeValueCallback(self.decodePubVal(rawval[0], rawval, 1, 6))
             elif evb[0] in (_NOTIFY_NETPKT_TIMEVALYDX, _NOTIFY_NETPKT_TIMEAVGYDX, _NOTIFY_NETPKT_TIMEV2YDX):
                 if funydx == 0xf:
                     ydev.setLastTimeRef(evb[5:])
@@ -3611,7 +4220,7 @@ class YAPIContext:
                     recipient: Union[YSensor, None] = ydev.callbackDict.get(funydx + _TIMED_REPORT_SHIFT)
                     if recipient:
                         value: YMeasure = recipient._decodeTimedReport(ydev.lastTimeRef, ydev.lastDuration, evb[4:])
-                        retval = recipient._timedReportCallback(recipient, value)
+                        retval = recipient._invokeTimedReportCallback(value)
             elif evb[0] == _NOTIFY_NETPKT_CONFCHGYDX:
                 recipient: Union[YModule, None] = ydev.callbackDict.get('name')
                 if recipient:
@@ -3623,6 +4232,23 @@ class YAPIContext:
                     retval = recipient._beaconCallback(recipient, evb[3])
         return recipient, retval
 
+    # invoke callbacks for one event, as returned by _nextDataEvent()
+    async def _dispatchEvent(self, evb: bytearray) -> None:
+        recipient = None
+        error: Union[Exception, None] = None
+        tracer: Union[YTracer, None] = self._tracer
+        startNs: int = time.perf_counter_ns() if tracer is not None else 0
+        try:
+            recipient, retval = self._handleEvent(evb)
+            if asyncio.iscoroutine(retval):
+                await retval
+        # noinspection PyBroadException
+        except Exception as exc:
+            error = exc
+            self._logCbError(evb[0], recipient, exc)
+        if tracer is not None:
+            tracer.eventDispatched(evb[0], recipient, startNs, error)
+
     # common logging code for all callback exceptions
     def _logCbError(self, event: int, recipient, exc: Exception):
         cbname: str = 'callback'
@@ -3716,6 +4342,41 @@ class YAPIContext:
             newhead: int = head + evtlen
             xbuff[head:newhead] = decodedEvent
             self._eventsHead = newhead % buflen
+        # wake up Sleep() without waiting for the end of its time slice
+        self._signalEvents()
+
+    def _signalEvents(self) -> None:
+        if self._dataEvent:
+            _setEvent(self._dataEvent)
+
+    async def _waitDataEvent(self, ms_duration: int) -> None:
+        # Wait until an event is pushed by a hub, or until the delay has expired.
+        # Returns at once if events are already pending, including events pushed
+        # after the caller checked _nextDataEvent() from another thread
+        evt: Union[asyncio.Event, None] = self._dataEvent
+        if not _IS_MICROPYTHON and evt is not None:
+            # CPython events are bound to the loop they were first used in
+            if getattr(evt, '_loop', None) not in (None, asyncio.get_running_loop()):
+                evt = None
+        if evt is None:
+            evt = asyncio.Event()
+            self._dataEvent = evt
+        evt.clear()
+        if self._eventsHead != self._eventsTail:
+            return
+        try:
+            if _IS_MICROPYTHON:
+                await asyncio.wait_for_ms(evt.wait(), ms_duration)  # noqa
+            else:
+                await asyncio.wait_for(evt.wait(), ms_duration / 1000.0)
+        except asyncio.TimeoutError:
+            pass
+
+    # Detach the list of pending plug/unplug/change events, to dispatch them
+    def _takePendingCallbacks(self) -> list[YPlugEv]:
+        res: list[YPlugEv] = self._pendingCallbacks
+        self._pendingCallbacks = []
+        return res
 
     def _nextDataEvent(self) -> Union[bytearray, None]:
         xbuff: xbytearray = self._eventsBuff
@@ -3764,6 +4425,13 @@ class YAPIContext:
                 return
             if evc in (_NOTIFY_NETPKT_FUNCVALYDX, _NOTIFY_NETPKT_FUNCV2YDX):
                 # print("look notification for %d:%d ->%s " % (devydx, funydx, serial))
+                if ydev._liveConnID:
+                    if evc == _NOTIFY_NETPKT_FUNCVALYDX:
+                        ydev._setLiveValue(funydx, bytes(evb[3:]).decode('latin-1'))
+                    else:
+                        rawval: Union[bytearray, None] = self.decodeNetFuncValV2(bytes(evb[3:]))
+                        if rawval:
+                            ydev._setLiveValue(funydx, self.decodePubVal(rawval[0], rawval, 1, 6))
                 if ydev.callbackDict.get(funydx):
                     devRef: int = ydev.ref
                     decodedEvent = bytearray(len(evb) + 1)
@@ -3787,12 +4455,13 @@ class YAPIContext:
                         decodedEvent[4] = 2
                     else:
                         decodedEvent[4] = 0 if evc == _NOTIFY_NETPKT_TIMEVALYDX else 1
-                    for i in range(tlen):
-                        decodedEvent[5 + i] = int(evb[i * 2 + 3:i * 2 + 5].tobytes(), 16)
+                    decodedEvent[5:] = binascii.unhexlify(evb[3:3 + 2 * tlen])
                     self._pushDataEvent(decodedEvent)
             elif evc == _NOTIFY_NETPKT_DEVLOGYDX:
                 ydev.triggerLogPull()
             elif evc == _NOTIFY_NETPKT_CONFCHGYDX:
+                # settings have changed, the live copy of /api.json must be reloaded
+                ydev._liveConnID = ''
                 if ydev.callbackDict.get("name"):
                     devRef: int = ydev.ref
                     decodedEvent = bytearray(4)
@@ -3811,6 +4480,8 @@ class YAPIContext:
                 if notype == _NOTIFY_NETPKT_FUNCVAL:
                     # function value (long notification)
                     funydx: int = ydev.getFunYdxByFuncId(name)
+                    if funydx >= 0:
+                        ydev._setLiveValue(funydx, value)
                     if ydev.callbackDict.get(funydx):
                         devRef: int = ydev.ref
                         decodedEvent = bytearray(4 + len(value))
@@ -3823,6 +4494,7 @@ class YAPIContext:
                         self._pushDataEvent(decodedEvent)
                 else:
                     # device name change, beacon change (also during arrival)
+                    ydev._liveConnID = ''
                     if ydev.callbackDict.get("name"):
                         new_beacon: int = int(value)
                         if ydev._beacon != new_beacon:
@@ -3835,11 +4507,17 @@ class YAPIContext:
                             decodedEvent[3] = new_beacon
                             self._pushDataEvent(decodedEvent)
                             ydev._beacon = new_beacon
+            elif notype in (_NOTIFY_NETPKT_FUNCNAME, _NOTIFY_NETPKT_FUNCNAMEYDX):
+                # function name change, the live copy of /api.json must be reloaded
+                serial = evb[5:].tobytes().decode('latin-1').split(",")[0]
+                ydev: Union[YDevice, None] = self._devsBySn.get(serial)
+                if ydev:
+                    ydev._liveConnID = ''
 
     async def _UpdateValueCallbackList(self, func: YFunction, add: bool):
         if func._hwId or await func.isOnline():
-            # isOnline always sets _hwId when it succeeds
-            ydev: Union[YDevice, None] = self._devsBySn.get(func._hwId.module)
+            # isOnline always sets _hwId when it succeeds, the device may not be instantiated yet
+            ydev: Union[YDevice, None] = self._getDevice(func._hwId.module)
             if ydev is not None:
                 funydx: int = ydev.getFunYdxByFuncId(func._hwId.function)
                 if funydx >= 0:
@@ -3855,7 +4533,7 @@ class YAPIContext:
     async def _UpdateTimedReportCallbackList(self, func: YSensor, add: bool):
         if func._hwId or await func.isOnline():
             # isOnline always sets _hwId when it succeeds
-            ydev: Union[YDevice, None] = self._devsBySn.get(func._hwId.module)
+            ydev: Union[YDevice, None] = self._getDevice(func._hwId.module)
             if ydev is not None:
                 funydx: int = ydev.getFunYdxByFuncId(func._hwId.function)
                 if funydx >= 0:
@@ -3881,7 +4559,7 @@ class YAPIContext:
 
     async def _UpdateModuleCallbackList(self, module: YModule, add: bool):
         if module._hwId or await module.isOnline():
-            ydev: Union[YDevice, None] = self._devsBySn.get(module._hwId.module)
+            ydev: Union[YDevice, None] = self._getDevice(module._hwId.module)
             if ydev is not None:
                 ydev.callbackDict['name'] = module if add else None
                 return
@@ -3914,9 +4592,21 @@ class YAPIContext:
                 #        For now we use VirtualHub
                 self._Log("Warning: USB support not yet available, using VirtualHub on 127.0.0.1", True)
                 url = "127.0.0.1"
+        registeredUrl: str = url
+        if url.startswith("sim://"):
+            if _IS_MICROPYTHON:
+                return YAPI.NOT_SUPPORTED
+            # connect to a local hub simulator, started on demand
+            try:
+                url = await self._startHubSimulator(url)
+            except YAPI_Exception as e:
+                errmsg.value = e.errorMessage
+                self._lastErrorType = e.errorType
+                self._lastErrorMsg = errmsg.value
+                return e.errorType
         parsedUrl = YUrl(url, _YOCTO_DEFAULT_PORT, _YOCTO_DEFAULT_HTTPS_PORT)
-        if parsedUrl.host == "callback":
-            errmsg.value = "callback mode not supported"
+        if parsedUrl.host == "callback" and parsedUrl.proto not in ("auto", "ws", "http"):
+            errmsg.value = "secure callback mode is not supported"
             return YAPI.NOT_SUPPORTED
         # if not yet done, setup an atexit handler to free API if user forget to do it
         if not self._atexit:
@@ -3926,6 +4616,9 @@ class YAPIContext:
                 eventloop = asyncio.get_running_loop()
                 self._atexit = lambda: _freeAPI(self, eventloop)
             atexit.register(self._atexit)
+        if parsedUrl.host == "callback":
+            # hubs will connect to us: make sure we are listening
+            return await self._startCallbackServer(parsedUrl, errmsg)
         # setup requested hub
         hub: Union[YGenericHub, None] = None
         for scanHub in self._hubs:
@@ -3938,6 +4631,7 @@ class YAPIContext:
             hub = YGenericHub(self, parsedUrl)
             if desiredState >= _HUB_PREREGISTERED:
                 hub.addKnownURL(parsedUrl)
+                hub._registeredUrl = registeredUrl
                 self._updateRegisteredHubs(hub, True)
             self._hubs.append(hub)
         else:
@@ -3945,6 +4639,7 @@ class YAPIContext:
                 self._Log("Registering existing hub: %s old=%s (%s)" % (parsedUrl.getUrl(YUrl.PROTO), hub._urlInfo.getUrl(YUrl.PROTO), hub._hubSerial))
             if desiredState >= _HUB_PREREGISTERED:
                 hub.updateUrl(parsedUrl)
+                hub._registeredUrl = registeredUrl
                 self._updateRegisteredHubs(hub, True)
         # Trigger hub attachment
         try:
@@ -3969,6 +4664,30 @@ class YAPIContext:
             self._lastErrorMsg = errmsg.value
         return res
 
+    async def _startCallbackServer(self, urlInfo: YUrl, errmsg: YRefParam) -> int:
+        for server in self._callbackServers:
+            if server.matchUrl(urlInfo):
+                return YAPI.SUCCESS
+        server: YCallbackServer = YCallbackServer(self, urlInfo)
+        try:
+            await server.start()
+        except OSError as exc:
+            errmsg.value = 'Unable to listen for callbacks on port %d (%s)' % (urlInfo.port, str(exc))
+            self._lastErrorType = YAPI.IO_ERROR
+            self._lastErrorMsg = errmsg.value
+            return YAPI.IO_ERROR
+        self._callbackServers.append(server)
+        return YAPI.SUCCESS
+
+    # Start the hub simulator of a sim:// URL if needed, and return the URL to connect to it
+    async def _startHubSimulator(self, url: str) -> str:
+        from .yocto_simulator import YHubSimulator  # loaded on demand, as it is only needed for tests
+        sim: YHubSimulator = YHubSimulator._FromUrl(url)
+        if sim not in self._simulators:
+            await sim.start()
+            self._simulators.append(sim)
+        return sim.get_url()
+
     # Check if a given connected YGenericHub should be used as the primary hub object
     # Update the internal list of hubs on the fly if hubs need to be merged
     #
@@ -3998,6 +4717,22 @@ class YAPIContext:
         return hub
 
     async def _removeHub(self, url: str) -> None:
+        if not _IS_MICROPYTHON:
+            if url.startswith("sim://"):
+                if not self._simulators:
+                    return
+                from .yocto_simulator import YHubSimulator
+                sim: Union[YHubSimulator, None] = YHubSimulator.FindSimulator(YHubSimulator._NameFromUrl(url))
+                if sim is None or sim not in self._simulators:
+                    return
+                url = sim.get_url()
+        parsedUrl = YUrl(url, _YOCTO_DEFAULT_PORT, _YOCTO_DEFAULT_HTTPS_PORT)
+        if parsedUrl.host == "callback":
+            for server in self._callbackServers:
+                if server.matchUrl(parsedUrl):
+                    self._callbackServers.remove(server)
+                    await server.stop()
+                    return
         for hub in self._hubs:
             if hub.isSameHub(url):
                 if hub.isDisconnected():
@@ -4025,16 +4760,96 @@ class YAPIContext:
         if _LOG_LEVEL >= 4:
             self._Log('No hub to Unregister with ' + url)
 
-    async def _updateDeviceList_internal(self, forceupdate: bool, errmsg: Union[YRefParam, None]) -> int:
+    async def _updateHubDeviceList(self, hub: YGenericHub, forceupdate: bool) -> None:
         try:
-            for h in self._hubs:
-                await h.updateDeviceList(forceupdate)
-            return YAPI.SUCCESS
+            res: int = await hub.updateDeviceList(forceupdate)
+            if res != YAPI.SUCCESS:
+                hub._devListStatus = res
+                hub._devListError = hub.lastErrorMsg
+            elif hub._currentState < _HUB_CONNECTED or not hub.isOnline():
+                # the hub did not provide any fresh device list
+                hub._devListStatus = YAPI.IO_ERROR
+                hub._devListError = 'Hub %s is not connected' % hub._urlInfo.host
+                if hub.lastErrorType != YAPI.SUCCESS:
+                    hub._devListStatus = hub.lastErrorType
+                    hub._devListError += ' (%s)' % hub.lastErrorMsg
+            else:
+                hub._devListStatus = YAPI.SUCCESS
+                hub._devListError = ''
         except YAPI_Exception as e:
-            self._lastErrorType = e.errorType
-            self._lastErrorMsg = e.errorMessage
-            errmsg.value = e.errorMessage
-            return e.errorType
+            hub._devListStatus = e.errorType
+            hub._devListError = e.errorMessage
+        # noinspection PyBroadException
+        except Exception as exc:
+            hub._devListStatus = YAPI.IO_ERROR
+            hub._devListError = str(exc)
+        # wake up all UpdateDeviceList() calls waiting for this hub, including
+        # those started while the refresh was already running
+        waiters: list[asyncio.Event] = hub._devListWaiters
+        hub._devListWaiters = []
+        for evt in waiters:
+            evt.set()
+
+    async def _updateDeviceList_internal(self, forceupdate: bool, errmsg: Union[YRefParam, None]) -> int:
+        # Refresh all hubs concurrently. Each hub is given its own network timeout
+        # to answer. Hubs that do not answer in time are reported with a TIMEOUT
+        # status, but their refresh keeps running in the background, and is merged
+        # into the registry as soon as it completes.
+        doneEvent: asyncio.Event = asyncio.Event()
+        waiting: list[YGenericHub] = []
+        for h in self._hubs:
+            if h._devListTask is None or h._devListTask.done():
+                h._devListTask = self.create_task(self._updateHubDeviceList(h, forceupdate))
+            h._devListWaiters.append(doneEvent)
+            waiting.append(h)
+        start: int = ticks_ms()
+        while waiting:
+            elapsed: int = ticks_diff(ticks_ms(), start)
+            remaining: int = 0
+            for h in waiting[:]:
+                if h._devListTask.done():
+                    waiting.remove(h)
+                elif elapsed >= h.networkTimeout:
+                    h._devListStatus = YAPI.TIMEOUT
+                    h._devListError = 'Hub %s did not answer within %d ms' % (h._urlInfo.host, h.networkTimeout)
+                    waiting.remove(h)
+                    if doneEvent in h._devListWaiters:
+                        h._devListWaiters.remove(doneEvent)
+                elif remaining == 0 or h.networkTimeout - elapsed < remaining:
+                    remaining = h.networkTimeout - elapsed
+            if not waiting:
+                break
+            doneEvent.clear()
+            try:
+                if _IS_MICROPYTHON:
+                    await asyncio.wait_for_ms(doneEvent.wait(), remaining)  # noqa
+                else:
+                    await asyncio.wait_for(doneEvent.wait(), remaining / 1000.0)
+            except asyncio.TimeoutError:
+                pass
+        # report the first failure of a registered hub, in registration order.
+        # Failures of preregistered hubs are only reported by GetHubUpdateStatus()
+        for h in self._hubs:
+            if h._devListStatus != YAPI.SUCCESS and h._targetState >= _HUB_REGISTERED:
+                self._lastErrorType = h._devListStatus
+                self._lastErrorMsg = h._devListError
+                if errmsg is not None:
+                    errmsg.value = h._devListError
+                return h._devListStatus
+        return YAPI.SUCCESS
+
+    def GetHubUpdateStatus(self) -> list[tuple[str, int, str]]:
+        """
+        Returns the outcome of the last device list refresh for each registered hub,
+        as performed by UpdateDeviceList(). Each entry includes the URL used
+        to register the hub, an error code (YAPI.SUCCESS if the hub answered
+        successfully, YAPI.TIMEOUT if it did not answer within its network timeout,
+        or the cause of the failure if the hub is not connected) and the
+        corresponding error message.
+
+        @return a list of tuples (registered URL, error code, error message).
+        """
+        return [(h._registeredUrl, h._devListStatus, h._devListError) for h in self._hubs]
 
     def _updateRegisteredHubs(self, hub: YGenericHub, add: bool) -> None:
         for h in self._registeredHubs:
@@ -4162,6 +4977,96 @@ class YAPIContext:
             """
             return "error: not supported"
 
+    if not _IS_MICROPYTHON:
+        def SetDataLoggerMirror(self, mirrorPath: str) -> str:
+            """
+            Enables a local mirror of the data loggers, stored in an SQLite database file.
+            Once enabled, every closed data stream downloaded from a data logger is saved
+            in the mirror, and is never downloaded again by later calls to loadMore()
+            on a YDataSet. Only the stream list and streams still being recorded
+            are retrieved from the device, which makes periodic synchronizations
+            of a data logger very fast. Passing an empty string disables the mirror.
+
+            @param mirrorPath : the path of the SQLite database file used to store the mirror.
+                    The file is created if it does not exist.
+
+            @return an empty string if the mirror has been set up correctly.
+                    In case of error, returns a string starting with "error:".
+            """
+            if self._dataMirror is not None:
+                self._dataMirror.close()
+                self._dataMirror = None
+            if mirrorPath:
+                try:
+                    self._dataMirror = YDataLoggerMirror(mirrorPath)
+                except Exception as exc:
+                    return "error: cannot open datalogger mirror (%s)" % str(exc)
+            return ""
+
+    if not _IS_MICROPYTHON:
+        def RegisterTraceCallback(self, traceCallback: YTraceCallback) -> None:
+            """
+            Registers a callback function, to be called at each step of the library internals:
+            "request.start", "request.queue" (the request has left the device queue),
+            "request.send", "request.firstByte" and "request.complete" for device requests,
+            "notification.receive" and "notification.dispatch" for notifications,
+            "hub.connect" and "hub.reconnect" for hub connections, and "datalogger.load"
+            for datalogger stream downloads. Registering a callback also enables metrics.
+            The callback is invoked from the event loop of the library, and must return quickly.
+
+            @param traceCallback : a procedure taking an event name and a dictionary of attributes,
+                    or None to unregister a previously registered callback.
+            """
+            if traceCallback is not None:
+                if self._tracer is None:
+                    self._tracer = YTracer(self)
+                self._tracer._callback = traceCallback
+            elif self._tracer is not None:
+                self._tracer._callback = None
+                if not self._tracer._metrics:
+                    self._tracer = None
+
+    if not _IS_MICROPYTHON:
+        def EnableMetrics(self, enabled: bool) -> None:
+            """
+            Enables or disables the collection of counters and timings of the library internals,
+            such as the time spent by requests in the device queue and on the hub side.
+            Metrics are disabled by default.
+
+            @param enabled : True to collect metrics, False to stop collecting them.
+            """
+            if enabled:
+                if self._tracer is None:
+                    self._tracer = YTracer(self)
+                self._tracer._metrics = True
+            elif self._tracer is not None:
+                self._tracer._metrics = False
+                if self._tracer._callback is None:
+                    self._tracer = None
+
+    if not _IS_MICROPYTHON:
+        def GetMetrics(self) -> dict[str, Any]:
+            """
+            Returns a snapshot of the metrics collected since they have been enabled or reset.
+            The snapshot is a dictionary with the snapshot time ("time", in nanoseconds since
+            the epoch), the "counters" and the "timings". Each timing is given as a dictionary
+            with the number of occurrences ("count"), the total and the maximum duration
+            in milliseconds ("sum" and "max").
+
+            @return a dictionary, empty if metrics are not enabled.
+            """
+            if self._tracer is None:
+                return {}
+            return self._tracer.getSnapshot()
+
+    if not _IS_MICROPYTHON:
+        def ResetMetrics(self) -> None:
+            """
+            Resets all counters and timings to zero.
+            """
+            if self._tracer is not None:
+                self._tracer.reset()
+
     def SetNetworkSecurityOptions(self, opts: int) -> str:
         """
         Enables or disables certain TLS/SSL certificate checks.
@@ -4200,6 +5105,58 @@ class YAPIContext:
         """
         return self._networkTimeoutMs
 
+    def SetHttpPoolSize(self, poolSize: int) -> None:
+        """
+        Modifies the maximal number of keep-alive connections used in parallel
+        to send device requests to a hub in HTTP mode. By default, up to 3
+        connections are used per hub. The value applies to hubs registered
+        afterward, and can be changed for each hub using YHub.set_httpPoolSize().
+
+        @param poolSize : the maximal number of connections per hub (at least 1).
+        @noreturn
+        """
+        self._httpPoolSize = max(1, poolSize)
+
+    def GetHttpPoolSize(self) -> int:
+        """
+        Returns the maximal number of keep-alive connections used in parallel
+        to send device requests to a hub in HTTP mode.
+
+        @return the maximal number of connections per hub.
+        """
+        return self._httpPoolSize
+
+    def SetLiveCacheValidity(self, liveCacheValidityMs: int) -> None:
+        """
+        Enables live device caches, kept up-to-date by hub notifications.
+        By default, the attributes of a device are reloaded from the device
+        whenever the standard cache validity has expired (see SetCacheValidity).
+        In live mode, the library keeps the attributes of each device in cache,
+        updates advertised values as soon as they are notified by the hub, and
+        reloads all attributes only when a configuration change is notified,
+        after a reconnection to the hub, or when the cache is older than the
+        specified duration. Other attributes that change without configuration
+        change, such as the current value of sensors or device uptime, are
+        therefore only refreshed at that pace.
+        Note: This function must be called after yInitAPI.
+
+        @param liveCacheValidityMs : the maximal age of live device caches,
+                in milliseconds, or 0 to disable live caches.
+        @noreturn
+        """
+        self._liveCacheValidity = liveCacheValidityMs
+        if liveCacheValidityMs <= 0:
+            for dev in self._devsBySn.values():
+                dev._liveConnID = ''
+
+    def GetLiveCacheValidity(self) -> int:
+        """
+        Returns the maximal age of live device caches, as set by SetLiveCacheValidity.
+
+        @return the maximal age of live device caches in milliseconds, or 0 if live caches are disabled.
+        """
+        return self._liveCacheValidity
+
     # --- (generated code: YAPIContext implementation)
     def SetCacheValidity(self, cacheValidityMs: int) -> None:
         """
@@ -4388,6 +5345,10 @@ class YAPIContext:
         if not _IS_MICROPYTHON:
             if (self._apiMode & YAPI.DETECT_NET) != 0:
                 await self._ssdp.stop()
+        servers: list[YCallbackServer] = self._callbackServers
+        self._callbackServers = []
+        for server in servers:
+            await server.stop()
         hubs = self._hubs
         self._hubs = []
         completion: list[asyncio.Task] = []
@@ -4400,6 +5361,9 @@ class YAPIContext:
         await asyncio.gather(*completion)
         for hub in hubs:
             hub._release()
+        if not _IS_MICROPYTHON:
+            for sim in self._simulators:
+                await sim.stop()
         for task in self._tasks:
             if not task.done():
                 task.cancel()
@@ -4428,11 +5392,16 @@ class YAPIContext:
         function that will establish the connection as soon as it is available.
 
 
-        <b>callback</b>: that keyword make the API run in "<i>HTTP Callback</i>" mode.
-        This a special mode allowing to take control of Yoctopuce devices
-        through a NAT filter when using a VirtualHub or a networked YoctoHub. You only
-        need to configure your hub to call your server script on a regular basis.
-        This mode is currently available for PHP and Node.JS only.
+        <b>callback</b>, <b>ws://callback</b> or <b>http://callback</b>: that keyword make the API run
+        in "<i>Callback</i>" mode. This a special mode allowing to take control of Yoctopuce devices
+        through a NAT filter when using a VirtualHub or a networked YoctoHub. The API
+        listens for incoming connections (on port 4444 by default, or on the port given
+        in the URL, as in ws://user:pass@callback:8080/path). Hubs configured for
+        WebSocket callbacks are then used as any other registered hub. Hubs configured
+        for Yocto-API HTTP callbacks (in JSON format) only show up until their callback
+        has been answered: values are read from the callback content, and changes are
+        sent back to the hub in the answer. Credentials given in the URL are then expected
+        as HTTP basic authentication.
 
         Be aware that only one application can use direct USB access at a
         given time on a machine. Multiple access would cause conflicts
@@ -4550,9 +5519,8 @@ class YAPIContext:
         if errmsg is None:
             errmsg = YRefParam()
         res: int = await self._updateDeviceList_internal(False, errmsg)
-        if res != YAPI.SUCCESS:
-            return res
-        # after processing all hubs, invoke pending callbacks if required
+        # after processing all hubs, invoke pending callbacks if required,
+        # including for hubs that did answer when another one failed
         nbEvents = len(self._pendingCallbacks)
         for i in range(nbEvents):
             evt: YPlugEv = self._pendingCallbacks[i]
@@ -4564,7 +5532,7 @@ class YAPIContext:
             except Exception as exc:
                 self._logCbError(evt.eventType, self, exc)
         del self._pendingCallbacks[:nbEvents]
-        return YAPI.SUCCESS
+        return res
 
     async def HandleEvents(self, errmsg: Union[YRefParam, None] = None) -> int:
         """
@@ -4590,14 +5558,7 @@ class YAPIContext:
             evb: Union[bytearray, None] = self._nextDataEvent()
             # Handle ALL pending events
             while evb:
-                recipient = None
-                try:
-                    recipient, retval = self._handleEvent(evb)
-                    if asyncio.iscoroutine(retval):
-                        await retval
-                # noinspection PyBroadException
-                except Exception as exc:
-                    self._logCbError(evb[0], recipient, exc)
+                await self._dispatchEvent(evb)
                 evb = self._nextDataEvent()
         except YAPI_Exception as e:
             errmsg.value = e.errorMessage
@@ -4634,14 +5595,7 @@ class YAPIContext:
             while remaining > 0:
                 if evb:
                     # handle one event
-                    recipient = None
-                    try:
-                        recipient, retval = self._handleEvent(evb)
-                        if asyncio.iscoroutine(retval):
-                            await retval
-                    # noinspection PyBroadException
-                    except Exception as exc:
-                        self._logCbError(evb[0], recipient, exc)
+                    await self._dispatchEvent(evb)
                 remaining = ticks_diff(endTicks, ticks_ms())
                 if remaining <= 0:
                     # time expired during event processing
@@ -4649,10 +5603,7 @@ class YAPIContext:
                 # get next event
                 evb = self._nextDataEvent()
                 if not evb:
-                    if _IS_MICROPYTHON:
-                        await asyncio.sleep_ms(min(remaining, 10))  # noqa
-                    else:
-                        await asyncio.sleep(min(remaining, 10) / 1000.0)
+                    await self._waitDataEvent(remaining)
                     remaining = ticks_diff(endTicks, ticks_ms())
         except YAPI_Exception as e:
             errmsg.value = e.errorMessage
@@ -4812,7 +5763,7 @@ class YHub:
         if hub is None:
             return ""
         if attrName == "registeredUrl":
-            return hub._urlInfo.originalURL
+            return hub._registeredUrl
         if attrName == "connectionUrl":
             if hub._hubEngine:
                 return hub._hubEngine._base.getUrl(YUrl.PROTO | YUrl.ENDSLASH)
@@ -4836,6 +5787,8 @@ class YHub:
             return 1 if hub.isOnline() else 0
         elif attrName == "networkTimeout":
             return hub.networkTimeout
+        elif attrName == "httpPoolSize":
+            return hub.httpPoolSize
         elif attrName == "errorType":
             return hub.lastErrorType
         else:
@@ -4853,6 +5806,8 @@ class YHub:
         hub: YGenericHub = self._ctx.getGenHub(self._hubref)
         if hub and attrName == "networkTimeout":
             hub.networkTimeout = value
+        elif hub and attrName == "httpPoolSize":
+            hub.httpPoolSize = max(1, value)
 
     def get_knownUrls(self) -> list[str]:
         """
@@ -5054,6 +6009,28 @@ class YHub:
 
     # --- (end of generated code: YHub implementation)
 
+    def set_httpPoolSize(self, poolSize: int) -> None:
+        """
+        Modifies the maximal number of keep-alive connections used in parallel
+        to send device requests to this hub in HTTP mode.
+        The default value is inherited from YAPI.SetHttpPoolSize
+        at the time when the hub is registered. Connections beyond the new
+        limit are not closed, but are not used anymore for new requests.
+
+        @param poolSize : the maximal number of connections (at least 1).
+        @noreturn
+        """
+        self._imm_setIntAttr("httpPoolSize", poolSize)
+
+    def get_httpPoolSize(self) -> int:
+        """
+        Returns the maximal number of keep-alive connections used in parallel
+        to send device requests to this hub in HTTP mode.
+
+        @return the maximal number of connections.
+        """
+        return self._imm_getIntAttr("httpPoolSize")
+
 
 #################################################################################
 #                                                                               #
@@ -5103,6 +6080,391 @@ class YFuture:
         return self
 
 
+# noinspection PyProtectedMember
+class YEventStream:
+    """
+    Asynchronous iterator delivering the notifications of a function, as an alternative
+    to callbacks: advertised values for YFunction.valueStream(), and YMeasure objects
+    for YSensor.timedReportStream(). Notifications are queued in a bounded buffer until
+    they are consumed. When the consumer is too slow, the overflow policy decides if the
+    oldest or the newest notifications are dropped, or if event dispatching should wait
+    until the consumer catches up (which also delays notifications for other functions).
+
+    Notifications are dispatched by YAPI.HandleEvents() and YAPI.Sleep(). Whenever the
+    buffer is empty, iterating the stream dispatches pending events by itself, so that
+    no other task is needed to drive the stream. Such a dispatch never waits for other
+    streams to be consumed: a full stream using the BLOCK policy then gets the
+    notification queued beyond its limit, instead of stalling this iterator.
+    """
+    if not _IS_MICROPYTHON:
+        # Overflow policies
+        DROP_OLDEST: Final[int] = 0
+        DROP_NEWEST: Final[int] = 1
+        BLOCK: Final[int] = 2
+
+    _func: YFunction
+    _subscribers: list[YEventStream]  # list of streams in the function object, shared among streams
+    _items: list  # FIFO queue (a deque in CPython)
+    _maxsize: int
+    _policy: int
+    _dropped: int
+    _space: Union[asyncio.Event, None]
+    _attached: bool
+    _closed: bool
+
+    def __init__(self, func: YFunction, subscribers: list[YEventStream], maxsize: int, policy: int):
+        self._func = func
+        self._subscribers = subscribers
+        if _IS_MICROPYTHON:
+            self._items = []
+        else:
+            self._items = deque()
+        self._maxsize = maxsize if maxsize > 0 else sys.maxsize
+        self._policy = policy
+        self._dropped = 0
+        self._space = None
+        self._attached = False
+        self._closed = False
+
+    def __aiter__(self) -> YEventStream:
+        return self
+
+    async def __anext__(self) -> Any:
+        if not self._attached and not self._closed:
+            await self._attach()
+        yctx: YAPIContext = self._func._yapi
+        items: list = self._items
+        while not items:
+            if self._closed:
+                raise StopAsyncIteration
+            # dispatch events one by one, so that we never wait for space in our own buffer
+            evb: Union[bytearray, None] = yctx._nextDataEvent()
+            if evb:
+                yctx._streamDispatch += 1
+                try:
+                    await yctx._dispatchEvent(evb)
+                finally:
+                    yctx._streamDispatch -= 1
+            else:
+                await yctx._waitDataEvent(1000)
+        if _IS_MICROPYTHON:
+            item = items.pop(0)
+        else:
+            item = items.popleft()
+        if self._space:
+            _setEvent(self._space)
+        return item
+
+    async def __aenter__(self) -> YEventStream:
+        if not self._attached and not self._closed:
+            await self._attach()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    async def _attach(self) -> None:
+        self._attached = True
+        self._subscribers.append(self)
+        await self._func._updateStreams(self._subscribers, True)
+
+    async def close(self) -> None:
+        """
+        Stops the delivery of notifications to the stream. Notifications already
+        queued can still be consumed, after which the iteration ends.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._space:
+            _setEvent(self._space)
+        self._func._yapi._signalEvents()
+        if self._attached:
+            self._subscribers.remove(self)
+            await self._func._updateStreams(self._subscribers, False)
+
+    def get_droppedCount(self) -> int:
+        """
+        Returns the number of notifications discarded so far because the buffer was full.
+
+        @return an integer corresponding to the number of dropped notifications
+        """
+        return self._dropped
+
+    def get_pendingCount(self) -> int:
+        """
+        Returns the number of notifications waiting in the buffer.
+
+        @return an integer corresponding to the number of queued notifications
+        """
+        return len(self._items)
+
+    # Queue a notification without waiting, return False if the caller must use _put()
+    def _offer(self, item: Any) -> bool:
+        if self._closed:
+            return True
+        items: list = self._items
+        if len(items) >= self._maxsize:
+            if self._policy == YEventStream.BLOCK:
+                if not self._func._yapi._streamDispatch:
+                    return False
+                # dispatch driven by another stream iterator: queue beyond the limit
+                # rather than waiting for this stream to be consumed
+            elif self._policy == YEventStream.DROP_NEWEST:
+                self._dropped += 1
+                return True
+            else:
+                self._dropped += 1
+                if _IS_MICROPYTHON:
+                    items.pop(0)
+                else:
+                    items.popleft()
+        items.append(item)
+        self._func._yapi._signalEvents()
+        return True
+
+    # Queue a notification, waiting until some space is available
+    async def _put(self, item: Any) -> None:
+        while len(self._items) >= self._maxsize and not self._closed:
+            if self._space is None:
+                self._space = asyncio.Event()
+            self._space.clear()
+            await self._space.wait()
+        if not self._closed:
+            self._items.append(item)
+            self._func._yapi._signalEvents()
+
+    # Deliver a notification to all streams of a function, after the callback (if any)
+    @staticmethod
+    def _dispatch(streams: list[YEventStream], item: Any, retval: Union[Coroutine, None]) -> Union[Coroutine, None]:
+        blocked: Union[list[YEventStream], None] = None
+        for stream in streams:
+            if not stream._offer(item):
+                if blocked is None:
+                    blocked = []
+                blocked.append(stream)
+        if blocked is None and not asyncio.iscoroutine(retval):
+            return retval
+        return YEventStream._dispatchAsync(blocked, item, retval)
+
+    @staticmethod
+    async def _dispatchAsync(blocked: Union[list[YEventStream], None], item: Any, retval: Union[Coroutine, None]) -> None:
+        if asyncio.iscoroutine(retval):
+            await retval
+        if blocked:
+            for stream in blocked:
+                await stream._put(item)
+
+
+if not _IS_MICROPYTHON:
+    # Attribute batches opened by the current task, by device serial number. Tasks
+    # started by the synchronous API inherit the batches opened by the calling thread
+    _attrBatchesVar: contextvars.ContextVar = contextvars.ContextVar('yAttrBatches', default=None)
+
+
+# noinspection PyProtectedMember
+class YAttrBatch:
+    """
+    Transaction collecting attribute changes on the functions of a module, to be used
+    with async with. While the batch is open, all attribute changes made on the module
+    or on any of its functions (set_xxx methods) are recorded instead of being sent to
+    the device, and successive changes of the same attribute are coalesced. When the
+    block exits normally, the changes are sent back-to-back to the device, in the order
+    of their first change, and a result is recorded for each attribute. If the block
+    exits with an exception, the changes are discarded.
+
+    Only the changes made by the task that opened the batch are recorded, changes
+    made by other tasks are sent to the device immediately. Changes of command
+    attributes, such as persistentSettings, are not delayed: pending changes are
+    sent first, then the command is sent to the device.
+
+    Values read from the functions during the batch still reflect the device state.
+    Use getAttr() to read the value that the device will get on commit.
+    """
+    # attributes triggering an action on the device, rather than holding a setting
+    _COMMAND_ATTRS = ('persistentSettings', 'rebootCountdown', 'command')
+    _func: YFunction
+    _dev: Union[YDevice, None]
+    _keys: list[str]  # keys of pending changes, in the order of their first change
+    _writes: dict[str, tuple]  # pending changes: key -> (function or None, functionId, attrName, value)
+    _results: dict[str, int]
+
+    def __init__(self, func: YFunction):
+        self._func = func
+        self._dev = None
+        self._keys = []
+        self._writes = {}
+        self._results = {}
+
+    async def __aenter__(self) -> YAttrBatch:
+        dev: YDevice = await self._func._getDev()
+        batches: Union[dict[str, YAttrBatch], None] = YAttrBatch._openBatches(self._func._yapi)
+        if batches and dev._serial in batches:
+            raise YAPI_Exception(YAPI.INVALID_ARGUMENT, "A batch is already open on device " + dev._serial)
+        self._dev = dev
+        self._bind()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        if self._dev:
+            self._unbind()
+            self._dev = None
+        if exc_type is None:
+            await self.commit()
+        else:
+            self.discard()
+
+    # Return the batches opened by the current task on devices of a given context
+    @staticmethod
+    def _openBatches(yctx: YAPIContext) -> Union[dict[str, YAttrBatch], None]:
+        if _IS_MICROPYTHON:
+            return yctx._attrBatches
+        batches: Union[dict[str, YAttrBatch], None] = _attrBatchesVar.get()
+        if batches:
+            return {serial: batch for serial, batch in batches.items() if batch._func._yapi is yctx}
+        return None
+
+    # Make the batch visible to the current task (or to the calling thread, for the sync API).
+    # The dictionary is copied, as tasks started meanwhile share the same instance
+    def _bind(self) -> None:
+        if _IS_MICROPYTHON:
+            self._func._yapi._attrBatches[self._dev._serial] = self
+        else:
+            batches: dict[str, YAttrBatch] = dict(_attrBatchesVar.get() or {})
+            batches[self._dev._serial] = self
+            _attrBatchesVar.set(batches)
+
+    def _unbind(self) -> None:
+        if _IS_MICROPYTHON:
+            self._func._yapi._attrBatches.pop(self._dev._serial, None)
+        else:
+            batches: Union[dict[str, YAttrBatch], None] = _attrBatchesVar.get()
+            if batches and batches.get(self._dev._serial) is self:
+                batches = dict(batches)
+                del batches[self._dev._serial]
+                _attrBatchesVar.set(batches or None)
+
+    def _record(self, func: Union[YFunction, None], functionId: str, attrName: str, value: str) -> None:
+        key: str = functionId + '.' + attrName
+        if key not in self._writes:
+            self._keys.append(key)
+        self._writes[key] = (func, functionId, attrName, value)
+
+    def setAttr(self, functionId: str, attrName: str, value: str) -> None:
+        """
+        Records the change of an attribute of a function of the module, identified
+        by its function identifier, without the need for a function object.
+
+        @param functionId : the hardware function identifier (for instance "relay1"),
+                or "module" for the module itself
+        @param attrName : the name of the attribute to change
+        @param value : the new value of the attribute, as a string
+        """
+        self._record(None, functionId, attrName, str(value))
+
+    async def getAttr(self, functionId: str, attrName: str) -> str:
+        """
+        Returns the value of an attribute of a function of the module, as the device
+        will have it once the batch is committed: the pending value if the attribute
+        has been changed in the batch, or the current device value otherwise. The
+        attributes of all functions are read using a single request to the device.
+
+        @param functionId : the hardware function identifier (for instance "relay1"),
+                or "module" for the module itself
+        @param attrName : the name of the attribute
+
+        @return a string with the value of the attribute
+
+        On failure, throws an exception or returns an empty string.
+        """
+        pending: Union[tuple, None] = self._writes.get(functionId + '.' + attrName)
+        if pending:
+            return pending[3]
+        try:
+            dev: YDevice = self._dev or await self._func._getDev()
+            node: Union[xdict, None] = (await dev.requestAPI()).get(functionId)
+            if node is None or attrName not in node:
+                self._func._throw(YAPI.INVALID_ARGUMENT, "No attribute %s in function %s" % (attrName, functionId))
+                return ''
+            return str(node[attrName])
+        except YAPI_Exception as e:
+            self._func._rethrow(e)
+            return ''
+
+    def get_pendingCount(self) -> int:
+        """
+        Returns the number of attribute changes waiting to be sent to the device.
+
+        @return an integer corresponding to the number of pending changes
+        """
+        return len(self._keys)
+
+    def discard(self) -> None:
+        """
+        Drops all pending attribute changes, without sending them to the device.
+        """
+        self._keys = []
+        self._writes = {}
+
+    async def commit(self) -> dict[str, int]:
+        """
+        Sends all pending attribute changes to the device, and records the result
+        of each change. This method is invoked automatically at the end of the async
+        with block, but can also be invoked explicitly to apply the changes made so far.
+
+        @return a dictionary of results (YAPI.SUCCESS or a negative error code),
+                indexed by "functionId.attrName", for all changes sent so far
+        """
+        keys: list[str] = self._keys
+        writes: dict[str, tuple] = self._writes
+        self.discard()
+        if not keys:
+            return self._results
+        try:
+            dev: YDevice = self._dev or await self._func._getDev()
+        except YAPI_Exception as e:
+            for key in keys:
+                self._results[key] = e.errorType
+            self._func._rethrow(e)
+            return self._results
+        # Queue all requests at once: the device request chain preserves their order,
+        # and each request is sent as soon as the hub has answered the previous one
+        reqs: list = []
+        for key in keys:
+            func, functionId, attrName, value = writes[key]
+            reqs.append(dev.requestHTTPAsync("/api/%s/%s?%s=%s&." % (functionId, attrName, attrName,
+                                                                     YFunction._escapeAttr(value)), None))
+        outcome: list = await asyncio.gather(*reqs, return_exceptions=True)
+        dev.clearCache()
+        firstError: Union[YAPI_Exception, None] = None
+        for i in range(len(keys)):
+            res = outcome[i]
+            if res is None:
+                self._results[keys[i]] = YAPI.SUCCESS
+            elif isinstance(res, YAPI_Exception):
+                self._results[keys[i]] = res.errorType
+                if firstError is None:
+                    firstError = res
+            else:
+                raise res
+            func = writes[keys[i]][0]
+            if func is not None and func._cacheExpiration:
+                func._cacheExpiration = ticks_ms()
+        if firstError is not None:
+            self._func._lastErrorType = firstError.errorType
+            self._func._lastErrorMsg = firstError.errorMessage
+        return self._results
+
+    def get_results(self) -> dict[str, int]:
+        """
+        Returns the result of each attribute change sent to the device so far.
+
+        @return a dictionary of results (YAPI.SUCCESS or a negative error code),
+                indexed by "functionId.attrName"
+        """
+        return self._results
+
+
 #################################################################################
 #                                                                               #
 #                    YRequest, YHubEngine, YGenericHub, YHub                    #
@@ -5117,6 +6479,7 @@ class YRequest(ClientResponse):
     devNext: Union[YRequest, None]  # pointer to next request in device-specific linked list
     hubNext: Union[YRequest, None]  # pointer to next request in hub tcp channel-specific list
     _wsHdr: Union[bytes, None]
+    _trace: Union[YRequestTrace, None]  # timestamps of the request, when tracing is enabled
 
     def __init__(self, method: str, url: str, headers: dict, timeout: int, payload: Union[xarray, None]):
         if headers and payload:
@@ -5130,6 +6493,7 @@ class YRequest(ClientResponse):
         self.devNext = None
         self.hubNext = None
         self._wsHdr = None
+        self._trace = None
 
     def __repr__(self) -> str:
         return "<%s %d %s%sdone>" % ('YRequest', self.status, "" if self._async is None else "async ", "" if self._done.is_set() else "not ")
@@ -5149,6 +6513,16 @@ class YRequest(ClientResponse):
                 raise self._except
             raise YAPI_Exception(YAPI.IO_ERROR, repr(self._except))
 
+    def prepRecv(self):
+        super().prepRecv()
+        if self._trace is not None:
+            self._trace.sent()
+
+    def appendBytes(self, data: Union[bytes, memoryview]) -> int:
+        if self._trace is not None:
+            self._trace.received()
+        return super().appendBytes(data)
+
     # provide a preallocated buffer for this request
     def setBuff(self, buff: xbytearray):
         self._buff = buff
@@ -5202,6 +6576,10 @@ class YHubEngine(BaseSession):
     def create_task(self, coro: Coroutine) -> asyncio.Task:
         return self._hub.create_task(coro)
 
+    # Request timeouts are handled globally for all hubs
+    def getWatchdog(self) -> RequestWatchdog:
+        return self._hub._yapi._getWatchdog()
+
     # Common HTTP status check for engines
     def _checkStatus(self, response: BaseResponse, tryOpenID: str) -> bool:
         # We assume automatic handling by aiohttp for
@@ -5259,6 +6637,13 @@ class YHubEngine(BaseSession):
             ssl_ctx = ssl
         super()._sendRequest(baseUrl, request, ssl=ssl_ctx, channel=channel)
 
+    def selectTcpChan(self, request: YRequest) -> int:
+        """
+        Select the tcp channel to be used for a device request.
+        Engines able to multiplex requests should redefine this method.
+        """
+        return 0
+
     async def sendRequest(self, request: YRequest, tcpchan: int) -> ByteArrayLike:
         """
         Attempt to schedule the request passed as argument and to return the result
@@ -5309,14 +6694,21 @@ class YGenericHub:
     _keepTryingTimer: YTimer  # timer for detaching at end of TestHub
     # state variable to handle connected state
     networkTimeout: int  # hub-specific timeout for detecting stalled connections
+    httpPoolSize: int  # hub-specific number of keep-alive connections for device requests
     _lastPing: int  # timestamp of last notification received
     _isNotifWorking: bool  # true if we are receiving valid notification
     _updateDevListStarted: int  # time_ms stamp of start of updateDevList when in progress
     _devListExpires: int  # timestamp of next useful updateDeviceList
+    _devListTask: Union[asyncio.Task, None]  # updateDeviceList task started by YAPIContext, possibly still running
+    _devListWaiters: list[asyncio.Event]  # events to set when _devListTask completes
+    _devListStatus: int  # outcome of the last updateDeviceList started by YAPIContext
+    _devListError: str
+    _registeredUrl: str  # URL given by the caller to register the hub
     notifPos: int  # current absolute position in hub notification stream
     _firstArrivalCallback: bool  # this is the first connection to the hub
     _knownUrls: list[str]  # the list of url that can be used for this hub
     _sslContext: Union[SSLContext | None]
+    _sslContextKey: tuple  # settings used to build _sslContext
     _hubMode: int
     _logPullList: list[YDevice]
 
@@ -5344,14 +6736,21 @@ class YGenericHub:
         self._keepTryingUntil = 0
         self._keepTryingTimer = None
         self.networkTimeout = yctx.GetNetworkTimeout()
+        self.httpPoolSize = yctx.GetHttpPoolSize()
         self._lastPing = 0
         self._isNotifWorking = False
         self._updateDevListStarted = 0
         self._devListExpires = 0
+        self._devListTask = None
+        self._devListWaiters = []
+        self._devListStatus = YAPI.SUCCESS
+        self._devListError = ''
+        self._registeredUrl = urlInfo.originalURL
         self.notifPos = -1
         self._firstArrivalCallback = True
         self._knownUrls = []
         self._sslContext = None
+        self._sslContextKey = ()
         self._hubMode = _HUBMODE_SECURE
         self._logPullList = []
 
@@ -5666,6 +7065,10 @@ class YGenericHub:
     def _getSslContex(self) -> Union[SSLContext, None]:
         if _IS_MICROPYTHON:
             return None
+        # loading the default certificates is slow, so the context is only rebuilt when settings change
+        ctxKey: tuple = (self._hubMode, self._yapi._networkSecurityOptions, tuple(self._yapi._trustedCertificate))
+        if self._sslContext is not None and self._sslContextKey == ctxKey:
+            return self._sslContext
         ctx = SSLContext(ssl.PROTOCOL_TLS_CLIENT)
         ctx.load_default_certs()
         if self._hubMode == _HUBMODE_MIXED or self._hubMode == _HUBMODE_LEGACY:
@@ -5684,6 +7087,7 @@ class YGenericHub:
             stats = ctx.cert_store_stats()
             print('SSL context: crl:%d, x509_ca:%d, x509:%d' % (stats['crl'], stats['x509_ca'], stats['x509']))
         self._sslContext = ctx
+        self._sslContextKey = ctxKey
         return self._sslContext
 
     # Attempt to establish a connection to the hub asynchronously.
@@ -5789,6 +7193,8 @@ class YGenericHub:
         primaryHub._connResolvers = []
         primaryHub.lastErrorType = YAPI.SUCCESS
         primaryHub.lastErrorMsg = 'Hub %s connected' % hubSerial
+        if self._yapi._tracer is not None:
+            self._yapi._tracer.hubConnected(self)
         for resolver in resolvers:
             if not resolver.done():
                 resolver.set_result(YAPI.SUCCESS, primaryHub.lastErrorMsg)
@@ -5836,6 +7242,8 @@ class YGenericHub:
 
         self._currentConnID = nextOpenID
         self._reconnTimer = self.create_task(self._retryHubConnection(self.retryDelay, nextOpenID))
+        if self._yapi._tracer is not None:
+            self._yapi._tracer.hubDisconnected(self, self.retryDelay)
         return True
 
     async def _retryHubConnection(self, mstimeout: int, nextOpenID: str) -> None:
@@ -5957,7 +7365,8 @@ class YGenericHub:
             if self._hubSerial is None:
                 if wp['networkUrl'] == '/api':
                     self._hubSerial = serial
-            newPlugs |= self._yapi._storeServices(self._hubRef, wp, isNew, yellowPages)
+            with self._yapi._indexLock:
+                newPlugs |= self._yapi._storeServices(self._hubRef, wp, isNew, yellowPages)
         for devydx, serial in self._serialByYdx.items():
             if newSerialByYdx.get(devydx) != serial:
                 self._yapi._unplugDevice(serial)
@@ -6033,6 +7442,8 @@ class YGenericHub:
             # drop ping notification
             self._isNotifWorking = True
             return
+        if self._yapi._tracer is not None:
+            self._yapi._tracer.notificationReceived(self, evb)
         if evlen >= 3 and _NOTIFY_NETPKT_CONFCHGYDX <= evb[0] <= _NOTIFY_NETPKT_TIMEAVGYDX:
             # function value ydx (tiny notification)
             self._isNotifWorking = True
@@ -6106,7 +7517,7 @@ class YGenericHub:
     async def devRequestSync(self, yreq: YRequest) -> ByteArrayLike:
         if self._currentState < _HUB_CONNECTED or self._hubEngine is None:
             self._throw(YAPI.IO_ERROR, "Hub is currently unavailable")
-        return await self._hubEngine.sendRequest(yreq, 0)
+        return await self._hubEngine.sendRequest(yreq, self._hubEngine.selectTcpChan(yreq))
 
     # invoked by YDevice to trigger a device-specific asynchronous request
     async def devRequestAsync(self, yreq: YRequest) -> None:
@@ -6115,7 +7526,7 @@ class YGenericHub:
         if yreq._target.endswith('&.') and await self.isReadOnly():
             self._throw(YAPI.UNAUTHORIZED, 'Access denied: admin credentials required')
         yreq.setAsync()
-        await self._hubEngine.sendRequest(yreq, 0)
+        await self._hubEngine.sendRequest(yreq, self._hubEngine.selectTcpChan(yreq))
 
     def get_urlOf(self, serialNumber: str) -> str:
         dev = self._yapi._getDevice(serialNumber)
@@ -6245,6 +7656,7 @@ class YGenericHub:
 #                                                                               #
 #################################################################################
 
+
 # noinspection PyRedeclaration
 # noinspection PyProtectedMember
 class YHttpEngine(YHubEngine):
@@ -6288,6 +7700,8 @@ class YHttpEngine(YHubEngine):
             if not self._checkStatus(req, tryOpenID):
                 return
             await self._hub.signalHubConnected(tryOpenID, self._hub.getSerialNumber())
+            # VirtualHub handles HTTP/1.1 pipelining, embedded hubs are kept on plain keep-alive
+            self._pipelining = self._hub.getSerialNumber().startswith('VIRTHUB')
             while not self._hub.isDisconnecting():
                 evb: bytes = await req.readuntil(b'\n')
                 if len(evb) > 0 and evb[-1] == 10:
@@ -6354,6 +7768,27 @@ class YHttpEngine(YHubEngine):
         # FIXME: Add VirtualHub for Web x-y-auth support later
         return self.request(method, rel_url, data=body, timeout=msTimeout / 1000, channel=None, as_cls=YRequest)
 
+    def selectTcpChan(self, request: YRequest) -> int:
+        """
+        Select the pooled connection to be used for a device request:
+        the first idle connection, a new one if all are busy and the pool is not
+        full, or the connection with the shortest queue otherwise.
+        """
+        bestChan: int = 0
+        bestLen: int = -1
+        for tcpchan in range(self._hub.httpPoolSize):
+            # channel 0 is reserved for the notification stream
+            chanIdx: int = tcpchan + 1
+            if chanIdx >= len(self._channels) or self._channels[chanIdx] is None:
+                return tcpchan
+            qlen: int = self._channels[chanIdx].queueLength()
+            if qlen == 0:
+                return tcpchan
+            if bestLen < 0 or qlen < bestLen:
+                bestChan = tcpchan
+                bestLen = qlen
+        return bestChan
+
     async def sendRequest(self, request: YRequest, tcpchan: int) -> ByteArrayLike:
         """
         Attempt to schedule the request passed as argument and to return the result
@@ -6385,6 +7820,15 @@ class YHttpEngine(YHubEngine):
 _DEFAULT_TCP_ROUND_TRIP_TIME: Final[int] = 30
 _DEFAULT_TCP_MAX_WINDOW_SIZE: Final[int] = 4 * 65536
 
+# adaptive upload flow control (tcpchan 0)
+_WS_MIN_UPLOAD_WINDOW: Final[int] = 4096  # upload window never shrinks below this size
+_WS_MAX_UPLOAD_FRAME: Final[int] = 124 << 9  # largest upload frame payload, within 16-bit frame length
+_WS_LARGE_FRAMES_MIN_WINDOW: Final[int] = 2048  # hubs announcing a smaller window only accept short frames
+_WS_UPLOAD_MARK_STEP: Final[int] = 1024  # upload positions are timestamped every KB to measure ack latency
+_WS_UPLOAD_LATENCY_SLACK: Final[int] = 10  # [ms] jitter tolerated over twice the minimal ack latency
+_WS_UPLOAD_ACK_TIMEOUT: Final[int] = 1000  # [ms] without ack before assuming the hub acks in larger steps
+_WS_UPLOAD_FRAME_TIME: Final[int] = 10  # [ms] large upload frames must not take longer to transmit
+
 # websocket encoding constants
 _YSTREAM_EMPTY: Final[int] = 0
 _YSTREAM_TCP: Final[int] = 1
@@ -6427,6 +7871,9 @@ _WS_CONNSTATE_AUTHENTICATING: Final[int] = 3
 _WS_CONNSTATE_READY: Final[int] = 4
 _WS_CONNSTATE_CONNECTED: Final[int] = 5
 
+# number of tcp channels multiplexed on a websocket connection
+_WS_MAX_TCPCHAN: Final[int] = 4
+
 
 # noinspection PyProtectedMember
 # noinspection PyRedeclaration
@@ -6434,7 +7881,7 @@ class YWebSocketEngine(YHubEngine):
     # Notification stream handling
     websocket: Union[BaseWsResponse, None]
     tcpChan: list[Union[YRequest, None]]
-    _frame: bytearray
+    _frames: list[Union[bytearray, None]]  # one frame buffer per tcp channel
     _notifCarryOver: bytearray
     _notifCarryOverLen: int
     _nextAsyncId: int
@@ -6446,7 +7893,9 @@ class YWebSocketEngine(YHubEngine):
     _nonce: int
     _session_error: Union[str, None]
     _session_errno: Union[int, None]
-    _task: Union[asyncio.Task, None]  # sending task
+    _sendTasks: list[Union[asyncio.Task, None]]  # one sending task per tcp channel
+    _sendLock: Union[asyncio.Lock, None]
+    _devTcpChans: int  # number of tcp channels usable for device requests
     _tcpRoundTripTime: int
     _tcpMaxWindowSize: int
     # upload field below only apply to tcpchan 0
@@ -6456,12 +7905,18 @@ class YWebSocketEngine(YHubEngine):
     _lastUploadRateTime: int
     _uploadPos: int
     _uploadRate: int
+    _uploadAcks: int  # 1 if the hub acknowledges uploads, -1 if it does not, 0 while unknown
+    _uploadWindow: int  # adaptive limit of unacknowledged upload bytes
+    _uploadFrameSize: int  # adaptive payload size of upload frames
+    _uploadMaxFrame: int  # largest frame payload accepted by the hub
+    _uploadMinLatency: int  # shortest upload acknowledgement latency observed, in ms
+    _uploadMarks: list[tuple[int, int]]  # (upload position, ticks_ms) of data awaiting acknowledgement
 
     def __init__(self, hub: YGenericHub, urlInfo: YUrl):
         super().__init__(hub, urlInfo, "HTTP/1.1")
         self.websocket = None
-        self.tcpChan = [None, None]
-        self._frame = bytearray(125)
+        self.tcpChan = [None] * _WS_MAX_TCPCHAN
+        self._frames = [None] * _WS_MAX_TCPCHAN
         self._notifCarryOver = bytearray(63)
         self._notifCarryOverLen = 0
         self._nextAsyncId = 48
@@ -6473,7 +7928,9 @@ class YWebSocketEngine(YHubEngine):
         self._nonce = -1
         self._session_error = None
         self._session_errno = None
-        self._task = None
+        self._sendTasks = [None] * _WS_MAX_TCPCHAN
+        self._sendLock = None
+        self._devTcpChans = 1
         self._tcpRoundTripTime = _DEFAULT_TCP_ROUND_TRIP_TIME
         self._tcpMaxWindowSize = _DEFAULT_TCP_MAX_WINDOW_SIZE
         self._lastUploadAckBytes = 0
@@ -6482,6 +7939,12 @@ class YWebSocketEngine(YHubEngine):
         self._lastUploadRateTime = 0
         self._uploadPos = 0
         self._uploadRate = 0
+        self._uploadAcks = 0
+        self._uploadWindow = _WS_MIN_UPLOAD_WINDOW
+        self._uploadFrameSize = 124
+        self._uploadMaxFrame = 124
+        self._uploadMinLatency = 0
+        self._uploadMarks = []
 
     @staticmethod
     def _computeAuth(user: str, pwd: str, serial: str, nonce: int) -> bytes:
@@ -6505,11 +7968,15 @@ class YWebSocketEngine(YHubEngine):
         On fatal failure, this method should call self._commonDisconnect()
         """
         self._connectionState = _WS_CONNSTATE_CONNECTING
+        self._devTcpChans = 1
+        # the lock must be created within the running event loop
+        self._sendLock = asyncio.Lock()
         if _LOG_LEVEL >= 4:
             self._hub._yapi._Log('Opening websocket connection [' + tryOpenID + ']')
         self._hub._currentConnID = tryOpenID
-        # Check if this hub is a duplicate connection
-        primaryHub: Union[YGenericHub, None] = self._hub._yapi._getPrimaryHub(self._hub)
+        # Check if this hub is a duplicate connection (callback hubs only know their serial after announce,
+        # and are rejected if they do not announce it, so that they are never merged by an empty serial)
+        primaryHub: Union[YGenericHub, None] = self._hub._yapi._getPrimaryHub(self._hub) if self._hub._hubSerial else self._hub
         if primaryHub != self._hub:
             self._hub._commonDisconnect(tryOpenID, YAPI.SUCCESS, 'Hub %s is already connected' % self._hub.getSerialNumber())
             self._hub._currentConnID = ''
@@ -6520,10 +7987,7 @@ class YWebSocketEngine(YHubEngine):
         try:
             if _LOG_LEVEL >= 4:
                 self._hub._yapi._Log('About to open websocket connection [' + tryOpenID + ']')
-            ssl_arg = self._hub._getSslContex()
-            websocket: BaseWsResponse = self.ws_connect('/not.byn', ssl=ssl_arg, timeout=self._hub.networkTimeout / 1000, as_cls=BaseWsResponse)
-            self.websocket = websocket
-            await websocket.ready()
+            websocket: BaseWsResponse = await self._openWebSocket()
             if self.websocket is None or not self._checkStatus(self.websocket, tryOpenID):
                 self._wsError('Failed to open websocket')
                 return
@@ -6582,6 +8046,14 @@ class YWebSocketEngine(YHubEngine):
             print_exception(exc)
             self._wsError(str(exc))
 
+    # Open the websocket channel to the hub
+    async def _openWebSocket(self) -> BaseWsResponse:
+        ssl_arg = self._hub._getSslContex()
+        websocket: BaseWsResponse = self.ws_connect('/not.byn', ssl=ssl_arg, timeout=self._hub.networkTimeout / 1000, as_cls=BaseWsResponse)
+        self.websocket = websocket
+        await websocket.ready()
+        return websocket
+
     async def _wsRecvSetup(self, arr_bytes: bytes) -> None:
         data: memoryview = memoryview(arr_bytes)
         ystream: int = arr_bytes[0] >> 3
@@ -6621,7 +8093,7 @@ class YWebSocketEngine(YHubEngine):
             frame[6] = (self._nonce >> 8) & 0xff
             frame[7] = (self._nonce >> 16) & 0xff
             frame[8] = (self._nonce >> 24) & 0xff
-            await self.websocket.send_bytes(frame)
+            await self._wsSend(frame)
             return
         if metatype == _USB_META_WS_AUTHENTICATION:
             if len(arr_bytes) < 1 + _USB_META_WS_AUTHENTICATION_SIZE:
@@ -6631,11 +8103,17 @@ class YWebSocketEngine(YHubEngine):
                 # Fix overly optimistic round-trip on YoctoHubs
                 self._tcpRoundTripTime = 7
             self._uploadRate = round(self._tcpMaxWindowSize * 1000 / self._tcpRoundTripTime)
+            self._uploadWindow = max(_WS_MIN_UPLOAD_WINDOW, 2 * self._tcpMaxWindowSize)
+            if not _IS_MICROPYTHON and self._tcpMaxWindowSize >= _WS_LARGE_FRAMES_MIN_WINDOW:
+                # hubs with a large input buffer can take frames longer than 125 bytes
+                self._uploadMaxFrame = min(_WS_MAX_UPLOAD_FRAME, self._tcpMaxWindowSize // 4)
             if _LOG_LEVEL >= 4:
                 self._hub._yapi._Log('RTT=%dms, WS=%d, uploadRate=%f KB/s' % (self._tcpRoundTripTime, self._tcpMaxWindowSize, self._uploadRate / 1000))
             self._remoteVersion = arr_bytes[2]
             if self._remoteVersion < 1:
                 return
+            # hubs supporting API packets throttling can process all tcp channels in parallel
+            self._devTcpChans = _WS_MAX_TCPCHAN if self._remoteVersion >= _USB_META_WS_PROTO_V2 else 1
             inflags: int = arr_bytes[3] + (arr_bytes[4] << 8)
             self._hub.setRwAccess((inflags & _USB_META_WS_AUTH_FLAGS_RW) != 0)
             if (inflags & _USB_META_WS_VALID_SHA1) != 0:
@@ -6746,7 +8224,7 @@ class YWebSocketEngine(YHubEngine):
                 # ack synchronous close
                 frame: bytearray = bytearray(1)
                 frame[0] = (_YSTREAM_TCP_CLOSE << 3) + tcpchan
-                await self.websocket.send_bytes(frame)
+                await self._wsSend(frame)
                 # signal request completion
                 yreq._done.set()
             return
@@ -6759,6 +8237,8 @@ class YWebSocketEngine(YHubEngine):
                 yreq: YRequest = self.tcpChan[tcpchan]
                 ackBytes: int = arr_bytes[3] + (arr_bytes[4] << 8) + (arr_bytes[5] << 16) + (arr_bytes[6] << 24)
                 ackTime: int = ticks_ms()
+                self._uploadAcks = 1
+                self._adaptUpload(ackBytes, ackTime)
                 if self._lastUploadAckTime != 0 and ackBytes > self._lastUploadAckBytes:
                     self._lastUploadAckBytes = ackBytes
                     self._lastUploadAckTime = ackTime
@@ -6769,7 +8249,7 @@ class YWebSocketEngine(YHubEngine):
                     if deltaTime < 1000 and deltaBytes < 65536:
                         return  # wait more
                     self._lastUploadRateBytes = ackBytes
-                    self._lastUploadAckTime = ackTime
+                    self._lastUploadRateTime = ackTime
                     if yreq._dataCb:
                         yreq._dataCb(ackBytes, len(yreq._data))
                     newRate: float = deltaBytes * 1000 / deltaTime
@@ -6800,7 +8280,7 @@ class YWebSocketEngine(YHubEngine):
                 if yreq._async is None:
                     yreq.release()
                 yreq = yreq.hubNext
-        self.tcpChan = [None, None]
+        self.tcpChan = [None] * _WS_MAX_TCPCHAN
 
     def disconnectEngineNow(self, connID: str = ''):
         """
@@ -6830,6 +8310,30 @@ class YWebSocketEngine(YHubEngine):
         # but encode it within Websocket frames
         return YRequest(method, rel_url, {}, msTimeout, body)
 
+    def selectTcpChan(self, request: YRequest) -> int:
+        """
+        Select the tcp channel to be used for a device request.
+        Uploads always use channel 0, where bandwidth throttling is applied.
+        Other requests are dispatched to the least busy channel, so that
+        requests to distinct devices can be processed in parallel by the hub.
+        """
+        if self._devTcpChans < 2 or request.hasData():
+            return 0
+        bestChan: int = 0
+        bestLen: int = -1
+        for tcpchan in range(self._devTcpChans):
+            qlen: int = 0
+            yreq: Union[YRequest, None] = self.tcpChan[tcpchan]
+            while yreq:
+                qlen += 1
+                yreq = yreq.hubNext
+            if qlen == 0:
+                return tcpchan
+            if bestLen < 0 or qlen < bestLen:
+                bestChan = tcpchan
+                bestLen = qlen
+        return bestChan
+
     async def sendRequest(self, request: YRequest, tcpchan: int) -> ByteArrayLike:
         """
         Attempt to schedule the request passed as argument and to return the result
@@ -6838,8 +8342,10 @@ class YWebSocketEngine(YHubEngine):
         """
         if self.websocket is None or self._hub.isDisconnecting() or self._connectionState != _WS_CONNSTATE_CONNECTED:
             raise OSError('WebSocket not connected')
-        while len(self.tcpChan) < tcpchan:
+        while len(self.tcpChan) <= tcpchan:
             self.tcpChan.append(None)
+            self._frames.append(None)
+            self._sendTasks.append(None)
         prevReq: YRequest = self.tcpChan[tcpchan]
         if request._async is not None:
             request._async = self._nextAsyncId
@@ -6854,9 +8360,10 @@ class YWebSocketEngine(YHubEngine):
             while prevReq.hubNext:
                 prevReq = prevReq.hubNext
             prevReq.hubNext = request
-        if self._task is None or self._task.done():
-            # need to start a sending task
-            self._task = self._hub.create_task(self._wsProcessSend(tcpchan))
+        task: Union[asyncio.Task, None] = self._sendTasks[tcpchan]
+        if task is None or task.done():
+            # need to start a sending task for this channel
+            self._sendTasks[tcpchan] = self._hub.create_task(self._wsProcessSend(tcpchan))
         await request.ready()
         if request._async is not None:
             return b''
@@ -6880,7 +8387,7 @@ class YWebSocketEngine(YHubEngine):
                     # request already sent
                     if yreq.hubNext is None:
                         # nothing more to be sent for now, we can leave
-                        self._task = None
+                        self._sendTasks[tcpchan] = None
                         return
                     if yreq._async is None:
                         # synchronous request pending, we must wait for completion
@@ -6901,6 +8408,7 @@ class YWebSocketEngine(YHubEngine):
                             self._uploadPos = 0
                             self._lastUploadAckBytes = 0
                             self._lastUploadAckTime = 0
+                            self._uploadMarks = []
                         if yreq.hasData():
                             await self._sendView(yreq.getWsHeaderView, tcpchan)
                             yreq.prepRecv()
@@ -6926,7 +8434,54 @@ class YWebSocketEngine(YHubEngine):
                     yreq._except = exc
                     yreq._ready.set()
                 yreq = yreq.hubNext
-        self._task = None
+        self._sendTasks[tcpchan] = None
+
+    # Internal method to get the frame buffer dedicated to a tcp channel
+    def _chanFrame(self, tcpchan: int) -> bytearray:
+        frame: Union[bytearray, None] = self._frames[tcpchan]
+        if frame is None:
+            frame = bytearray(125)
+            self._frames[tcpchan] = frame
+        return frame
+
+    # Adapt upload window and frame size to the acknowledgement latency of the hub.
+    # As long as acknowledgements come back about as fast as on an idle link, the hub
+    # absorbs data as fast as we send it and we can send more, with larger frames.
+    # Otherwise, data is queuing up on the way: we reduce the window, and get back
+    # to short frames if the link is too slow to carry large frames quickly.
+    # Must be called before the last upload ack bytes/time are updated.
+    def _adaptUpload(self, ackBytes: int, ackTime: int) -> None:
+        marks: list[tuple[int, int]] = self._uploadMarks
+        latency: int = -1
+        while marks and marks[0][0] <= ackBytes:
+            latency = ticks_diff(ackTime, marks.pop(0)[1])
+        if latency < 0:
+            return
+        if self._uploadMinLatency == 0 or latency < self._uploadMinLatency:
+            self._uploadMinLatency = max(1, latency)
+        # largest frame that the link can carry within _WS_UPLOAD_FRAME_TIME, based on last ack
+        maxFrame: int = 124
+        if self._lastUploadAckTime != 0 and ackBytes > self._lastUploadAckBytes:
+            deltaTime: int = max(1, ticks_diff(ackTime, self._lastUploadAckTime))
+            maxFrame = (ackBytes - self._lastUploadAckBytes) * _WS_UPLOAD_FRAME_TIME // deltaTime
+        if latency <= 2 * self._uploadMinLatency + _WS_UPLOAD_LATENCY_SLACK:
+            self._uploadWindow = min(self._uploadWindow + (self._uploadWindow >> 2), _DEFAULT_TCP_MAX_WINDOW_SIZE)
+            if 2 * self._uploadFrameSize <= min(maxFrame, self._uploadMaxFrame):
+                self._uploadFrameSize *= 2
+        else:
+            self._uploadWindow = max(self._uploadWindow >> 1, _WS_MIN_UPLOAD_WINDOW)
+            while self._uploadFrameSize > max(124, maxFrame):
+                self._uploadFrameSize >>= 1
+        if _LOG_LEVEL >= 5:
+            self._hub._yapi._Log('upload ack latency=%dms, window=%d, frame=%d' % (latency, self._uploadWindow, self._uploadFrameSize))
+
+    # Internal method to send a websocket frame, without interleaving with other channels
+    async def _wsSend(self, frame: Union[bytes, bytearray, memoryview]) -> None:
+        async with self._sendLock:
+            websocket: Union[BaseWsResponse, None] = self.websocket
+            if websocket is None:
+                raise OSError('WebSocket not connected')
+            await websocket.send_bytes(frame)
 
     # Internal method to attempt to send a short GET request to a websocket TCP stream
     # Return True iff a short send was possible
@@ -6934,25 +8489,26 @@ class YWebSocketEngine(YHubEngine):
         targetLen: int = len(yreq._target)
         if targetLen > 125 - 10:
             return False
+        frame: bytearray = self._chanFrame(tcpchan)
         if yreq._async is None:
-            shortframe: memoryview = memoryview(self._frame)[:targetLen + 9]
+            shortframe: memoryview = memoryview(frame)[:targetLen + 9]
             shortframe[0] = (_YSTREAM_TCP << 3) + tcpchan
             shortframe[-4:] = b'\r\n\r\n'
         else:
-            shortframe: memoryview = memoryview(self._frame)[:targetLen + 10]
+            shortframe: memoryview = memoryview(frame)[:targetLen + 10]
             shortframe[0] = (_YSTREAM_TCP_ASYNCCLOSE << 3) + tcpchan
             shortframe[-5:-1] = b'\r\n\r\n'
             shortframe[-1] = yreq._async
         shortframe[1:5] = b'GET '
         shortframe[5:5 + targetLen] = yreq._target.encode('latin-1')
         yreq.prepRecv()
-        await self.websocket.send_bytes(shortframe)
+        await self._wsSend(shortframe)
         return True
 
     # Internal method to send a large binary buffer (via callback) to the websocket
     async def _sendView(self, dataViewer: Callable[[int, int], bytes], tcpchan: int, asyncId: Union[int, None] = None) -> None:
         sent: int = 0
-        frame: bytearray = self._frame
+        frame: bytearray = self._chanFrame(tcpchan)
         frame[0] = (_YSTREAM_TCP << 3) + tcpchan
         # Special handling for first two frames, in case of large content
         # on a YoctoHub, the input FIFO is limited to 192, and we can only
@@ -6962,59 +8518,440 @@ class YWebSocketEngine(YHubEngine):
         size: int = len(blk)
         if size == 124:
             frame[1:] = blk
-            await self.websocket.send_bytes(frame)
+            await self._wsSend(frame)
             sent += size
             blk = dataViewer(sent, 67)
             size = len(blk)
             if size == 67:
                 shortframe: memoryview = memoryview(frame)[:size + 1]
                 shortframe[1:] = blk
-                await self.websocket.send_bytes(shortframe)
+                await self._wsSend(shortframe)
                 sent += size
                 # prepare to read 124 bytes again, if possible
                 blk = dataViewer(sent, 124)
                 size = len(blk)
         # Send remaining data by frames of 124 bytes as long as possible
-        # On TCP channel 0, perform throttling on large uploads
+        # On TCP channel 0, perform throttling on large uploads, and switch
+        # to larger frames when the hub proves able to absorb them
         absPos: int = self._uploadPos
         endPos: int = 2108
-        while size == 124:
-            frame[1:] = blk
-            await self.websocket.send_bytes(frame)
+        frameLen: int = 124
+        while size == frameLen:
+            if size > 124:
+                await self._wsSend(frame[:1] + blk)
+            else:
+                frame[1:] = blk
+                await self._wsSend(frame)
             sent += size
             if tcpchan == 0:
+                upPos: int = absPos + sent
+                marks: list[tuple[int, int]] = self._uploadMarks
+                if not marks or upPos - marks[-1][0] >= _WS_UPLOAD_MARK_STEP:
+                    marks.append((upPos, ticks_ms()))
                 # for large uploads, when we cross a segment boundary, compute next
                 # block size and wait if needed for bandwidth throttling
-                while absPos + sent > endPos:  # while used as "if ... repeat until ..."
-                    bytesOnTheAir: int = absPos - self._lastUploadAckBytes
-                    timeOnTheAir: int = ticks_diff(ticks_ms(), self._lastUploadAckTime)
+                while upPos > endPos and self._uploadAcks >= 0:  # while used as "if ... repeat until ..."
+                    bytesOnTheAir: int = upPos - self._lastUploadAckBytes
+                    lastAckTime: int = self._lastUploadAckTime if self._lastUploadAckTime != 0 else marks[0][1]
+                    timeOnTheAir: int = ticks_diff(ticks_ms(), lastAckTime)
                     uploadRate: float = self._uploadRate
                     toBeSent: int = round(2 * uploadRate + 1024 - bytesOnTheAir + (uploadRate * timeOnTheAir / 1000))
-                    if toBeSent + bytesOnTheAir > _DEFAULT_TCP_MAX_WINDOW_SIZE:
-                        toBeSent = _DEFAULT_TCP_MAX_WINDOW_SIZE - bytesOnTheAir
+                    if toBeSent + bytesOnTheAir > self._uploadWindow:
+                        toBeSent = self._uploadWindow - bytesOnTheAir
                     if toBeSent >= 64:
-                        endPos = absPos + toBeSent
+                        endPos = upPos + toBeSent
                         break
+                    if timeOnTheAir > _WS_UPLOAD_ACK_TIMEOUT:
+                        if self._uploadAcks == 0:
+                            # hub does not acknowledge uploads, rely on TCP flow control only
+                            self._uploadAcks = -1
+                            break
+                        # no ack for a long time: the hub may acknowledge by larger steps
+                        self._uploadWindow = min(2 * self._uploadWindow, _DEFAULT_TCP_MAX_WINDOW_SIZE)
                     waitTime: float = max(0.002, (128 - toBeSent) / uploadRate)
                     await asyncio.sleep(waitTime)
-            blk = dataViewer(sent, 124)
+                frameLen = self._uploadFrameSize
+            blk = dataViewer(sent, frameLen)
             size = len(blk)
         # Complete sending with a short frame
+        if size > 123:
+            # remaining data does not fit in the short frame buffer after switching to large frames
+            await self._wsSend(frame[:1] + blk)
+            sent += size
+            blk = b''
+            size = 0
         if asyncId is not None:
             shortframe: memoryview = memoryview(frame)[:size + 2]
             shortframe[0] = (_YSTREAM_TCP_ASYNCCLOSE << 3) + tcpchan
             if size > 0:
                 shortframe[1:-1] = blk
             shortframe[-1] = asyncId
-            await self.websocket.send_bytes(shortframe)
+            await self._wsSend(shortframe)
         elif size > 0:
             shortframe: memoryview = memoryview(frame)[:size + 1]
             shortframe[1:] = blk
-            await self.websocket.send_bytes(shortframe)
+            await self._wsSend(shortframe)
         if tcpchan == 0:
             self._uploadPos += sent + size
 
 
+# Magic string used to compute the websocket handshake reply (RFC 6455, section 1.3)
+_WS_ACCEPT_GUID: Final[str] = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+_CALLBACK_MAX_HEADER: Final[int] = 4096
+_CALLBACK_MAX_CONTENT: Final[int] = 1 << 20  # largest HTTP callback accepted
+_HTTP_CALLBACK_IDLE_MS: Final[int] = 500  # HTTP callbacks are answered once requests stop for that long
+_HTTP_CALLBACK_POLL_MS: Final[int] = 50
+
+
+# Websocket engine for a hub that has connected to our YCallbackServer.
+#
+# Once the websocket has been accepted, the protocol is exactly the same as for
+# outgoing connections, so only the setup and the end of the channel differ:
+# the connection cannot be reopened from our side, the hub will call back by itself
+# and that new connection will be handled by a new hub object.
+#
+# noinspection PyProtectedMember
+class YWebSocketCallbackEngine(YWebSocketEngine):
+    _accepted: Union[BaseWsResponse, None]  # incoming websocket, until picked up by reconnectEngine
+
+    def __init__(self, hub: YGenericHub, urlInfo: YUrl, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, path: str):
+        super().__init__(hub, urlInfo)
+        chan: BaseChan = BaseChan(self, urlInfo, None)
+        chan._reader = reader
+        chan._writer = writer
+        self._wschannels.append(chan)
+        websocket: BaseWsResponse = BaseWsResponse('GET', path, {}, hub.networkTimeout, chan)
+        websocket._masked = False
+        websocket.status = 101
+        websocket.ok = True
+        websocket._ready.set()
+        chan._current = websocket
+        self._accepted = websocket
+
+    async def _openWebSocket(self) -> BaseWsResponse:
+        websocket: Union[BaseWsResponse, None] = self._accepted
+        if websocket is None:
+            raise EOFError('Callback connection closed')
+        self._accepted = None
+        self.websocket = websocket
+        self._hub.create_task(self._watchConnection(websocket))
+        return websocket
+
+    async def _wsRecvSetup(self, arr_bytes: bytes) -> None:
+        await super()._wsRecvSetup(arr_bytes)
+        if self._connectionState == _WS_CONNSTATE_AUTHENTICATING and not self._remoteSerial:
+            # the serial number is the only way to match the hub with its previous connections
+            self._wsError('Callback hub did not announce its serial number')
+            return
+        if self._connectionState == _WS_CONNSTATE_READY:
+            # the hub has just called in, so that next UpdateDeviceList() loads its devices
+            self._hub._lastPing = ticks_ms()
+
+    # Close the connection if the hub stays silent for longer than the network timeout
+    # (outgoing websockets get the same protection from their BaseChan task)
+    async def _watchConnection(self, websocket: BaseWsResponse) -> None:
+        websocket.startWatchdog(self)
+        try:
+            await websocket._done.wait()
+        except asyncio.CancelledError:
+            pass
+        websocket.stopWatchdog()
+        await websocket._chan.close()
+
+    def disconnectEngineNow(self, connID: str = ''):
+        # never schedule a reconnection, the hub is in charge of calling back
+        if not self._hub.isDisconnecting():
+            self._hub._commonDisconnect(connID, self._hub.lastErrorType, self._hub.lastErrorMsg)
+        super().disconnectEngineNow(connID)
+
+
+# Engine for a hub that has posted an HTTP callback to our YCallbackServer.
+#
+# The hub posts the REST API of all its devices at once (/api.json of the hub, and
+# /bySerial/SERIAL/api.json of each device), and waits for the answer before closing
+# the connection. During that one-shot session, requests of the library are served
+# from the posted content, while changes are returned to the hub in the answer, as
+# "@YoctoAPI:GET url" lines that the hub applies once the callback is completed.
+#
+# noinspection PyProtectedMember
+class YHttpCallbackEngine(YHubEngine):
+    _content: dict  # posted REST API content, by path
+    _commands: list[str]  # changes to return to the hub
+    _open: bool
+    _lastRequest: int  # tick_ms of the last request served
+
+    def __init__(self, hub: YGenericHub, urlInfo: YUrl, content: dict):
+        super().__init__(hub, urlInfo, 'HTTP/1.1')
+        self._content = content
+        self._commands = []
+        self._open = False
+        self._lastRequest = 0
+
+    def get_serialNumber(self) -> str:
+        return self._content['/api.json']['module']['serialNumber']
+
+    # Return the text of the answer to the callback, with the changes to apply
+    def get_commands(self) -> str:
+        return ''.join(['\n@YoctoAPI:%s\n' % cmd for cmd in self._commands])
+
+    async def reconnectEngine(self, tryOpenID: str) -> None:
+        hub: YGenericHub = self._hub
+        hub._currentConnID = tryOpenID
+        self._open = True
+        self._lastRequest = ticks_ms()
+        hub._lastPing = self._lastRequest
+        # the posted content cannot change during the session, just as if notifications
+        # were working: the device list does not have to be reloaded every 500 ms
+        hub._isNotifWorking = True
+        await hub.signalHubConnected(tryOpenID, self.get_serialNumber())
+        # Keep the session open until the devices have been loaded by UpdateDeviceList(),
+        # and the application has stopped using them, but never longer than the network
+        # timeout, as the hub is waiting for our answer
+        endTicks: int = ticks_add(self._lastRequest, hub.networkTimeout)
+        while self._open and not hub.isDisconnecting() and hub in hub._yapi._hubs:
+            now: int = ticks_ms()
+            if ticks_diff(now, endTicks) >= 0:
+                break
+            if hub._devListExpires and ticks_diff(now, self._lastRequest) >= _HTTP_CALLBACK_IDLE_MS:
+                break
+            await hub.sleep_ms(_HTTP_CALLBACK_POLL_MS)
+        self.disconnectEngineNow(tryOpenID)
+
+    def disconnectEngineNow(self, connID: str = ''):
+        if not self._open:
+            return
+        self._open = False
+        closeConnID: str = connID if connID else self._hub._currentConnID
+        if not self._hub.isDisconnecting():
+            # never schedule a reconnection, the hub will call back by itself
+            self._hub._commonDisconnect(closeConnID, YAPI.SUCCESS, 'HTTP callback completed')
+        self._hub._currentConnID = ''
+        self._hub._signalHubDisconnected(closeConnID)
+
+    def makeRequest(self, method: str, rel_url: str, body: Union[xarray, None], msTimeout: int) -> YRequest:
+        # requests are never sent, but served locally
+        return YRequest(method, rel_url, {}, msTimeout, body)
+
+    async def sendRequest(self, request: YRequest, tcpchan: int) -> ByteArrayLike:
+        if not self._open:
+            raise OSError('HTTP callback completed')
+        self._lastRequest = ticks_ms()
+        try:
+            res: xbytearray = self._serveRequest(request._method, request._target)
+            request.status = 200
+            request.reason = 'OK'
+            request.ok = True
+        finally:
+            request._ready.set()
+            request._done.set()
+        return res
+
+    def _serveRequest(self, method: str, target: str) -> xbytearray:
+        path, _, query = target.partition('?')
+        devUrl: str = ''
+        if path.startswith('/bySerial/'):
+            pos: int = path.find('/', 10)
+            if pos > 0:
+                devUrl = path[:pos]
+                path = path[pos:]
+        api: Union[dict, None] = self._content.get(devUrl + '/api.json')
+        if api is None:
+            raise YAPI_Exception(YAPI.DEVICE_NOT_FOUND, 'Device %s not found in HTTP callback' % devUrl[10:])
+        if method == 'GET' and path.startswith('/api/') and query:
+            # changes are returned to the hub in the answer to its callback
+            self._commands.append('%s %s' % (method, target))
+            return xbytearray(0)
+        node: Any = None
+        if method == 'GET' and path == '/api.json':
+            node = api
+        elif method == 'GET' and path.startswith('/api/') and path.endswith('.json'):
+            node = api
+            for key in path[5:-5].split('/'):
+                node = node.get(key) if isinstance(node, dict) else None
+        if node is None:
+            raise YAPI_Exception(YAPI.NOT_SUPPORTED, '%s %s is not available in HTTP callback mode' % (method, target))
+        return xbytearray(json.dumps(node), 'latin-1')
+
+    async def waitForPendingQueries(self) -> None:
+        # requests are completed as soon as they are sent
+        return
+
+
+# Embedded server accepting connections from hubs configured for WebSocket or HTTP
+# callbacks, so that hubs located behind a NAT filter can be used through their own
+# connection.
+#
+# Each incoming connection is handled by a new YGenericHub object, which is merged by
+# serial number with the previous connection of the same hub, if any. Devices of these
+# hubs show up in the next UpdateDeviceList(), as for any preregistered hub. Hubs using
+# HTTP callbacks only stay connected until their callback has been answered.
+#
+# noinspection PyProtectedMember
+class YCallbackServer:
+    _yapi: YAPIContext
+    _urlInfo: YUrl  # callback URL, including the credentials expected from hubs
+    _server: Union[asyncio.Server, None]
+    _hubs: list[YGenericHub]  # hubs currently connected through this server
+
+    def __init__(self, yctx: YAPIContext, urlInfo: YUrl):
+        self._yapi = yctx
+        self._urlInfo = urlInfo
+        self._server = None
+        self._hubs = []
+
+    def matchUrl(self, urlInfo: YUrl) -> bool:
+        return self._urlInfo.port == urlInfo.port
+
+    async def start(self) -> None:
+        # listen on all interfaces
+        host: Union[str, None] = '0.0.0.0' if _IS_MICROPYTHON else None
+        self._server = await asyncio.start_server(self._accept, host, self._urlInfo.port)
+        if _LOG_LEVEL >= 3:
+            self._yapi._Log('Waiting for hub callbacks on port %d' % self._urlInfo.port)
+
+    async def stop(self) -> None:
+        server: Union[asyncio.Server, None] = self._server
+        self._server = None
+        if server:
+            server.close()
+        for hub in self._hubs[:]:
+            hub.removeAllDevices()
+            await hub.detach(YAPI.IO_ERROR, 'Callback server stopped')
+        if server:
+            await server.wait_closed()
+
+    @staticmethod
+    async def _readHeader(reader: asyncio.StreamReader) -> list[str]:
+        lines: list[str] = []
+        size: int = 0
+        while True:
+            line: bytes = await reader.readline()
+            size += len(line)
+            if not line or size > _CALLBACK_MAX_HEADER:
+                raise EOFError('Invalid callback request')
+            line = line.rstrip(b'\r\n')
+            if not line:
+                return lines
+            lines.append(line.decode('latin-1'))
+
+    @staticmethod
+    async def _reply(writer: asyncio.StreamWriter, status: str, body: str, extraHeaders: str = '') -> None:
+        writer.write(('HTTP/1.1 %s\r\nContent-Type: text/plain\r\nContent-Length: %d\r\nConnection: close\r\n%s\r\n%s'
+                      % (status, len(body), extraHeaders, body)).encode('latin-1'))
+        await writer.drain()
+        writer.close()
+
+    # Handle an incoming connection, until the hub disconnects
+    async def _accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        yapi: YAPIContext = self._yapi
+        try:
+            if _IS_MICROPYTHON:
+                lines: list[str] = await asyncio.wait_for_ms(self._readHeader(reader), yapi._networkTimeoutMs)  # noqa
+            else:
+                lines: list[str] = await asyncio.wait_for(self._readHeader(reader), yapi._networkTimeoutMs / 1000.0)
+        except (EOFError, OSError, asyncio.TimeoutError):
+            writer.close()
+            return
+        words: list[str] = lines[0].split(' ') if lines else ['']
+        path: str = words[1] if len(words) > 1 else '/'
+        headers: dict[str, str] = {}
+        for line in lines[1:]:
+            pos: int = line.find(':')
+            if pos > 0:
+                headers[line[:pos].strip().lower()] = line[pos + 1:].strip()
+        subDomain: str = self._urlInfo.subDomain
+        if subDomain and path != subDomain and not path.startswith(subDomain + '?'):
+            await self._reply(writer, '404 Not Found', 'Unknown callback path')
+            return
+        if words[0] == 'POST':
+            await self._acceptHttpCallback(reader, writer, headers)
+            return
+        key: Union[str, None] = headers.get('sec-websocket-key')
+        if words[0] != 'GET' or headers.get('upgrade', '').lower() != 'websocket' or not key:
+            await self._reply(writer, '400 Bad Request', 'Expecting a WebSocket or HTTP callback')
+            return
+        accept: str = binascii.b2a_base64(hashlib.sha1((key + _WS_ACCEPT_GUID).encode('ascii')).digest()).decode('ascii').strip()
+        writer.write(('HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                      'Sec-WebSocket-Accept: %s\r\n\r\n' % accept).encode('ascii'))
+        await writer.drain()
+        if _LOG_LEVEL >= 3:
+            yapi._Log('Incoming callback connection from %s' % str(writer.get_extra_info('peername')))
+        # From now on, the hub is handled like any other websocket hub
+        urlInfo: YUrl = YUrl(self._urlInfo.originalURL, _YOCTO_DEFAULT_PORT, _YOCTO_DEFAULT_HTTPS_PORT)
+        hub: YGenericHub = YGenericHub(yapi, urlInfo)
+        hub._hubEngine = YWebSocketCallbackEngine(hub, urlInfo, reader, writer, path)
+        await self._runHub(hub)
+
+    # Handle an HTTP callback, posting the REST API of all devices of the hub
+    async def _acceptHttpCallback(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, headers: dict[str, str]) -> None:
+        yapi: YAPIContext = self._yapi
+        if self._urlInfo.user:
+            credentials: str = '%s:%s' % (self._urlInfo.user, self._urlInfo._pass)
+            expected: str = 'Basic ' + binascii.b2a_base64(credentials.encode('latin-1')).decode('ascii').strip()
+            if headers.get('authorization') != expected:
+                await self._reply(writer, '401 Unauthorized', 'Authentication required',
+                                  'WWW-Authenticate: Basic realm="YoctoAPI"\r\n')
+                return
+        try:
+            size: int = int(headers.get('content-length', '0'))
+        except ValueError:
+            size = -1
+        if size <= 0 or size > _CALLBACK_MAX_CONTENT:
+            await self._reply(writer, '413 Payload Too Large' if size > 0 else '411 Length Required', 'Invalid callback size')
+            return
+        try:
+            if _IS_MICROPYTHON:
+                body: bytes = await asyncio.wait_for_ms(reader.readexactly(size), yapi._networkTimeoutMs)  # noqa
+            else:
+                body: bytes = await asyncio.wait_for(reader.readexactly(size), yapi._networkTimeoutMs / 1000.0)
+            content: Any = json.loads(body.decode('latin-1'))
+            hubApi: Any = content.get('/api.json') if isinstance(content, dict) else None
+            if not isinstance(hubApi, dict) or 'services' not in hubApi or not isinstance(hubApi.get('module'), dict) \
+                    or not hubApi['module'].get('serialNumber'):
+                raise ValueError('Invalid callback content')
+        except (EOFError, OSError, asyncio.TimeoutError):
+            writer.close()
+            return
+        except ValueError:
+            # includes JSON decoding errors
+            await self._reply(writer, '400 Bad Request', 'Expecting the JSON content of a Yocto-API callback')
+            return
+        if _LOG_LEVEL >= 3:
+            yapi._Log('Incoming HTTP callback from %s' % str(writer.get_extra_info('peername')))
+        urlInfo: YUrl = YUrl(self._urlInfo.originalURL, _YOCTO_DEFAULT_PORT, _YOCTO_DEFAULT_HTTPS_PORT)
+        hub: YGenericHub = YGenericHub(yapi, urlInfo)
+        engine: YHttpCallbackEngine = YHttpCallbackEngine(hub, urlInfo, content)
+        hub._hubEngine = engine
+        # changes are applied by the hub itself, with the rights of its callback settings
+        hub.setRwAccess(True)
+        await self._runHub(hub)
+        try:
+            await self._reply(writer, '200 OK', engine.get_commands())
+        except OSError:
+            writer.close()
+
+    # Run the engine of a hub connected through this server, until the connection ends
+    async def _runHub(self, hub: YGenericHub) -> None:
+        yapi: YAPIContext = self._yapi
+        hub._setTargetState(_HUB_CALLBACK)
+        hub._setState(_HUB_CONNECTING)
+        self._hubs.append(hub)
+        yapi._hubs.append(hub)
+        yapi._updateRegisteredHubs(hub, True)
+        try:
+            await hub._hubEngine.reconnectEngine(hub._getNewConnID())
+        finally:
+            self._hubs.remove(hub)
+            if hub in yapi._hubs:
+                # hub has not been merged into another connection to the same hub
+                hub.removeAllDevices()
+                yapi._hubs.remove(hub)
+                yapi._updateRegisteredHubs(hub, False)
+            if hub._hubEngine:
+                await hub._hubEngine.close()
+            hub._release()
+
+
 #################################################################################
 #                                                                               #
 #                                YFunction                                      #
@@ -7066,6 +9003,7 @@ class YFunction:
     _lastErrorMsg: str
     _userData: Any
     _cache: Union[xdict, None]
+    _valueStreams: Union[list[YEventStream], None]
     # --- (generated code: YFunction attributes declaration)
     _valueCallback: YFunctionValueCallback
     _cacheExpiration: int
@@ -7081,6 +9019,7 @@ class YFunction:
         self._lastErrorMsg = ""
         self._userData = None
         self._cache = None
+        self._valueStreams = None
         # --- (generated code: YFunction constructor)
         self._valueCallback = None
         self._cacheExpiration = 0
@@ -7215,7 +9154,7 @@ class YFunction:
         return self.describe()
 
     async def _updateValueCallback(self, callback: YFunctionValueCallback) -> str:
-        if callback:
+        if callback or self._valueStreams:
             await self._yapi._UpdateValueCallbackList(self, True)
         else:
             await self._yapi._UpdateValueCallbackList(self, False)
@@ -7247,6 +9186,50 @@ class YFunction:
                 await retval
         return YAPI.SUCCESS
 
+    def _invokeValueCallback(self, value: str) -> Union[Coroutine, None]:
+        retval: Union[Coroutine, None] = None
+        if self._valueCallback:
+            retval = self._valueCallback(self, value)
+        if self._valueStreams:
+            return YEventStream._dispatch(self._valueStreams, value, retval)
+        return retval
+
+    # Keep the function registered for notifications as long as a callback or a stream needs them
+    async def _updateStreams(self, streams: list[YEventStream], add: bool) -> None:
+        if streams is self._valueStreams:
+            await self._yapi._UpdateValueCallbackList(self, add or len(streams) > 0 or self._valueCallback is not None)
+
+    def valueStream(self, maxsize: int = 64, policy: int = YEventStream.DROP_OLDEST) -> YEventStream:
+        """
+        Returns an asynchronous iterator over the changes of advertised value of the function,
+        to be used with async for. The iterator yields the new advertised values as character
+        strings. Notifications are delivered from the time the iteration starts until the
+        stream is closed. Several streams can be used in parallel, as well as a callback.
+
+        @param maxsize : the maximal number of notifications kept in the stream buffer,
+                or 0 for an unbounded buffer.
+        @param policy : what to do when the buffer is full: YEventStream.DROP_OLDEST,
+                YEventStream.DROP_NEWEST or YEventStream.BLOCK (wait until the consumer
+                catches up, which also delays the dispatching of other notifications)
+
+        @return an YEventStream object
+        """
+        if self._valueStreams is None:
+            self._valueStreams = []
+        return YEventStream(self, self._valueStreams, maxsize, policy)
+
+    def batch(self) -> YAttrBatch:
+        """
+        Returns a transaction object to be used with async with, that collects all
+        attribute changes made by the current task on the module hosting this function,
+        and on any of its functions, and sends them to the device at the end of the block. Attribute
+        changes are coalesced and sent back-to-back, and the result of each change is
+        available from the transaction object once the block is completed.
+
+        @return an YAttrBatch object
+        """
+        return YAttrBatch(self)
+
     # Retrieve an attribute value from cache, with cache auto-refresh
     async def _fromCache(self, attrName: str):
         if ticks_past(self._cacheExpiration) or not self._cacheExpiration:
@@ -7655,8 +9638,18 @@ class YFunction:
         """
         if newval is None:
             return self._throw(YAPI.INVALID_ARGUMENT, "Undefined value to set for attribute " + attrname)
-        extra: str = "/" + attrname + "?" + attrname + "=" + self._escapeAttr(newval) + "&."
         try:
+            batches: Union[dict[str, YAttrBatch], None] = YAttrBatch._openBatches(self._yapi)
+            if batches:
+                dev: YDevice = await self._getDev()
+                batch: Union[YAttrBatch, None] = batches.get(dev._serial)
+                if batch:
+                    if attrname not in YAttrBatch._COMMAND_ATTRS:
+                        batch._record(self, self._hwId.function, attrname, newval)
+                        return YAPI.SUCCESS
+                    # commands apply to the changes made before them
+                    await batch.commit()
+            extra: str = "/" + attrname + "?" + attrname + "=" + self._escapeAttr(newval) + "&."
             await self._devRequest(extra)
             if self._cacheExpiration:
                 self._cacheExpiration = ticks_ms()
@@ -7701,9 +9694,31 @@ class YFunction:
             self._rethrow(e)
             return xbytearray(0)
 
+    @staticmethod
+    def _json_load(jsonBin: xarray) -> Any:
+        if _IS_MICROPYTHON or not isinstance(jsonBin, xarray):
+            return json.load(xStringIO(jsonBin, 'latin-1'))
+        # In CPython, keep the parse tree with the buffer, and reuse it as long as the content is unchanged
+        # Parse trees are shared: callers must never modify them
+        tree: Union[tuple, None] = jsonBin._jsonTree
+        if tree is not None and tree[0] == jsonBin._obj:
+            return tree[1]
+        content: bytes = bytes(jsonBin._obj)
+        obj: Any = json.loads(str(content, 'latin-1'))
+        jsonBin._jsonTree = (content, obj)
+        return obj
+
+    @staticmethod
+    def _json_dump(obj: Any, ensure_ascii: bool = True) -> xbytearray:
+        res: xbytearray = xbytearray(json.dumps(obj, ensure_ascii=ensure_ascii), 'latin-1')
+        if not _IS_MICROPYTHON:
+            # the parse tree of the new buffer is already known
+            res._jsonTree = (bytes(res._obj), obj)
+        return res
+
     @staticmethod
     def _json_get_key(jsonBin: xarray, key: str) -> str:
-        obj: dict = json.load(xStringIO(jsonBin, 'latin-1'))
+        obj: dict = YFunction._json_load(jsonBin)
         val = obj.get(key)
         if val is not None:
             return str(val)
@@ -7711,24 +9726,23 @@ class YFunction:
 
     @staticmethod
     def _json_get_string(jsonBin: xarray) -> str:
-        res: str = json.load(xStringIO(jsonBin, 'latin-1'))
+        res: str = YFunction._json_load(jsonBin)
         return res
 
     @staticmethod
     def _json_get_array(jsonBin: xarray) -> list[xarray]:
-        obj: list = json.load(xStringIO(jsonBin, 'latin-1'))
+        obj: list = YFunction._json_load(jsonBin)
         # type cheat: this function normally returns a list of strings,
         #             but this would eat too much heap space for micropython.
         #             => reduce type checks by declaring an untyped list...
         res: list = []
         for val in obj:
-            res.append(xbytearray(json.dumps(val), 'latin-1'))
+            res.append(YFunction._json_dump(val))
         return res
 
     @staticmethod
     def _get_json_path(jsonBin: xarray, path: str) -> xarray:
-        xio = xStringIO(jsonBin, 'latin-1')
-        obj: dict = json.load(xio)
+        obj: dict = YFunction._json_load(jsonBin)
         paths: list[str] = path.split('|')
         for subpath in paths:
             if isinstance(obj, list):
@@ -7741,18 +9755,17 @@ class YFunction:
                 obj = obj.get(subpath)
                 if obj is None:
                     return xbytearray()
-        json_str = json.dumps(obj, ensure_ascii=False)
-        return xbytearray(json_str, 'latin-1')
+        return YFunction._json_dump(obj, False)
 
     @staticmethod
     def _decode_json_string(jsonBin: xarray) -> str:
         if len(jsonBin) == 0:
             return ''
-        return json.load(xStringIO(jsonBin, 'latin-1'))
+        return YFunction._json_load(jsonBin)
 
     @staticmethod
     def _decode_json_int(jsonBin: xarray) -> int:
-        res: int = json.load(xStringIO(jsonBin, 'latin-1'))
+        res: int = YFunction._json_load(jsonBin)
         return res
 
     async def _devRequest(self, extra: str) -> Union[xdict, None]:
@@ -9496,6 +11509,10 @@ class YConsolidatedDataSet:
     _nextidx: list[int]
     _nexttim: list[float]
     # --- (end of generated code: YConsolidatedDataSet attributes declaration)
+    _heap: list[float]  # next timestamps of sensors with pending measures
+    _pending: dict[float, list[int]]  # sensors with pending measures, by next timestamp
+    _refill: list[int]  # sensors for which the next timestamp must be determined
+    _progressSum: int
 
     def __init__(self, start: float, end: float, sensorList: list[YSensor]):
         # --- (generated code: YConsolidatedDataSet constructor)
@@ -9508,8 +11525,138 @@ class YConsolidatedDataSet:
         self._nextidx = []
         self._nexttim = []
         # --- (end of generated code: YConsolidatedDataSet constructor)
+        self._heap = []
+        self._pending = {}
+        self._refill = []
+        self._progressSum = 0
         self.imm_init(start, end, sensorList)
 
+    # Retrieve the datasets of all sensors, and load their first streams concurrently
+    async def _loadDatasets(self) -> None:
+        self._nsensors = len(self._sensors)
+        self._datasets = await asyncio.gather(*[sensor.get_recordedData(self._start, self._end) for sensor in self._sensors])
+        self._progresss = [0] * self._nsensors
+        self._nextidx = [0] * self._nsensors
+        self._nexttim = [0.0] * self._nsensors
+        self._heap = []
+        self._pending = {}
+        self._refill = list(range(self._nsensors))
+        self._progressSum = 0
+
+    # Queue the timestamp of the next measure of a sensor, if already loaded
+    def _queueSensor(self, s: int) -> bool:
+        measures: list[YMeasure] = self._datasets[s].get_measures()
+        idx: int = self._nextidx[s]
+        if idx >= len(measures):
+            return False
+        nexttim: float = measures[idx].get_endTimeUTC()
+        if nexttim > 0:
+            self._nexttim[s] = nexttim
+            sensors: Union[list[int], None] = self._pending.get(nexttim)
+            if sensors is None:
+                self._pending[nexttim] = [s]
+                heapq.heappush(self._heap, nexttim)
+            else:
+                sensors.append(s)
+        return True
+
+    # Determine the next timestamp of all sensors in the refill list, loading
+    # more data when needed, concurrently for all sensors
+    async def _refillSensors(self) -> None:
+        toLoad: list[int] = []
+        datasets: list[YDataSet] = self._datasets
+        nextidx: list[int] = self._nextidx
+        pending: dict[float, list[int]] = self._pending
+        lastTim: float = 0.0
+        lastSensors: list[int] = []
+        for s in self._refill:
+            # inlined version of _queueSensor, as all sensors may need to be refilled after each record
+            measures: list[YMeasure] = datasets[s]._measures
+            idx: int = nextidx[s]
+            if idx < len(measures):
+                nexttim: float = measures[idx]._end
+                if nexttim > 0:
+                    self._nexttim[s] = nexttim
+                    if nexttim != lastTim:
+                        lastTim = nexttim
+                        sensors: Union[list[int], None] = pending.get(nexttim)
+                        if sensors is None:
+                            sensors = []
+                            pending[nexttim] = sensors
+                            heapq.heappush(self._heap, nexttim)
+                        lastSensors = sensors
+                    lastSensors.append(s)
+            elif self._progresss[s] < 100:
+                toLoad.append(s)
+        self._refill = []
+        while toLoad:
+            results: list[int] = await asyncio.gather(*[self._datasets[s].loadMore() for s in toLoad])
+            retry: list[int] = []
+            for s, currprogress in zip(toLoad, results):
+                if currprogress < 0:
+                    currprogress = 100
+                self._progressSum += currprogress - self._progresss[s]
+                self._progresss[s] = currprogress
+                if not self._queueSensor(s) and currprogress < 100:
+                    retry.append(s)
+            toLoad = retry
+
+    # Append the next consolidated record to datarec and return the global progress
+    async def _mergeNext(self, datarec: list[float]) -> int:
+        if self._refill:
+            await self._refillSensors()
+        if not self._heap:
+            return 100
+        nexttime: float = heapq.heappop(self._heap)
+        datarec.append(nexttime)
+        datarec.extend([math.nan] * self._nsensors)
+        sensors: list[int] = self._pending.pop(nexttime)
+        datasets: list[YDataSet] = self._datasets
+        nextidx: list[int] = self._nextidx
+        for s in sensors:
+            idx: int = nextidx[s]
+            datarec[s + 1] = datasets[s]._measures[idx]._avgVal
+            self._nexttim[s] = 0.0
+            nextidx[s] = idx + 1
+        self._refill.extend(sensors)
+        globprogress: int = self._progressSum // self._nsensors
+        if globprogress > 99:
+            globprogress = 99
+        return globprogress
+
+    async def nextRecords(self, records: list[list[float]], maxRecords: int = 1000) -> int:
+        """
+        Extracts a block of consecutive data records from the data logger of all
+        sensors linked to this object. Each record has the same format as
+        the records returned by nextRecord(). Datasets from different sensors
+        are loaded concurrently when needed.
+
+        @param records : list that will be filled by the function with up to maxRecords
+                records, each one being a list of floating point numbers with the timestamp
+                of the measure in first position, followed by the measured values.
+        @param maxRecords : the maximal number of records to extract (default 1000).
+
+        @return an integer in the range 0 to 100 (percentage of completion),
+                or a negative error code in case of failure. When 100 is returned,
+                all records have been extracted, but the last block may still
+                contain some records.
+
+        On failure, throws an exception or returns a negative error code.
+        """
+        if self._nsensors == -1:
+            await self._loadDatasets()
+        del records[:]
+        globprogress: int = 0
+        while len(records) < maxRecords:
+            datarec: list[float] = []
+            globprogress = await self._mergeNext(datarec)
+            if not datarec:
+                return 100
+            records.append(datarec)
+        if not self._heap and not self._refill:
+            return 100
+        return globprogress
+
         # --- (generated code: YConsolidatedDataSet implementation)
     def imm_init(self, startt: float, endt: float, sensorList: list[YSensor]) -> int:
         self._start = startt
@@ -9659,6 +11806,14 @@ class YConsolidatedDataSet:
 
     # --- (end of generated code: YConsolidatedDataSet implementation)
 
+    # Overrides the generated nextRecord(), to load all datasets concurrently
+    # and merge their measures in timestamp order using a heap
+    async def nextRecord(self, datarec: list[float]) -> int:
+        if self._nsensors == -1:
+            await self._loadDatasets()
+        del datarec[:]
+        return await self._mergeNext(datarec)
+
 
 #################################################################################
 #                                                                               #
@@ -9809,6 +11964,7 @@ class YSensor(YFunction):
     _iresol: float
     # --- (end of generated code: YSensor attributes declaration)
     _cal: Union[YCalibCtx, None]
+    _timedReportStreams: Union[list[YEventStream], None]
     if not _IS_MICROPYTHON:
         _dataStreams: dict[str, YDataStream]
 
@@ -9820,6 +11976,7 @@ class YSensor(YFunction):
         self._iresol = 0.0
         # --- (end of generated code: YSensor constructor)
         self._cal = None
+        self._timedReportStreams = None
         if not _IS_MICROPYTHON:
             self._dataStreams = dict()
 
@@ -10652,13 +12809,47 @@ class YSensor(YFunction):
                 the new advertised value.
         @noreturn
         """
-        if callback:
+        if callback or self._timedReportStreams:
             await self._yapi._UpdateTimedReportCallbackList(self, True)
         else:
             await self._yapi._UpdateTimedReportCallbackList(self, False)
         self._timedReportCallback = callback
         return YAPI.SUCCESS
 
+    def _invokeTimedReportCallback(self, value: YMeasure) -> Union[Coroutine, None]:
+        retval: Union[Coroutine, None] = None
+        if self._timedReportCallback:
+            retval = self._timedReportCallback(self, value)
+        if self._timedReportStreams:
+            return YEventStream._dispatch(self._timedReportStreams, value, retval)
+        return retval
+
+    async def _updateStreams(self, streams: list[YEventStream], add: bool) -> None:
+        if streams is self._timedReportStreams:
+            needed: bool = add or len(streams) > 0 or self._timedReportCallback is not None
+            await self._yapi._UpdateTimedReportCallbackList(self, needed)
+        else:
+            await super()._updateStreams(streams, add)
+
+    def timedReportStream(self, maxsize: int = 64, policy: int = YEventStream.DROP_OLDEST) -> YEventStream:
+        """
+        Returns an asynchronous iterator over the periodic timed notifications of the sensor,
+        to be used with async for. The iterator yields YMeasure objects. Notifications are
+        delivered from the time the iteration starts until the stream is closed. Several
+        streams can be used in parallel, as well as a callback.
+
+        @param maxsize : the maximal number of notifications kept in the stream buffer,
+                or 0 for an unbounded buffer.
+        @param policy : what to do when the buffer is full: YEventStream.DROP_OLDEST,
+                YEventStream.DROP_NEWEST or YEventStream.BLOCK (wait until the consumer
+                catches up, which also delays the dispatching of other notifications)
+
+        @return an YEventStream object
+        """
+        if self._timedReportStreams is None:
+            self._timedReportStreams = []
+        return YEventStream(self, self._timedReportStreams, maxsize, policy)
+
 
 #################################################################################
 #                                                                               #
@@ -10713,6 +12904,8 @@ class YDataStream:
     _values: list[list[float]]
     _isLoaded: bool
     # --- (end of generated code: YDataStream attributes declaration)
+    if not _IS_MICROPYTHON:
+        _columns: Union[tuple[array.array, array.array, array.array], None]  # min/avg/max, when decoded by columns
 
     def __init__(self, obj_parent: YSensor, obj_dataset: YDataSet, encoded: list[int]):
         # --- (generated code: YDataStream constructor)
@@ -10736,6 +12929,8 @@ class YDataStream:
         # --- (end of generated code: YDataStream constructor)
         self._parent = obj_parent
         self._yapi = self._parent._yapi
+        if not _IS_MICROPYTHON:
+            self._columns = None
         if obj_dataset is not None:
             self._initFromDataSet(obj_dataset, encoded)
 
@@ -11148,6 +13343,65 @@ class YDataStream:
 
     # --- (end of generated code: YDataStream implementation)
 
+    if not _IS_MICROPYTHON:
+        # Same as _parseStream, but decoding the stream into min/avg/max columns of doubles,
+        # without creating any Python object per row
+        def _parseColumns(self, sdata: xarray) -> int:
+            self._isLoaded = True
+            self._columns = None
+            self._nRows = 0
+            if len(sdata) == 0:
+                return YAPI.SUCCESS
+            udat: list[int] = YAPIContext._decodeWords(self._parent._json_get_string(sdata))
+            stride: int = 3 if self._isAvg else 1
+            nRows: int = len(udat) // (2 * stride)
+            # each value is a little-endian pair of 16 bit words: map them to int32
+            words: array.array = array.array('H', udat[:2 * stride * nRows])
+            raw: array.array = array.array('i')
+            if sys.byteorder == 'little':
+                raw.frombytes(words.tobytes())
+            else:
+                words.byteswap()
+                raw.frombytes(words.tobytes())
+                raw.byteswap()
+            nan: float = math.nan
+            # average values are stored with their sign bit flipped, 0xffffffff marks missing data
+            avgRaw: array.array = raw[0::stride]
+            avgCol: array.array = array.array('d', [nan if v == -1 else (v ^ -0x80000000) / 1000.0 for v in avgRaw])
+            if self._isAvg:
+                minCol: array.array = array.array('d', [nan if a == -1 else v / 1000.0 for a, v in zip(avgRaw, raw[1::3])])
+                maxCol: array.array = array.array('d', [nan if a == -1 else v / 1000.0 for a, v in zip(avgRaw, raw[2::3])])
+            cal: Union[YCalibCtx, None] = self._cal
+            if cal:
+                typ: int = cal.typ
+                par: list[float] = cal.par
+                calraw: list[float] = cal.raw
+                calref: list[float] = cal.cal
+                avgCol = array.array('d', [_linCalHdl(v, typ, par, calraw, calref) for v in avgCol])
+                if self._isAvg:
+                    minCol = array.array('d', [_linCalHdl(v, typ, par, calraw, calref) for v in minCol])
+                    maxCol = array.array('d', [_linCalHdl(v, typ, par, calraw, calref) for v in maxCol])
+            if self._isAvg:
+                self._columns = (minCol, avgCol, maxCol)
+            else:
+                self._columns = (avgCol, avgCol, avgCol)
+            self._nRows = nRows
+            return YAPI.SUCCESS
+
+        # Return min/avg/max columns, and release them
+        async def _takeColumns(self) -> tuple[array.array, array.array, array.array]:
+            columns: Union[tuple[array.array, array.array, array.array], None] = self._columns
+            if columns is not None:
+                self._columns = None
+                self._isLoaded = False
+                return columns
+            # stream has been decoded by rows
+            rows: list[list[float]] = await self.get_dataRows()
+            nCols: int = len(rows[0]) if rows else 1
+            return (array.array('d', [row[0] for row in rows]),
+                    array.array('d', [row[nCols // 2] for row in rows]),
+                    array.array('d', [row[nCols - 1] for row in rows]))
+
 
 # --- (generated code: YDataSet class start)
 # noinspection PyRedundantParentheses
@@ -11198,6 +13452,10 @@ class YDataSet:
     _summaryTotalAvg: float
     _summaryTotalTime: float
     # --- (end of generated code: YDataSet attributes declaration)
+    _columns: Union[list[array.array], None]  # start/end/min/avg/max columns, in columnar mode
+    _prefetchDepth: int  # max number of stream downloads started ahead of loadMore()
+    _bulkStreams: int  # max number of streams per logger.json request, as announced by the device
+    _prefetchTasks: dict[int, asyncio.Task]  # pending prefetch task, by stream index
 
     def __init__(self, parent: YSensor, functionId: str = '', unit: str = '', startTime: float = 0.0, endTime: float = 0.0):
         # --- (generated code: YDataSet constructor)
@@ -11218,6 +13476,10 @@ class YDataSet:
         self._summaryTotalTime = 0.0
         # --- (end of generated code: YDataSet constructor)
         self._summary = YMeasure(0, 0, 0, 0, 0)
+        self._columns = None
+        self._prefetchDepth = 0
+        self._bulkStreams = 0
+        self._prefetchTasks = {}
         if not functionId:
             self._initFromJson(parent)
         else:
@@ -11254,7 +13516,9 @@ class YDataSet:
         self._functionId = loadval["id"]
         self._unit = loadval["unit"]
         if "bulk" in loadval:
-            self._bulkLoad = YAPI._atoi(loadval["bulk"])
+            # bulk downloads are made by the loadMore() override, through _downloadStreams(),
+            # so _bulkLoad is left to zero to disable the bulk preload of the generated processMore()
+            self._bulkStreams = YAPI._atoi(loadval["bulk"])
         if "calib" in loadval:
             self._calib = YAPIContext._decodeFloats(loadval["calib"])
             self._calib[0] = round(self._calib[0] / 1000)
@@ -11263,6 +13527,8 @@ class YDataSet:
         self._streams = []
         self._preview = []
         self._measures = []
+        if self._columns is not None:
+            self._columns = [array.array('d') for _ in range(5)]
         for i in range(len(loadval["streams"])):
             stream: Union[YDataStream | None] = await self._parent._findDataStream(self, loadval["streams"][i])
             if stream is None:
@@ -11277,9 +13543,222 @@ class YDataSet:
                 pass
             else:
                 self._streams.append(stream)
+        if not _IS_MICROPYTHON and self._yapi._dataMirror is not None:
+            await self._loadFromMirror()
         self._progress = 0
         return self.get_progress()
 
+    # Download logger.json data, and save closed streams in the datalogger mirror if enabled
+    async def _downloadStreams(self, url: str) -> xarray:
+        tracer: Union[YTracer, None] = self._yapi._tracer
+        if tracer is not None:
+            startNs: int = time.perf_counter_ns()
+            data: xarray = await self._parent._download(url)
+            tracer.streamLoaded(self, url, len(data), startNs)
+        else:
+            data: xarray = await self._parent._download(url)
+        if not _IS_MICROPYTHON and self._yapi._dataMirror is not None:
+            await self._storeToMirror(url, data)
+        return data
+
+    if not _IS_MICROPYTHON:
+        # Load all closed streams available in the datalogger mirror
+        async def _loadFromMirror(self) -> None:
+            serial, _, funcId = (await self.get_hardwareId()).partition('.')
+            mirror: YDataLoggerMirror = self._yapi._dataMirror
+            streams: list[YDataStream] = [stream for stream in self._streams
+                                          if not stream._wasLoaded() and stream._isClosed and stream._utcStamp != 0]
+            if not streams:
+                return
+            found: dict[tuple[int, int], str] = await mirror.getStreams(
+                serial, funcId, [(stream._runNo, stream._utcStamp) for stream in streams])
+            for stream in streams:
+                sdata: Union[str, None] = found.get((stream._runNo, stream._utcStamp))
+                if sdata is None:
+                    continue
+                if self._columns is None:
+                    stream._parseStream(xbytearray(sdata, 'latin-1'))
+                else:
+                    stream._parseColumns(xbytearray(sdata, 'latin-1'))
+
+        # Save the closed streams included in a logger.json response
+        async def _storeToMirror(self, url: str, data: xarray) -> None:
+            baseurl, _, suffixes = url.partition("&utc=")
+            if not suffixes or len(data) == 0:
+                return
+            baseurl = baseurl + "&utc="
+            suffixList: list[str] = suffixes.split(",")
+            streamBin: list[xarray]
+            if data[0] == 91:  # '[': bulk download
+                streamBin = self._parent._json_get_array(data)
+            else:
+                streamBin = [data]
+            streams: dict[str, YDataStream] = {}
+            for stream in self._streams:
+                if stream._get_baseurl() == baseurl:
+                    streams[stream._get_urlsuffix()] = stream
+            entries: list[tuple[int, int, str]] = []
+            for suffix, sdata in zip(suffixList, streamBin):
+                stream = streams.get(suffix)
+                if stream is not None and stream._isClosed and stream._utcStamp != 0:
+                    entries.append((stream._runNo, stream._utcStamp, sdata.decode('latin-1')))
+            if entries:
+                serial, _, funcId = (await self.get_hardwareId()).partition('.')
+                self._yapi._dataMirror.putStreams(serial, funcId, entries)
+
+    def set_prefetchDepth(self, depth: int) -> int:
+        """
+        Enables the download of data streams ahead of loadMore() calls. Up to depth
+        downloads are started in the background, and decoded as soon as they are received,
+        so that network round-trip time overlaps with the processing of previous streams.
+        When the device supports bulk loading, each download covers several streams.
+        Requests to a given device are still sent one at a time, in order.
+        Prefetching is disabled by default.
+
+        @param depth : the maximal number of downloads started in advance, or 0 to disable prefetching.
+
+        @return YAPI.SUCCESS when the call succeeds.
+        """
+        self._prefetchDepth = max(depth, 0)
+        return YAPI.SUCCESS
+
+    # Wait for the prefetch of the current stream if any, and start prefetching next streams
+    async def _prefetchNext(self) -> None:
+        task: Union[asyncio.Task, None] = self._prefetchTasks.pop(self._progress, None)
+        nStreams: int = len(self._streams)
+        if self._prefetchDepth > 0:
+            inFlight: list[asyncio.Task] = []
+            for pending in self._prefetchTasks.values():
+                if pending not in inFlight:
+                    inFlight.append(pending)
+            idx: int = self._progress + 1
+            while len(inFlight) < self._prefetchDepth and idx < nStreams:
+                if idx in self._prefetchTasks or self._streams[idx]._wasLoaded():
+                    idx += 1
+                    continue
+                group: list[int] = self._streamGroup(idx)
+                pending = self._yapi.create_task(self._prefetchStreams(group))
+                for pos in group:
+                    self._prefetchTasks[pos] = pending
+                inFlight.append(pending)
+                idx += 1
+        if task is not None:
+            await task
+
+    # Select the streams to download with the stream at index idx, for bulk loading
+    def _streamGroup(self, idx: int) -> list[int]:
+        group: list[int] = [idx]
+        baseurl: str = self._streams[idx]._get_baseurl()
+        nxt: int = idx + 1
+        while nxt < len(self._streams) and len(group) < self._bulkStreams:
+            stream: YDataStream = self._streams[nxt]
+            if nxt not in self._prefetchTasks and not stream._wasLoaded() and stream._get_baseurl() == baseurl:
+                group.append(nxt)
+            nxt += 1
+        return group
+
+    # Download and decode a group of streams, in a single request
+    async def _loadStreams(self, group: list[int]) -> None:
+        streams: list[YDataStream] = [self._streams[idx] for idx in group]
+        url: str = streams[0]._get_url()
+        for stream in streams[1:]:
+            url = url + "," + stream._get_urlsuffix()
+        data: xarray = await self._downloadStreams(url)
+        # a single stream is not returned as an array
+        streamBin: list[xarray] = self._parent._json_get_array(data) if len(streams) > 1 else [data]
+        for stream, sdata in zip(streams, streamBin):
+            if stream._wasLoaded():
+                continue
+            if _IS_MICROPYTHON or self._columns is None:
+                stream._parseStream(sdata)
+            else:
+                stream._parseColumns(sdata)
+
+    async def _prefetchStreams(self, group: list[int]) -> None:
+        try:
+            await self._loadStreams(group)
+        except YAPI_Exception:
+            # streams will be loaded again by loadMore()
+            pass
+
+    if not _IS_MICROPYTHON:
+        def set_columnarMode(self, enabled: bool) -> int:
+            """
+            Selects how loadMore() stores the measures of this YDataSet. In columnar mode,
+            measures are not stored as YMeasure objects anymore, but appended to arrays of
+            doubles available through get_measuresArray(). This is much faster and uses
+            far less memory for large amounts of measures. Must be called before the first
+            call to loadMore().
+
+            @param enabled : True to store measures in columns, False for YMeasure objects.
+
+            @return YAPI.SUCCESS when the call succeeds.
+            """
+            if not enabled:
+                self._columns = None
+            elif self._columns is None:
+                self._columns = [array.array('d') for _ in range(5)]
+            return YAPI.SUCCESS
+
+        def get_measuresArray(self) -> list[array.array]:
+            """
+            Returns all measured values currently available for this DataSet in columnar
+            mode, as five arrays of doubles of the same length: start time of the measure
+            interval, end time of the measure interval (both in seconds since Jan 1, 1970),
+            minimal value, average value and maximal value observed during the interval.
+            The arrays can be wrapped without copy into NumPy arrays using numpy.frombuffer().
+
+            Before calling this method, you should enable columnar mode using
+            set_columnarMode() and call loadMore() until all rows are loaded.
+
+            @return a list of five array('d') objects, which are empty if columnar mode is disabled.
+            """
+            if self._columns is None:
+                return [array.array('d') for _ in range(5)]
+            return self._columns
+
+        # Columnar version of processMore
+        async def _processMoreColumns(self, stream: YDataStream, data: xarray) -> int:
+            if not stream._wasLoaded():
+                stream._parseColumns(data)
+            minCol, avgCol, maxCol = await stream._takeColumns()
+            self._progress += 1
+            if len(avgCol) > 0:
+                self._appendColumns(stream, minCol, avgCol, maxCol)
+            return self.get_progress()
+
+        def _appendColumns(self, stream: YDataStream, minCol: array.array, avgCol: array.array, maxCol: array.array) -> None:
+            nRows: int = len(avgCol)
+            tim: int = round(stream.get_realStartTimeUTC() * 1000)
+            fitv: int = round(stream.get_firstDataSamplesInterval() * 1000)
+            itv: int = round(stream.get_dataSamplesInterval() * 1000)
+            if fitv == 0:
+                fitv = itv
+            if tim < itv:
+                tim = itv
+            # row k ends at firstEnd + k * itv, and starts where the previous row ends
+            firstEnd: int = tim + fitv
+            startMs: float = self._startTimeMs
+            endMs: float = self._endTimeMs
+            keep: list[int] = [k for k in range(nRows)
+                               if firstEnd + k * itv > startMs
+                               and (endMs == 0 or (firstEnd + (k - 1) * itv if k else tim) < endMs)
+                               and avgCol[k] == avgCol[k]]
+            cols: list[array.array] = self._columns
+            if len(keep) == nRows:
+                cols[0].append(tim / 1000)
+                cols[0].extend([(firstEnd + k * itv) / 1000 for k in range(nRows - 1)])
+                cols[1].extend([(firstEnd + k * itv) / 1000 for k in range(nRows)])
+                cols[2].extend(minCol)
+                cols[3].extend(avgCol)
+                cols[4].extend(maxCol)
+            else:
+                cols[0].extend([(firstEnd + (k - 1) * itv if k else tim) / 1000 for k in keep])
+                cols[1].extend([(firstEnd + k * itv) / 1000 for k in keep])
+                cols[2].extend([minCol[k] for k in keep])
+                cols[3].extend([avgCol[k] for k in keep])
+                cols[4].extend([maxCol[k] for k in keep])
+
     # --- (generated code: YDataSet implementation)
     def _get_calibration(self) -> list[int]:
         return self._calib
@@ -11779,6 +14258,28 @@ class YDataSet:
 
     # --- (end of generated code: YDataSet implementation)
 
+    # Wrappers around the generated processMore() and loadMore(), for columnar mode,
+    # prefetching and bulk downloads through _downloadStreams()
+    _processMoreGen = processMore
+    _loadMoreGen = loadMore
+
+    async def processMore(self, progress: int, data: xarray) -> int:
+        if self._columns is None or progress != self._progress or self._progress < 0:
+            return await self._processMoreGen(progress, data)
+        return await self._processMoreColumns(self._streams[self._progress], data)
+
+    async def loadMore(self) -> int:
+        if 0 <= self._progress < len(self._streams):
+            await self._prefetchNext()
+            if not self._streams[self._progress]._wasLoaded():
+                # load the stream and the next ones, so that the generated code finds them loaded
+                group: list[int] = self._streamGroup(self._progress)
+                try:
+                    await self._loadStreams(group)
+                except YAPI_Exception:
+                    await self._loadStreams(group)
+        return await self._loadMoreGen()
+
 
 # --- (generated code: YDataLogger class start)
 if not _IS_MICROPYTHON:
@@ -12383,3 +14884,279 @@ if not _IS_MICROPYTHON:
             self._SSDPCache[uuid] = entry
             if self._callback is not None:
                 self._callback(entry['serial'], url, None)
+
+
+if not _IS_MICROPYTHON:
+    #################################################################################
+    #                                                                               #
+    #                         Datalogger mirror support                             #
+    #                                                                               #
+    #################################################################################
+
+    class YDataLoggerMirror:
+        """
+        Local copy of closed datalogger streams, stored in an SQLite database
+        and keyed by module serial number, function ID, run number and
+        stream start time. Closed streams never change on the device, so
+        they can be reused instead of being downloaded again.
+
+        The database is only accessed from a dedicated worker thread, so that
+        the event loop never waits for the disk. Stream writes are queued, and
+        all streams received meanwhile are saved by a single transaction.
+        """
+        _executor: concurrent.futures.ThreadPoolExecutor
+        _db: sqlite3.Connection
+        _pendingLock: threading.Lock
+        _pending: list[tuple[str, str, int, int, str]]  # streams waiting to be saved
+
+        def __init__(self, path: str):
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='YDataLoggerMirror')
+            self._pendingLock = threading.Lock()
+            self._pending = []
+            try:
+                self._executor.submit(self._open, path).result()
+            except Exception:
+                self._executor.shutdown(wait=False)
+                raise
+
+        # Runs in the worker thread
+        def _open(self, path: str) -> None:
+            import sqlite3  # imported on demand, as some minimal Python builds do not include it
+            self._db = sqlite3.connect(path)
+            self._db.execute("CREATE TABLE IF NOT EXISTS streams ("
+                             "serial TEXT NOT NULL, funcid TEXT NOT NULL, run INTEGER NOT NULL, utc INTEGER NOT NULL, "
+                             "data TEXT NOT NULL, PRIMARY KEY (serial, funcid, run, utc))")
+            self._db.commit()
+
+        # Runs in the worker thread: saves all queued streams in one transaction
+        def _flush(self) -> None:
+            with self._pendingLock:
+                rows, self._pending = self._pending, []
+            if rows:
+                self._db.executemany("INSERT OR REPLACE INTO streams VALUES (?, ?, ?, ?, ?)", rows)
+                self._db.commit()
+
+        # Runs in the worker thread
+        def _getStreams(self, serial: str, funcId: str, keys: list[tuple[int, int]]) -> dict[tuple[int, int], str]:
+            res: dict[tuple[int, int], str] = {}
+            for runNo, utcStamp in keys:
+                row = self._db.execute("SELECT data FROM streams WHERE serial=? AND funcid=? AND run=? AND utc=?",
+                                       (serial, funcId, runNo, utcStamp)).fetchone()
+                if row is not None:
+                    res[(runNo, utcStamp)] = row[0]
+            return res
+
+        def _clear(self, serial: str) -> None:
+            if serial:
+                self._db.execute("DELETE FROM streams WHERE serial=?", (serial,))
+            else:
+                self._db.execute("DELETE FROM streams")
+            self._db.commit()
+
+        def close(self) -> None:
+            # queued writes are completed before the database is closed
+            self._executor.submit(self._flush)
+            self._executor.submit(self._db.close)
+            self._executor.shutdown(wait=False)
+
+        async def getStreams(self, serial: str, funcId: str,
+                             keys: list[tuple[int, int]]) -> dict[tuple[int, int], str]:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._getStreams, serial, funcId, keys)
+
+        def getStreamList(self, serial: str, funcId: str) -> list[tuple[int, int]]:
+            return self._executor.submit(lambda: self._db.execute(
+                "SELECT run, utc FROM streams WHERE serial=? AND funcid=? ORDER BY run, utc",
+                (serial, funcId)).fetchall()).result()
+
+        def putStreams(self, serial: str, funcId: str, entries: list[tuple[int, int, str]]) -> None:
+            with self._pendingLock:
+                scheduled: bool = len(self._pending) > 0
+                self._pending.extend([(serial, funcId, runNo, utcStamp, sdata) for runNo, utcStamp, sdata in entries])
+            if not scheduled:
+                self._executor.submit(self._flush)
+
+        def clear(self, serial: str = '') -> None:
+            self._executor.submit(self._flush)
+            self._executor.submit(self._clear, serial).result()
+
+
+if not _IS_MICROPYTHON:
+    #################################################################################
+    #                                                                               #
+    #                         Tracing and metrics support                           #
+    #                                                                               #
+    #################################################################################
+
+    # counters included in metrics snapshots
+    _TRACE_COUNTERS: Final[tuple[str, ...]] = (
+        'requests', 'requestErrors', 'notifications', 'events', 'callbackErrors',
+        'hubConnections', 'hubDisconnections', 'streamLoads', 'streamBytes')
+    # timings included in metrics snapshots, in milliseconds:
+    # - requestQueue: waiting for previous requests to the same device
+    # - requestEngine: waiting in the hub engine, until the request is sent
+    # - requestHub: from the request being sent to the first byte of the response
+    # - requestTransfer: from the first byte to the end of the response
+    _TRACE_TIMINGS: Final[tuple[str, ...]] = (
+        'requestQueue', 'requestEngine', 'requestHub', 'requestTransfer', 'requestTotal',
+        'eventDispatch', 'streamLoad')
+
+
+    # Timestamps of a device request, attached to the YRequest while tracing is enabled
+    class YRequestTrace:
+        _tracer: YTracer
+        _attrs: dict[str, Any]  # attributes passed to the trace callback
+        _startNs: int
+        _queuedNs: int
+        _sentNs: int
+        _firstByteNs: int
+
+        def __init__(self, tracer: YTracer, requestId: int, hub: YGenericHub, serial: str, yreq: YRequest):
+            self._tracer = tracer
+            self._attrs = {'requestId': requestId, 'hub': hub._urlInfo.getUrl(YUrl.PROTO), 'serial': serial,
+                           'method': yreq._method, 'url': yreq._target}
+            self._startNs = time.perf_counter_ns()
+            self._queuedNs = 0
+            self._sentNs = 0
+            self._firstByteNs = 0
+            tracer._emit('request.start', self._attrs)
+
+        # the request has left the device queue
+        def queued(self) -> None:
+            self._queuedNs = time.perf_counter_ns()
+            self._tracer._emit('request.queue', self._attrs)
+
+        # the request is being sent to the hub
+        def sent(self) -> None:
+            if self._sentNs:
+                return
+            self._sentNs = time.perf_counter_ns()
+            self._tracer._emit('request.send', self._attrs)
+
+        # the first bytes of the response have been received
+        def received(self) -> None:
+            if self._firstByteNs:
+                return
+            self._firstByteNs = time.perf_counter_ns()
+            self._tracer._emit('request.firstByte', self._attrs)
+
+        def complete(self, status: int, exc: Union[BaseException, None]) -> None:
+            tracer: YTracer = self._tracer
+            endNs: int = time.perf_counter_ns()
+            queuedNs: int = self._queuedNs or endNs
+            sentNs: int = self._sentNs or queuedNs
+            firstByteNs: int = self._firstByteNs or endNs
+            timings: tuple[tuple[str, int], ...] = (
+                ('requestQueue', queuedNs - self._startNs),
+                ('requestEngine', sentNs - queuedNs),
+                ('requestHub', firstByteNs - sentNs if self._firstByteNs else 0),
+                ('requestTransfer', endNs - firstByteNs),
+                ('requestTotal', endNs - self._startNs))
+            for name, ns in timings:
+                tracer._time(name, ns)
+            if exc is not None:
+                tracer._counters['requestErrors'] += 1
+            if tracer._callback is not None:
+                attrs: dict[str, Any] = self._attrs.copy()
+                attrs['status'] = status
+                attrs['error'] = str(exc) if exc is not None else ''
+                for name, ns in timings:
+                    attrs[name] = ns / 1e6
+                tracer._emit('request.complete', attrs)
+
+
+    class YTracer:
+        """
+        Collects the counters and timings of library internals, and forwards trace
+        events to a user callback. The callback receives the event name and a dictionary
+        of attributes, which always includes the event time ("time", in nanoseconds since
+        the epoch), so that events can be turned into OpenTelemetry spans and span events.
+        All events of a given device request share the same "requestId" attribute.
+        """
+        _yapi: YAPIContext
+        _callback: YTraceCallback
+        _metrics: bool  # counters and timings are collected without trace callback
+        _nextId: int
+        _counters: dict[str, int]
+        _timings: dict[str, list]  # [count, total, max] in nanoseconds, by name
+
+        def __init__(self, yctx: YAPIContext):
+            self._yapi = yctx
+            self._callback = None
+            self._metrics = False
+            self._nextId = 0
+            self.reset()
+
+        def reset(self) -> None:
+            self._counters = dict.fromkeys(_TRACE_COUNTERS, 0)
+            self._timings = {name: [0, 0, 0] for name in _TRACE_TIMINGS}
+
+        def getSnapshot(self) -> dict[str, Any]:
+            timings: dict[str, dict[str, float]] = {}
+            for name, (count, total, peak) in self._timings.items():
+                timings[name] = {'count': count, 'sum': total / 1e6, 'max': peak / 1e6}
+            return {'time': time.time_ns(), 'counters': self._counters.copy(), 'timings': timings}
+
+        # Identify a function by its hardware id if known, or by the name used to find it
+        @staticmethod
+        def _funcName(func: YFunction) -> str:
+            return hwid2str(func._hwId) if func._hwId else func._func
+
+        def _time(self, name: str, ns: int) -> None:
+            timing: list = self._timings[name]
+            timing[0] += 1
+            timing[1] += ns
+            if ns > timing[2]:
+                timing[2] = ns
+
+        def _emit(self, event: str, attrs: dict[str, Any]) -> None:
+            callback: YTraceCallback = self._callback
+            if callback is None:
+                return
+            attrs['time'] = time.time_ns()
+            try:
+                callback(event, attrs)
+            # noinspection PyBroadException
+            except Exception:
+                self._yapi._Log('Error in traceCallback "%s"' % callback.__name__, True)
+
+        def requestStart(self, yreq: YRequest, hub: YGenericHub, serial: str) -> None:
+            self._nextId += 1
+            self._counters['requests'] += 1
+            yreq._trace = YRequestTrace(self, self._nextId, hub, serial, yreq)
+
+        def notificationReceived(self, hub: YGenericHub, evb: memoryview) -> None:
+            self._counters['notifications'] += 1
+            if self._callback is not None:
+                self._emit('notification.receive', {'hub': hub._urlInfo.getUrl(YUrl.PROTO), 'size': len(evb)})
+
+        def eventDispatched(self, event: int, recipient: Any, startNs: int, exc: Union[Exception, None]) -> None:
+            ns: int = time.perf_counter_ns() - startNs
+            self._counters['events'] += 1
+            if exc is not None:
+                self._counters['callbackErrors'] += 1
+            self._time('eventDispatch', ns)
+            if self._callback is not None:
+                target: str = self._funcName(recipient) if isinstance(recipient, YFunction) else ''
+                self._emit('notification.dispatch', {'event': event, 'target': target, 'duration': ns / 1e6,
+                                                     'error': str(exc) if exc is not None else ''})
+
+        def hubConnected(self, hub: YGenericHub) -> None:
+            self._counters['hubConnections'] += 1
+            if self._callback is not None:
+                self._emit('hub.connect', {'hub': hub._urlInfo.getUrl(YUrl.PROTO), 'serial': hub._hubSerial})
+
+        def hubDisconnected(self, hub: YGenericHub, retryDelay: int) -> None:
+            self._counters['hubDisconnections'] += 1
+            if self._callback is not None:
+                self._emit('hub.reconnect', {'hub': hub._urlInfo.getUrl(YUrl.PROTO), 'reason': hub.lastErrorMsg,
+                                             'retryDelay': retryDelay})
+
+        def streamLoaded(self, dataset: YDataSet, url: str, size: int, startNs: int) -> None:
+            ns: int = time.perf_counter_ns() - startNs
+            self._counters['streamLoads'] += 1
+            self._counters['streamBytes'] += size
+            self._time('streamLoad', ns)
+            if self._callback is not None:
+                self._emit('datalogger.load', {'target': self._funcName(dataset._parent), 'url': url, 'size': size,
+                                               'duration': ns / 1e6})
@@ -0,0 +1,529 @@
+# -*- coding: utf-8 -*-
+# *********************************************************************
+# *
+# * $Id: svn_id $
+# *
+# * Typed python programming interface; benchmarks of the library hot paths
+# *
+# * - - - - - - - - - License information: - - - - - - - - -
+# *
+# *  Copyright (C) 2011 and beyond by Yoctopuce Sarl, Switzerland.
+# *
+# *  Yoctopuce Sarl (hereafter Licensor) grants to you a perpetual
+# *  non-exclusive license to use, modify, copy and integrate this
+# *  file into your software for the sole purpose of interfacing
+# *  with Yoctopuce products.
+# *
+# *  You may reproduce and distribute copies of this file in
+# *  source or object form, as long as the sole purpose of this
+# *  code is to interface with Yoctopuce products. You must retain
+# *  this notice in the distributed source file.
+# *
+# *  You should refer to Yoctopuce General Terms and Conditions
+# *  for additional information regarding your rights and
+# *  obligations.
+# *
+# *  THE SOFTWARE AND DOCUMENTATION ARE PROVIDED 'AS IS' WITHOUT
+# *  WARRANTY OF ANY KIND, EITHER EXPRESS OR IMPLIED, INCLUDING
+# *  WITHOUT LIMITATION, ANY WARRANTY OF MERCHANTABILITY, FITNESS
+# *  FOR A PARTICULAR PURPOSE, TITLE AND NON-INFRINGEMENT. IN NO
+# *  EVENT SHALL LICENSOR BE LIABLE FOR ANY INCIDENTAL, SPECIAL,
+# *  INDIRECT OR CONSEQUENTIAL DAMAGES, LOST PROFITS OR LOST DATA,
+# *  COST OF PROCUREMENT OF SUBSTITUTE GOODS, TECHNOLOGY OR
+# *  SERVICES, ANY CLAIMS BY THIRD PARTIES (INCLUDING BUT NOT
+# *  LIMITED TO ANY DEFENSE THEREOF), ANY CLAIMS FOR INDEMNITY OR
+# *  CONTRIBUTION, OR OTHER SIMILAR COSTS, WHETHER ASSERTED ON THE
+# *  BASIS OF CONTRACT, TORT (INCLUDING NEGLIGENCE), BREACH OF
+# *  WARRANTY, OR OTHERWISE.
+# *
+# *********************************************************************/
+"""
+Yoctopuce library: benchmarks of the transport and decoding hot paths
+version: 2.1.14927
+provides: YBenchmark YBenchResult
+
+The benchmarks run against local stand-ins (plain asyncio servers and hub
+simulators), so they need no hardware and no VirtualHub. From the command line:
+
+    python -m yoctolib.yocto_benchmark [-d seconds] [--json] [benchmark ...]
+
+For each benchmark, the following figures are reported:
+- the number of operations per second (requests, notifications, rows, calls...)
+- the memory allocated in flight by each operation, in bytes (peak traced memory)
+- the number of memory blocks still allocated after each operation, revealing leaks
+  as well as objects whose release is deferred
+"""
+from __future__ import annotations
+
+import sys, time, gc, json, asyncio, hashlib, binascii, tracemalloc
+from typing import Any, Union, NamedTuple
+from collections.abc import Callable, Awaitable
+
+from .yocto_api_aio import (
+    YAPI, YAPI_Exception, YAPIContext, YRefParam, YSensor, YDataSet, YDataStream, ClientSession,
+    ClientResponse, ClientWebSocketResponse, YCallbackServer
+)
+from .yocto_simulator import YHubSimulator, YSimLink, YSimModule
+
+# number of notification lines in each block sent by the readuntil stand-in
+_BENCH_LINES_PER_BLOCK: int = 2000
+# number of operations sampled to measure allocations
+_BENCH_MEMORY_SAMPLES: int = 20
+# GUID appended to the websocket key to compute the accept key (RFC 6455)
+_BENCH_WS_GUID: str = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+# number of concurrent requests in request benchmarks
+_BENCH_CONCURRENCY: int = 4
+
+
+class YBenchResult(NamedTuple):
+    name: str
+    unit: str  # what is counted, e.g. "req" for requests
+    count: int  # number of items processed during the timed run
+    seconds: float  # duration of the timed run
+    bytesPerOp: float  # memory allocated in flight per item, -1 if unknown
+    blocksPerOp: float  # memory blocks left allocated per item
+
+    def rate(self) -> float:
+        return self.count / self.seconds if self.seconds > 0 else 0.0
+
+    def asDict(self) -> dict[str, Any]:
+        res: dict[str, Any] = self._asdict()
+        res['rate'] = self.rate()
+        return res
+
+    def __str__(self) -> str:
+        mem: str = '%10.0f' % self.bytesPerOp if self.bytesPerOp >= 0 else '%10s' % '-'
+        return '%-18s %12.0f %-8s %s B/op %8.3f blocks/op' % (
+            self.name, self.rate(), self.unit + '/s', mem, self.blocksPerOp)
+
+
+# noinspection PyProtectedMember
+class YBenchmark:
+    """
+    Runs the library benchmarks. Each benchmark prepares its stand-ins, then repeats
+    a batch operation for the requested duration. A batch operation returns the number
+    of items it has processed.
+    """
+    _duration: float  # duration of each timed run, in seconds
+    _results: list[YBenchResult]
+    _BENCHMARKS: tuple[str, ...] = (
+        'readuntil', 'ws-echo', 'ws-send-4k', 'ws-recv-4k', 'notif-decode', 'notif-dispatch',
+        'parse-stream', 'parse-stream-avg', 'resolve', 'http-requests', 'ws-requests',
+        'sync-call', 'sync-await')
+
+    def __init__(self, duration: float = 2.0):
+        self._duration = duration
+        self._results = []
+
+    @classmethod
+    def get_benchmarks(cls) -> tuple[str, ...]:
+        """
+        Returns the names of all available benchmarks.
+        """
+        return cls._BENCHMARKS
+
+    def get_results(self) -> list[YBenchResult]:
+        return self._results
+
+    def run(self, names: Union[list[str], None] = None, output: Union[Callable[[str], Any], None] = None) -> list[YBenchResult]:
+        """
+        Runs benchmarks, and returns their results.
+        Asynchronous benchmarks are run on their own event loop, while synchronous
+        ones use the background event loop of the synchronous API.
+
+        @param names : the names of the benchmarks to run, or None to run all of them
+        @param output : a function called with the text result of each benchmark, or None
+
+        @return a list of YBenchResult objects
+        """
+        if not names:
+            names = list(self._BENCHMARKS)
+        for name in names:
+            if name not in self._BENCHMARKS:
+                raise ValueError('Unknown benchmark: ' + name)
+        results: list[YBenchResult] = []
+        for name in names:
+            method: Callable = getattr(self, '_bench_' + name.replace('-', '_'))
+            if name.startswith('sync-'):
+                res: YBenchResult = method()
+            else:
+                res = asyncio.run(method())
+            results.append(res)
+            if output is not None:
+                output(str(res))
+        self._results.extend(results)
+        return results
+
+    # Measure a synchronous batch operation
+    def _measure(self, name: str, unit: str, op: Callable[[], int]) -> YBenchResult:
+        op()
+        count: int = 0
+        start: float = time.perf_counter()
+        endTime: float = start + self._duration
+        now: float = start
+        while now < endTime:
+            count += op()
+            now = time.perf_counter()
+        seconds: float = now - start
+        # check for memory blocks left allocated
+        gc.collect()
+        blocks: int = sys.getallocatedblocks()
+        items: int = 0
+        for _ in range(_BENCH_MEMORY_SAMPLES):
+            items += op()
+        gc.collect()
+        blocksPerOp: float = max(0, sys.getallocatedblocks() - blocks) / max(items, 1)
+        # measure the memory allocated in flight
+        bytesPerOp: float = -1
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.start()
+            total: int = 0
+            items = 0
+            for _ in range(_BENCH_MEMORY_SAMPLES):
+                tracemalloc.reset_peak()
+                current: int = tracemalloc.get_traced_memory()[0]
+                items += op()
+                total += tracemalloc.get_traced_memory()[1] - current
+            tracemalloc.stop()
+            bytesPerOp = total / max(items, 1)
+        return YBenchResult(name, unit, count, seconds, bytesPerOp, blocksPerOp)
+
+    # Measure an asynchronous batch operation
+    async def _ameasure(self, name: str, unit: str, op: Callable[[], Awaitable[int]]) -> YBenchResult:
+        await op()
+        count: int = 0
+        start: float = time.perf_counter()
+        endTime: float = start + self._duration
+        now: float = start
+        while now < endTime:
+            count += await op()
+            now = time.perf_counter()
+        seconds: float = now - start
+        gc.collect()
+        blocks: int = sys.getallocatedblocks()
+        items: int = 0
+        for _ in range(_BENCH_MEMORY_SAMPLES):
+            items += await op()
+        gc.collect()
+        blocksPerOp: float = max(0, sys.getallocatedblocks() - blocks) / max(items, 1)
+        bytesPerOp: float = -1
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.start()
+            total: int = 0
+            items = 0
+            for _ in range(_BENCH_MEMORY_SAMPLES):
+                tracemalloc.reset_peak()
+                current: int = tracemalloc.get_traced_memory()[0]
+                items += await op()
+                total += tracemalloc.get_traced_memory()[1] - current
+            tracemalloc.stop()
+            bytesPerOp = total / max(items, 1)
+        return YBenchResult(name, unit, count, seconds, bytesPerOp, blocksPerOp)
+
+    #
+    # Stand-ins
+    #
+
+    # Serve an endless notification stream, as a hub does on /not.byn
+    @staticmethod
+    async def _serveLines(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        lines: bytes = b''.join(b'y%c0%.2f\n' % (65 + i % 50, 20 + i % 100 / 100) for i in range(_BENCH_LINES_PER_BLOCK))
+        try:
+            await YCallbackServer._readHeader(reader)
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/octet-stream\r\n\r\n')
+            while True:
+                writer.write(lines)
+                await writer.drain()
+        except (OSError, EOFError, asyncio.CancelledError):
+            writer.close()
+
+    # Serve a websocket that echoes frames (mode "echo"), swallows them ("sink"),
+    # or pushes 4 KB frames (mode "push")
+    @staticmethod
+    async def _serveWebSocket(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            lines: list[str] = await YCallbackServer._readHeader(reader)
+            mode: str = lines[0].split(' ')[1][1:]
+            key: str = ''
+            for line in lines[1:]:
+                if line.lower().startswith('sec-websocket-key:'):
+                    key = line[18:].strip()
+            accept: str = binascii.b2a_base64(hashlib.sha1((key + _BENCH_WS_GUID).encode('ascii')).digest()).decode('ascii').strip()
+            writer.write(('HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                          'Sec-WebSocket-Accept: %s\r\n\r\n' % accept).encode('ascii'))
+            if mode == 'push':
+                frame: bytes = YSimLink.wsFrame(bytes(4096)) * 16
+                while True:
+                    writer.write(frame)
+                    await writer.drain()
+            while True:
+                opcode, payload = await YSimLink.wsRecv(reader)
+                if opcode == 8:
+                    break
+                if mode == 'echo':
+                    writer.write(YSimLink.wsFrame(payload, opcode))
+                    await writer.drain()
+        except (OSError, EOFError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        writer.close()
+
+    # Create an API context connected to a new hub simulator
+    @staticmethod
+    async def _simContext(url: str) -> tuple[YAPIContext, YHubSimulator]:
+        ctx: YAPIContext = YAPIContext()
+        errmsg: YRefParam = YRefParam()
+        if await ctx.RegisterHub(url, errmsg) != YAPI.SUCCESS:
+            raise YAPI_Exception(YAPI.IO_ERROR, errmsg.value)
+        return ctx, YHubSimulator.FindSimulator(YHubSimulator._NameFromUrl(url))
+
+    # Serve notification lines and websocket frames on local TCP ports
+    @staticmethod
+    async def _startServer(handler: Callable) -> tuple[asyncio.Server, int]:
+        server: asyncio.Server = await asyncio.start_server(handler, '127.0.0.1', 0)
+        return server, server.sockets[0].getsockname()[1]
+
+    #
+    # Transport benchmarks
+    #
+
+    async def _bench_readuntil(self) -> YBenchResult:
+        server, port = await self._startServer(self._serveLines)
+        session: ClientSession = ClientSession('http://127.0.0.1:%d' % port)
+        req: ClientResponse = session.get('/not.byn')
+        await req.ready()
+
+        async def op() -> int:
+            for _ in range(1000):
+                await req.readuntil(b'\n')
+            return 1000
+
+        try:
+            return await self._ameasure('readuntil', 'notif', op)
+        finally:
+            await session.close()
+            server.close()
+
+    async def _benchWebSocket(self, name: str, mode: str, op: Callable) -> YBenchResult:
+        server, port = await self._startServer(self._serveWebSocket)
+        session: ClientSession = ClientSession('ws://127.0.0.1:%d' % port)
+        ws: ClientWebSocketResponse = session.ws_connect('/' + mode)
+        await ws.ready()
+        try:
+            return await self._ameasure(name, 'frame', lambda: op(ws))
+        finally:
+            await ws.close()
+            await session.close()
+            server.close()
+
+    async def _bench_ws_echo(self) -> YBenchResult:
+        payload: bytes = bytes(range(120))
+
+        async def op(ws: ClientWebSocketResponse) -> int:
+            for _ in range(100):
+                await ws.send_bytes(payload)
+                await ws.receive_bytes()
+            return 100
+
+        return await self._benchWebSocket('ws-echo', 'echo', op)
+
+    async def _bench_ws_send_4k(self) -> YBenchResult:
+        payload: bytes = bytes(4096)
+
+        async def op(ws: ClientWebSocketResponse) -> int:
+            for _ in range(100):
+                await ws.send_bytes(payload)
+            return 100
+
+        return await self._benchWebSocket('ws-send-4k', 'sink', op)
+
+    async def _bench_ws_recv_4k(self) -> YBenchResult:
+        async def op(ws: ClientWebSocketResponse) -> int:
+            for _ in range(100):
+                await ws.receive_bytes()
+            return 100
+
+        return await self._benchWebSocket('ws-recv-4k', 'push', op)
+
+    async def _benchRequests(self, name: str, proto: str) -> YBenchResult:
+        ctx, sim = await self._simContext('sim://bench-%s?modules=%d&proto=%s' % (name, _BENCH_CONCURRENCY, proto))
+        sensors: list[YSensor] = []
+        for module in sim.get_modules():
+            sensors.append(YSensor.FindSensorInContext(ctx, module.get_serialNumber() + '.temperature1'))
+
+        async def op() -> int:
+            await asyncio.gather(*[sensor._download('api/temperature1.json') for sensor in sensors])
+            return len(sensors)
+
+        try:
+            return await self._ameasure(name, 'req', op)
+        finally:
+            await ctx.FreeAPI()
+
+    async def _bench_http_requests(self) -> YBenchResult:
+        return await self._benchRequests('http-requests', 'http')
+
+    async def _bench_ws_requests(self) -> YBenchResult:
+        return await self._benchRequests('ws-requests', 'ws')
+
+    #
+    # Decoding benchmarks
+    #
+
+    # Prepare a context with value callbacks on all sensors, and one tiny notification per sensor
+    async def _notifContext(self, name: str) -> tuple[YAPIContext, list[memoryview]]:
+        ctx, sim = await self._simContext('sim://bench-%s?modules=50' % name)
+        notifs: list[memoryview] = []
+        for module in sim.get_modules():
+            sensor: YSensor = YSensor.FindSensorInContext(ctx, module.get_serialNumber() + '.temperature1')
+            await sensor.registerValueCallback(lambda func, value: None)
+            devydx: int = module._devydx
+            funydx: int = module._funydx['temperature1']
+            notifs.append(memoryview(b'y%c%c21.25' % (65 + devydx, 48 + funydx)))
+        await ctx.HandleEvents()
+        return ctx, notifs
+
+    async def _bench_notif_decode(self) -> YBenchResult:
+        ctx, notifs = await self._notifContext('notif-decode')
+        hub = ctx._hubs[0]
+
+        def op() -> int:
+            for notif in notifs:
+                ctx._handleNetNotification(hub, notif)
+            while ctx._nextDataEvent() is not None:
+                pass
+            return len(notifs)
+
+        try:
+            return self._measure('notif-decode', 'notif', op)
+        finally:
+            await ctx.FreeAPI()
+
+    async def _bench_notif_dispatch(self) -> YBenchResult:
+        ctx, notifs = await self._notifContext('notif-dispatch')
+        hub = ctx._hubs[0]
+        errmsg: YRefParam = YRefParam()
+
+        async def op() -> int:
+            for notif in notifs:
+                ctx._handleNetNotification(hub, notif)
+            await ctx.HandleEvents(errmsg)
+            return len(notifs)
+
+        try:
+            return await self._ameasure('notif-dispatch', 'notif', op)
+        finally:
+            await ctx.FreeAPI()
+
+    async def _benchParseStream(self, name: str, interval: float) -> YBenchResult:
+        ctx, sim = await self._simContext('sim://bench-%s?modules=1' % name)
+        module: YSimModule = sim.get_modules()[0]
+        if interval > 1:
+            values: list = [(19.0 + i % 10, 20.0 + i % 10, 21.0 + i % 10) for i in range(1000)]
+        else:
+            values = [20.0 + i % 100 / 10 for i in range(1000)]
+        module.addStream('temperature1', values, 1700000000, interval)
+        try:
+            sensor: YSensor = YSensor.FindSensorInContext(ctx, module.get_serialNumber() + '.temperature1')
+            dataset: YDataSet = await sensor.get_recordedData(0, 0)
+            await dataset.loadMore()
+            stream: YDataStream = dataset.get_privateDataStreams()[0]
+            # bytes are always parsed, while xarrays may come with a cached parse tree
+            sdata: bytes = (await sensor._download(stream._get_url())).tobytes()
+
+            def op() -> int:
+                stream._parseStream(sdata)
+                return stream._nRows
+
+            return self._measure(name, 'row', op)
+        finally:
+            await ctx.FreeAPI()
+
+    async def _bench_parse_stream(self) -> YBenchResult:
+        return await self._benchParseStream('parse-stream', 1.0)
+
+    async def _bench_parse_stream_avg(self) -> YBenchResult:
+        return await self._benchParseStream('parse-stream-avg', 60.0)
+
+    async def _bench_resolve(self) -> YBenchResult:
+        sim: YHubSimulator = YHubSimulator('bench-resolve')
+        sim.populate(50)
+        names: list[str] = []
+        for i, module in enumerate(sim.get_modules()):
+            module.setAttribute('temperature1', 'logicalName', 'temp%d' % i)
+            names.append(module.get_serialNumber() + '.temperature1')
+            names.append('temp%d' % i)
+        ctx, sim = await self._simContext('sim://bench-resolve')
+
+        def op() -> int:
+            for name in names:
+                ctx._resolve('Temperature', name)
+            return len(names)
+
+        try:
+            return self._measure('resolve', 'lookup', op)
+        finally:
+            await ctx.FreeAPI()
+
+    #
+    # Synchronous API benchmarks, using the background event loop
+    #
+
+    # Measure the round trip to the background event loop, to invoke an async method (through
+    # YSyncProxy._run) or a plain method of the async layer (through YSyncProxy._call)
+    def _benchSync(self, name: str, method: str, isAsync: bool) -> YBenchResult:
+        from .yocto_api import YAPI as YAPISync, YSensor as YSensorSync
+        errmsg: YRefParam = YRefParam()
+        if YAPISync.RegisterHub('sim://bench-%s?modules=1' % name, errmsg) != YAPI.SUCCESS:
+            raise YAPI_Exception(YAPI.IO_ERROR, errmsg.value)
+        # keep values in cache, to only measure the cost of the call itself
+        YAPISync.SetCacheValidity(3600000)
+        sensor = YSensorSync.FirstSensor()
+        call: Callable
+        if isAsync:
+            call = getattr(sensor, method)
+        else:
+            fun: Callable = getattr(sensor._aio, method)
+            call = lambda: sensor._call(fun)
+        call()
+
+        def op() -> int:
+            for _ in range(100):
+                call()
+            return 100
+
+        try:
+            return self._measure(name, 'call', op)
+        finally:
+            YAPISync.FreeAPI()
+
+    def _bench_sync_call(self) -> YBenchResult:
+        return self._benchSync('sync-call', 'get_userData', False)
+
+    def _bench_sync_await(self) -> YBenchResult:
+        return self._benchSync('sync-await', 'get_currentValue', True)
+
+
+def main(argv: Union[list[str], None] = None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(prog='python -m yoctolib.yocto_benchmark',
+                                     description='Measure the throughput and memory allocations of the library hot paths.')
+    parser.add_argument('benchmarks', nargs='*', metavar='benchmark',
+                        help='benchmarks to run (default: all): ' + ', '.join(YBenchmark.get_benchmarks()))
+    parser.add_argument('-d', '--duration', type=float, default=2.0, help='duration of each benchmark, in seconds')
+    parser.add_argument('--json', action='store_true', help='output results as JSON')
+    args = parser.parse_args(argv)
+    bench: YBenchmark = YBenchmark(args.duration)
+    try:
+        if args.json:
+            results: list[YBenchResult] = bench.run(args.benchmarks)
+            print(json.dumps([res.asDict() for res in results], indent=2))
+        else:
+            print('%-18s %12s %-8s %10s      %8s' % ('benchmark', 'rate', '', 'alloc', 'retained'))
+            bench.run(args.benchmarks, print)
+    except ValueError as exc:
+        parser.error(str(exc))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+# *********************************************************************
+# *
+# * $Id: svn_id $
+# *
+# * Typed python programming interface; smoke tests run against the hub simulator
+# *
+# * - - - - - - - - - License information: - - - - - - - - -
+# *
+# *  Copyright (C) 2011 and beyond by Yoctopuce Sarl, Switzerland.
+# *
+# *  Yoctopuce Sarl (hereafter Licensor) grants to you a perpetual
+# *  non-exclusive license to use, modify, copy and integrate this
+# *  file into your software for the sole purpose of interfacing
+# *  with Yoctopuce products.
+# *
+# *  You may reproduce and distribute copies of this file in
+# *  source or object form, as long as the sole purpose of this
+# *  code is to interface with Yoctopuce products. You must retain
+# *  this notice in the distributed source file.
+# *
+# *  You should refer to Yoctopuce General Terms and Conditions
+# *  for additional information regarding your rights and
+# *  obligations.
+# *
+# *  THE SOFTWARE AND DOCUMENTATION ARE PROVIDED 'AS IS' WITHOUT
+# *  WARRANTY OF ANY KIND, EITHER EXPRESS OR IMPLIED, INCLUDING
+# *  WITHOUT LIMITATION, ANY WARRANTY OF MERCHANTABILITY, FITNESS
+# *  FOR A PARTICULAR PURPOSE, TITLE AND NON-INFRINGEMENT. IN NO
+# *  EVENT SHALL LICENSOR BE LIABLE FOR ANY INCIDENTAL, SPECIAL,
+# *  INDIRECT OR CONSEQUENTIAL DAMAGES, LOST PROFITS OR LOST DATA,
+# *  COST OF PROCUREMENT OF SUBSTITUTE GOODS, TECHNOLOGY OR
+# *  SERVICES, ANY CLAIMS BY THIRD PARTIES (INCLUDING BUT NOT
+# *  LIMITED TO ANY DEFENSE THEREOF), ANY CLAIMS FOR INDEMNITY OR
+# *  CONTRIBUTION, OR OTHER SIMILAR COSTS, WHETHER ASSERTED ON THE
+# *  BASIS OF CONTRACT, TORT (INCLUDING NEGLIGENCE), BREACH OF
+# *  WARRANTY, OR OTHERWISE.
+# *
+# *********************************************************************/
+"""
+Yoctopuce library: smoke tests of the library, run against hub simulators
+version: 2.1.14927
+requires: yocto_api_aio yocto_simulator
+provides: YSelfTest YSelfTestResult
+
+The tests need no hardware and no VirtualHub, so they can be run on a CI box
+to catch regressions of the transports. Each test is run over each protocol
+("ws" and "http"), with its own API context and hub simulator, and fails if it
+does not complete within a timeout. From the command line:
+
+    python -m yoctolib.yocto_selftest [-p ws|http] [-t seconds] [test ...]
+
+The exit code is 0 when all tests have passed, 1 otherwise.
+"""
+from __future__ import annotations
+
+import sys, time, socket, asyncio, threading
+from typing import Any, Union, NamedTuple
+from collections.abc import Callable
+
+from .yocto_api_aio import YAPI, YAPI_Exception, YAPIContext, YRefParam, YSensor, YModule
+from .yocto_simulator import YHubSimulator
+
+# number of modules served by each simulator
+_SELFTEST_MODULES: int = 3
+
+
+class YSelfTestResult(NamedTuple):
+    name: str
+    proto: str
+    passed: bool
+    message: str  # reason of the failure, empty if the test has passed
+    seconds: float
+
+    def __str__(self) -> str:
+        return '%-16s %-5s %-4s %6.3fs %s' % (self.name, self.proto, 'ok' if self.passed else 'FAIL',
+                                              self.seconds, self.message)
+
+
+# Report a failed expectation, even when Python runs with assertions disabled
+def _expect(condition: Any, message: str) -> None:
+    if not condition:
+        raise AssertionError(message)
+
+
+# noinspection PyProtectedMember
+class YSelfTest:
+    """
+    Runs the smoke tests of the library. Asynchronous tests get a fresh API context
+    connected to their own simulator, while synchronous ones use the global context
+    of the synchronous API.
+    """
+    _timeout: float  # maximal duration of each test, in seconds
+    _results: list[YSelfTestResult]
+    _TESTS: tuple[str, ...] = ('enumerate', 'read-write', 'value-callback', 'attr-batch', 'hub-status',
+                                  'callback', 'sync-batch')
+    _PROTOS: tuple[str, ...] = ('ws', 'http')
+
+    def __init__(self, timeout: float = 10.0):
+        self._timeout = timeout
+        self._results = []
+
+    @classmethod
+    def get_tests(cls) -> tuple[str, ...]:
+        """
+        Returns the names of all available tests.
+        """
+        return cls._TESTS
+
+    def get_results(self) -> list[YSelfTestResult]:
+        return self._results
+
+    def run(self, names: Union[list[str], None] = None, protos: Union[list[str], None] = None,
+            output: Union[Callable[[str], Any], None] = None) -> list[YSelfTestResult]:
+        """
+        Runs tests, and returns their results.
+
+        @param names : the names of the tests to run, or None to run all of them
+        @param protos : the protocols to test, or None to test "ws" and "http"
+        @param output : a function called with the text result of each test, or None
+
+        @return a list of YSelfTestResult objects
+        """
+        if not names:
+            names = list(self._TESTS)
+        if not protos:
+            protos = list(self._PROTOS)
+        for name in names:
+            if name not in self._TESTS:
+                raise ValueError('Unknown test: ' + name)
+        for proto in protos:
+            if proto not in self._PROTOS:
+                raise ValueError('Unknown protocol: ' + proto)
+        results: list[YSelfTestResult] = []
+        for proto in protos:
+            for name in names:
+                res: YSelfTestResult = self._runTest(name, proto)
+                results.append(res)
+                if output is not None:
+                    output(str(res))
+        self._results.extend(results)
+        return results
+
+    def _runTest(self, name: str, proto: str) -> YSelfTestResult:
+        method: Callable = getattr(self, '_test_' + name.replace('-', '_'))
+        simName: str = 'selftest-%s-%s' % (name, proto)
+        message: str = ''
+        start: float = time.perf_counter()
+        try:
+            if name.startswith('sync-'):
+                self._runSync(method, simName, proto)
+            else:
+                asyncio.run(self._runAsync(method, simName, proto))
+        except AssertionError as exc:
+            message = str(exc)
+        except (asyncio.TimeoutError, TimeoutError):
+            message = 'timeout after %.1fs' % self._timeout
+        except YAPI_Exception as exc:
+            message = 'YAPI error %d: %s' % (exc.errorType, exc.errorMessage)
+        # noinspection PyBroadException
+        except Exception as exc:
+            message = '%s: %s' % (type(exc).__name__, str(exc))
+        return YSelfTestResult(name, proto, not message, message, time.perf_counter() - start)
+
+    # Run an asynchronous test with a fresh API context, connected to its own simulator
+    async def _runAsync(self, method: Callable, simName: str, proto: str) -> None:
+        sim: YHubSimulator = self._newSimulator(simName, proto)
+        yctx: YAPIContext = YAPIContext()
+        try:
+            errmsg: YRefParam = YRefParam()
+            if await yctx.RegisterHub('sim://' + simName, errmsg) != YAPI.SUCCESS:
+                raise YAPI_Exception(YAPI.IO_ERROR, errmsg.value)
+            await asyncio.wait_for(method(yctx, sim), self._timeout)
+        finally:
+            await yctx.FreeAPI()
+
+    # Run a synchronous test in a separate thread, so that a test that hangs can be reported
+    def _runSync(self, method: Callable, simName: str, proto: str) -> None:
+        outcome: list[BaseException] = []
+
+        def runTest() -> None:
+            # noinspection PyBroadException
+            try:
+                method(simName, proto)
+            except BaseException as exc:
+                outcome.append(exc)
+
+        thread: threading.Thread = threading.Thread(target=runTest, name='YSelfTest', daemon=True)
+        thread.start()
+        thread.join(self._timeout)
+        if thread.is_alive():
+            raise asyncio.TimeoutError()
+        if outcome:
+            raise outcome[0]
+
+    @staticmethod
+    def _newSimulator(simName: str, proto: str) -> YHubSimulator:
+        sim: Union[YHubSimulator, None] = YHubSimulator.FindSimulator(simName)
+        if sim is None:
+            sim = YHubSimulator(simName, proto=proto)
+            sim.populate(_SELFTEST_MODULES)
+        return sim
+
+    # Return the sensors of the simulator, in the order of the modules
+    @staticmethod
+    async def _sensors(yctx: YAPIContext) -> list[YSensor]:
+        errmsg: YRefParam = YRefParam()
+        _expect(await yctx.UpdateDeviceList(errmsg) == YAPI.SUCCESS, 'UpdateDeviceList failed: %s' % errmsg.value)
+        res: list[tuple[str, YSensor]] = []
+        sensor: Union[YSensor, None] = YSensor.FirstSensorInContext(yctx)
+        while sensor is not None:
+            res.append((await sensor.get_hardwareId(), sensor))
+            sensor = sensor.nextSensor()
+        return [sensor for hwid, sensor in sorted(res, key=lambda entry: entry[0])]
+
+    #
+    # Asynchronous API tests
+    #
+
+    async def _test_enumerate(self, yctx: YAPIContext, sim: YHubSimulator) -> None:
+        sensors: list[YSensor] = await self._sensors(yctx)
+        _expect(len(sensors) == _SELFTEST_MODULES, 'found %d sensors' % len(sensors))
+        serials: list[str] = sorted(m.get_serialNumber() for m in sim.get_modules())
+        found: list[str] = [(await sensor.get_hardwareId()).partition('.')[0] for sensor in sensors]
+        _expect(found == serials, 'found modules %s instead of %s' % (found, serials))
+
+    async def _test_read_write(self, yctx: YAPIContext, sim: YHubSimulator) -> None:
+        sensor: YSensor = (await self._sensors(yctx))[0]
+        serial, _, funcId = (await sensor.get_hardwareId()).partition('.')
+        _expect(await sensor.get_currentValue() == 20.0, 'unexpected initial value')
+        _expect(await sensor.set_logicalName('selftest') == YAPI.SUCCESS, 'set_logicalName failed')
+        module: YModule = await sensor.get_module()
+        _expect(await module.set_luminosity(33) == YAPI.SUCCESS, 'set_luminosity failed')
+        await sensor.load(0)
+        _expect(await sensor.get_logicalName() == 'selftest', 'logicalName not changed')
+        _expect(sim.getModule(serial).getAttribute(funcId, 'logicalName') == 'selftest',
+                'logicalName not changed on the simulator')
+        _expect(sim.getModule(serial).getAttribute('module', 'luminosity') == 33,
+                'luminosity not changed on the simulator')
+
+    async def _test_value_callback(self, yctx: YAPIContext, sim: YHubSimulator) -> None:
+        sensor: YSensor = (await self._sensors(yctx))[0]
+        serial, _, funcId = (await sensor.get_hardwareId()).partition('.')
+        values: list[str] = []
+        await sensor.registerValueCallback(lambda func, value: values.append(value))
+        # publish the value again until it is received, in case the notification
+        # stream was not yet open when it was first published
+        while '21.5' not in values:
+            sim.getModule(serial).setValue(funcId, '21.5')
+            await yctx.Sleep(50)
+
+    async def _test_attr_batch(self, yctx: YAPIContext, sim: YHubSimulator) -> None:
+        sensor: YSensor = (await self._sensors(yctx))[0]
+        serial, _, funcId = (await sensor.get_hardwareId()).partition('.')
+        module: YModule = await sensor.get_module()
+        # several changes to the same device are queued at once on commit
+        async with module.batch() as batch:
+            await module.set_luminosity(7)
+            await module.set_beacon(1)
+            await sensor.set_logicalName('batch')
+        _expect(all(res == YAPI.SUCCESS for res in batch.get_results().values()),
+                'batch results: %s' % batch.get_results())
+        # asynchronous requests may still be on their way to the simulator
+        simModule = sim.getModule(serial)
+        while (simModule.getAttribute('module', 'luminosity') != 7 or simModule.getAttribute('module', 'beacon') != 1
+               or simModule.getAttribute(funcId, 'logicalName') != 'batch'):
+            await yctx.Sleep(10)
+
+    async def _test_hub_status(self, yctx: YAPIContext, sim: YHubSimulator) -> None:
+        # a preregistered hub that cannot be reached must not fail the refresh,
+        # but must be reported as not connected
+        deadUrl: str = 'http://127.0.0.1:9'
+        errmsg: YRefParam = YRefParam()
+        _expect(await yctx.PreregisterHub(deadUrl, errmsg) == YAPI.SUCCESS, 'PreregisterHub failed: %s' % errmsg.value)
+        _expect(await yctx.UpdateDeviceList(errmsg) == YAPI.SUCCESS, 'UpdateDeviceList failed: %s' % errmsg.value)
+        status: dict[str, tuple[int, str]] = {url: (res, msg) for url, res, msg in yctx.GetHubUpdateStatus()}
+        simUrl: str = 'sim://' + sim.get_name()
+        _expect(status.get(simUrl) == (YAPI.SUCCESS, ''), 'simulator status: %s' % status)
+        _expect(deadUrl in status and status[deadUrl][0] != YAPI.SUCCESS and status[deadUrl][1],
+                'unreachable hub status: %s' % status)
+
+    async def _test_callback(self, yctx: YAPIContext, sim: YHubSimulator) -> None:
+        # another simulator calls the library back, as a hub located behind a NAT filter would do,
+        # using the same protocol as the simulator registered for the test
+        proto: str = sim.get_url().partition(':')[0]
+        cbsim: YHubSimulator = self._newSimulator(sim.get_name() + '-callback', proto)
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port: int = sock.getsockname()[1]
+        # HTTP callbacks are also checked for credentials
+        auth: str = 'selftest:pass@' if proto == 'http' else ''
+        errmsg: YRefParam = YRefParam()
+        _expect(await yctx.RegisterHub('%s://%scallback:%d/selftest' % (proto, auth, port), errmsg) == YAPI.SUCCESS,
+                'RegisterHub failed: %s' % errmsg.value)
+        arrivals: list[str] = []
+
+        async def deviceArrival(module: YModule) -> None:
+            arrivals.append(await module.get_serialNumber())
+            await module.set_luminosity(42)
+
+        await yctx.RegisterDeviceArrivalCallback(deviceArrival)
+        task: asyncio.Task = asyncio.create_task(cbsim.connectTo('%s://%s127.0.0.1:%d/selftest' % (proto, auth, port)))
+        try:
+            modules: list = cbsim.get_modules() + [cbsim.get_hubModule()]
+            # HTTP callbacks are completed before the changes are applied by the hub
+            while any(module.getAttribute('module', 'luminosity') != 42 for module in modules):
+                if task.done():
+                    task.result()
+                    raise AssertionError('callback completed without applying changes')
+                _expect(await yctx.UpdateDeviceList(errmsg) == YAPI.SUCCESS, 'UpdateDeviceList failed: %s' % errmsg.value)
+                await yctx.Sleep(20)
+            serials: list[str] = sorted(module.get_serialNumber() for module in modules)
+            _expect(sorted(arrivals) == serials, 'arrivals %s instead of %s' % (sorted(arrivals), serials))
+        finally:
+            task.cancel()
+
+    #
+    # Synchronous API tests
+    #
+
+    def _test_sync_batch(self, simName: str, proto: str) -> None:
+        from .yocto_api import YAPI as YAPISync, YSensor as YSensorSync, YSyncBatch
+        sim: YHubSimulator = self._newSimulator(simName, proto)
+        errmsg: YRefParam = YRefParam()
+        if YAPISync.RegisterHub('sim://' + simName, errmsg) != YAPI.SUCCESS:
+            raise YAPI_Exception(YAPI.IO_ERROR, errmsg.value)
+        try:
+            sensor = YSensorSync.FirstSensor()
+            _expect(sensor is not None, 'no sensor found')
+            serial: str = sensor.get_hardwareId().partition('.')[0]
+            module = sensor.get_module()
+            # calls to the same device are sent back-to-back
+            batch: YSyncBatch
+            with YAPISync.batch() as batch:
+                batch.call(module.set_luminosity, 7)
+                batch.call(module.set_beacon, 1)
+                batch.call(sensor.get_currentValue)
+            _expect(batch.get_results() == [YAPI.SUCCESS, YAPI.SUCCESS, 20.0], 'batch results: %s' % batch.get_results())
+            simModule = sim.getModule(serial)
+            while simModule.getAttribute('module', 'luminosity') != 7 or simModule.getAttribute('module', 'beacon') != 1:
+                YAPISync.Sleep(10)
+        finally:
+            YAPISync.FreeAPI()
+
+
+def main(argv: Union[list[str], None] = None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(prog='python -m yoctolib.yocto_selftest',
+                                     description='Run the smoke tests of the library against hub simulators.')
+    parser.add_argument('tests', nargs='*', metavar='test',
+                        help='tests to run (default: all): ' + ', '.join(YSelfTest.get_tests()))
+    parser.add_argument('-p', '--proto', action='append', choices=YSelfTest._PROTOS,
+                        help='protocol to test (default: all), may be repeated')
+    parser.add_argument('-t', '--timeout', type=float, default=10.0, help='maximal duration of each test, in seconds')
+    args = parser.parse_args(argv)
+    selftest: YSelfTest = YSelfTest(args.timeout)
+    try:
+        results: list[YSelfTestResult] = selftest.run(args.tests, args.proto, print)
+    except ValueError as exc:
+        parser.error(str(exc))
+        return 2
+    return 0 if all(res.passed for res in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,1202 @@
+# -*- coding: utf-8 -*-
+# *********************************************************************
+# *
+# * $Id: svn_id $
+# *
+# * Typed python programming interface; local hub simulator
+# *
+# * - - - - - - - - - License information: - - - - - - - - -
+# *
+# *  Copyright (C) 2011 and beyond by Yoctopuce Sarl, Switzerland.
+# *
+# *  Yoctopuce Sarl (hereafter Licensor) grants to you a perpetual
+# *  non-exclusive license to use, modify, copy and integrate this
+# *  file into your software for the sole purpose of interfacing
+# *  with Yoctopuce products.
+# *
+# *  You may reproduce and distribute copies of this file in
+# *  source or object form, as long as the sole purpose of this
+# *  code is to interface with Yoctopuce products. You must retain
+# *  this notice in the distributed source file.
+# *
+# *  You should refer to Yoctopuce General Terms and Conditions
+# *  for additional information regarding your rights and
+# *  obligations.
+# *
+# *  THE SOFTWARE AND DOCUMENTATION ARE PROVIDED 'AS IS' WITHOUT
+# *  WARRANTY OF ANY KIND, EITHER EXPRESS OR IMPLIED, INCLUDING
+# *  WITHOUT LIMITATION, ANY WARRANTY OF MERCHANTABILITY, FITNESS
+# *  FOR A PARTICULAR PURPOSE, TITLE AND NON-INFRINGEMENT. IN NO
+# *  EVENT SHALL LICENSOR BE LIABLE FOR ANY INCIDENTAL, SPECIAL,
+# *  INDIRECT OR CONSEQUENTIAL DAMAGES, LOST PROFITS OR LOST DATA,
+# *  COST OF PROCUREMENT OF SUBSTITUTE GOODS, TECHNOLOGY OR
+# *  SERVICES, ANY CLAIMS BY THIRD PARTIES (INCLUDING BUT NOT
+# *  LIMITED TO ANY DEFENSE THEREOF), ANY CLAIMS FOR INDEMNITY OR
+# *  CONTRIBUTION, OR OTHER SIMILAR COSTS, WHETHER ASSERTED ON THE
+# *  BASIS OF CONTRACT, TORT (INCLUDING NEGLIGENCE), BREACH OF
+# *  WARRANTY, OR OTHERWISE.
+# *
+# *********************************************************************/
+"""
+Yoctopuce library: hub simulator, serving virtual modules without any hardware
+version: 2.1.14927
+requires: yocto_api_aio
+provides: YHubSimulator YSimModule
+
+This module is loaded on demand by RegisterHub() for sim:// URLs. It can be
+imported directly to create simulators and scripted modules beforehand, with
+either the asyncio or the synchronous API.
+"""
+from __future__ import annotations
+
+import time, math, json, re, random, binascii, asyncio, hashlib, threading
+from typing import Any, Union, Final
+from collections.abc import Callable, Coroutine
+from urllib.parse import unquote
+
+from .yocto_api_aio import (
+    YAPI, YAPI_Exception, YUrl, YCallbackServer, _wsMask, _WS_ACCEPT_GUID, _WS_MAX_TCPCHAN,
+    _NOTIFY_NETPKT_NAME, _NOTIFY_NETPKT_FUNCNAME, _NOTIFY_NETPKT_FUNCVAL, _NOTIFY_NETPKT_CHILD,
+    _NOTIFY_NETPKT_FUNCVALYDX, _NOTIFY_NETPKT_CONFCHGYDX,
+    _YSTREAM_TCP, _YSTREAM_TCP_CLOSE, _YSTREAM_META, _YSTREAM_TCP_NOTIF, _YSTREAM_TCP_ASYNCCLOSE,
+    _USB_META_WS_ANNOUNCE, _USB_META_WS_ANNOUNCE_SIZE, _USB_META_WS_AUTHENTICATION,
+    _USB_META_WS_AUTHENTICATION_SIZE, _USB_META_WS_AUTH_FLAGS_RW, _USB_META_WS_PROTO_V2, _USB_META_ACK_UPLOAD
+)
+
+_SIM_FIRMWARE: Final[str] = '60000'  # firmware release advertised by simulated modules
+_SIM_PING_INTERVAL: Final[float] = 1.0  # seconds between two keep-alive notifications
+_SIM_ACTIVITY_TICK: Final[float] = 0.01  # seconds between two bursts of simulated values
+_SIM_WS_WINDOW: Final[int] = 4096  # tcp window announced to websocket clients
+_SIM_WS_FRAME_DATA: Final[int] = 124  # payload per websocket frame, as sent by YoctoHubs
+_SIM_ACK_UPLOAD_STEP: Final[int] = 1024  # uploads on tcpChan 0 are acknowledged every KB
+_SIM_LOGGER_BULK: Final[int] = 10  # max number of datalogger streams per logger.json request
+_SIM_RXMSG_KEEP: Final[int] = 1000  # number of serial messages kept per module
+_SIM_READONLY_ATTRS: Final[tuple[str, ...]] = ('serialNumber', 'productName', 'productId', 'productRelease',
+                                               'firmwareRelease', 'upTime', 'usbCurrent', 'advertisedValue')
+
+_hubSimulators: dict[str, YHubSimulator] = {}  # all simulators, by name
+
+
+# Encode an array of u16 the way logger.json does, as decoded by YAPIContext._decodeWords
+def _simEncodeWords(words: list[int]) -> str:
+    res: list[str] = []
+    for w in words:
+        c2: int = 48 + (w >> 10)
+        res.append('%c%c%c' % (48 + (w & 31), 48 + ((w >> 5) & 31), 122 if c2 == 92 else c2))
+    return ''.join(res)
+
+
+# Encode a measure as two u16, in the fixed-point format used by datalogger streams
+def _simEncodeMeasure(words: list[int], val: float, isAvg: bool) -> None:
+    u: int = round(val * 1000) & 0xffffffff
+    words.append(u & 0xffff)
+    words.append((u >> 16) ^ 0x8000 if isAvg else u >> 16)
+
+
+class YSimModule:
+    """
+    Virtual module served by a YHubSimulator. A module is described by the attributes
+    of its functions, as they appear in its REST API (/api.json), and can be scripted
+    to publish new values, datalogger streams and serial port messages.
+    Functions should be added before the module is added to a simulator. Once the
+    module is in a simulator, its methods can be invoked from any thread.
+    """
+    _sim: Union[YHubSimulator, None]
+    _serial: str
+    _devydx: int  # index of the module in the hub white pages
+    _api: dict[str, dict]  # REST API content, by function identifier
+    _classes: dict[str, tuple[str, int]]  # class name and base type, by function identifier
+    _funydx: dict[str, int]  # function index, by function identifier
+    _streams: dict[str, list[tuple[int, int, str, str]]]  # (run, utc, header, data), by function identifier
+    _rxMessages: list[str]
+    _rxBase: int  # absolute position of the first message in _rxMessages
+    _queryHandler: Union[Callable[[str], Union[str, None]], None]
+    _setCallback: Union[Callable[[YSimModule, str, str, str], Any], None]
+
+    def __init__(self, serial: str, productName: str = 'Yocto-Simulated', productId: int = 0, logicalName: str = ''):
+        self._sim = None
+        self._serial = serial
+        self._devydx = -1
+        self._api = {'module': {
+            'productName': productName, 'serialNumber': serial, 'logicalName': logicalName,
+            'productId': productId, 'productRelease': 1, 'firmwareRelease': _SIM_FIRMWARE,
+            'persistentSettings': 1, 'luminosity': 50, 'beacon': 0, 'upTime': 0, 'usbCurrent': 20,
+            'rebootCountdown': 0, 'userVar': 0}}
+        self._classes = {}
+        self._funydx = {}
+        self._streams = {}
+        self._rxMessages = []
+        self._rxBase = 0
+        self._queryHandler = None
+        self._setCallback = None
+
+    def get_serialNumber(self) -> str:
+        return self._serial
+
+    def addFunction(self, funcId: str, className: str, advertisedValue: str = '', baseType: int = 0, **attrs) -> int:
+        """
+        Adds a function to the module.
+
+        @param funcId : the function identifier, for instance "relay1"
+        @param className : the class of the function, for instance "Relay"
+        @param advertisedValue : the initial advertised value of the function
+        @param baseType : 1 for functions inheriting from YSensor, 0 otherwise
+        @param attrs : other attributes of the function, as they appear in the REST API
+
+        @return the index of the function within the module
+        """
+        node: dict = {'logicalName': '', 'advertisedValue': advertisedValue}
+        node.update(attrs)
+        self._api[funcId] = node
+        self._classes[funcId] = (className, baseType)
+        self._funydx[funcId] = len(self._funydx)
+        return self._funydx[funcId]
+
+    def addSensor(self, funcId: str, className: str, unit: str, value: float = 0.0, resolution: float = 0.01) -> int:
+        """
+        Adds a sensor function to the module, with all the attributes of YSensor.
+
+        @param funcId : the function identifier, for instance "temperature1"
+        @param className : the class of the function, for instance "Temperature"
+        @param unit : the measuring unit
+        @param value : the initial measure
+        @param resolution : the resolution of the measures
+
+        @return the index of the function within the module
+        """
+        raw: int = round(value * 65536)
+        return self.addFunction(funcId, className, self._formatValue(value, resolution), 1,
+                                unit=unit, currentValue=raw, lowestValue=raw, highestValue=raw,
+                                currentRawValue=raw, logFrequency='1/s', reportFrequency='OFF', advMode=0,
+                                calibrationParam='', resolution=round(resolution * 65536), sensorState=0)
+
+    def setValue(self, funcId: str, value: Union[str, float]) -> None:
+        """
+        Changes the advertised value of a function, and notifies it to connected clients.
+        For sensors, the value can be given as a number, to update the measure as well.
+
+        @param funcId : the function identifier
+        @param value : the new value
+        """
+        if funcId not in self._funydx:
+            raise YAPI_Exception(YAPI.INVALID_ARGUMENT, 'No function %s on %s' % (funcId, self._serial))
+        self._call(self._setValue, funcId, value)
+
+    def setAttribute(self, funcId: str, attrName: str, value: Union[str, int]) -> None:
+        """
+        Changes an attribute of a function, as if it had been changed by the device itself.
+
+        @param funcId : the function identifier, or "module"
+        @param attrName : the attribute name
+        @param value : the new value
+        """
+        if funcId not in self._api:
+            raise YAPI_Exception(YAPI.INVALID_ARGUMENT, 'No function %s on %s' % (funcId, self._serial))
+        self._call(self._setAttribute, funcId, attrName, value)
+
+    def getAttribute(self, funcId: str, attrName: str) -> Any:
+        node: Union[dict, None] = self._api.get(funcId)
+        if node is None:
+            return None
+        return node.get(attrName)
+
+    def addStream(self, funcId: str, values: list, utcStart: int, interval: float = 1.0, runNo: int = 1) -> None:
+        """
+        Adds a closed datalogger stream to a sensor, to be served by logger.json.
+
+        @param funcId : the function identifier
+        @param values : the recorded measures. For streams with an interval longer than
+                one second, each measure can also be a (min, avg, max) tuple. Missing
+                measures are given as None.
+        @param utcStart : the UTC timestamp of the beginning of the stream
+        @param interval : the number of seconds between two measures
+        @param runNo : the datalogger run number
+        """
+        if interval <= 1:
+            freq: int = 0x100 | min(round(1 / interval), 255)
+            firstDuration: int = round(interval * 1000)
+            isAvg: bool = False
+        elif interval <= 60:
+            freq = 0x200 | round(60 / interval)
+            firstDuration = round(interval)
+            isAvg = True
+        else:
+            freq = min(round(3600 / interval), 255)
+            firstDuration = round(interval)
+            isAvg = True
+        words: list[int] = []
+        lows: list[float] = []
+        avgs: list[float] = []
+        highs: list[float] = []
+        for val in values:
+            if val is None or val != val:
+                words.extend((0xffff, 0xffff, 0xffff, 0xffff, 0xffff, 0xffff) if isAvg else (0xffff, 0xffff))
+                continue
+            low, avg, high = val if isinstance(val, tuple) else (val, val, val)
+            lows.append(low)
+            avgs.append(avg)
+            highs.append(high)
+            _simEncodeMeasure(words, avg, True)
+            if isAvg:
+                _simEncodeMeasure(words, low, False)
+                _simEncodeMeasure(words, high, False)
+        header: list[int] = [runNo & 0xffff, runNo >> 16, utcStart & 0xffff, utcStart >> 16,
+                             freq, firstDuration, 0, len(values)]
+        if avgs:
+            _simEncodeMeasure(header, sum(avgs) / len(avgs), True)
+            _simEncodeMeasure(header, min(lows), False)
+            _simEncodeMeasure(header, max(highs), False)
+        else:
+            header.extend((0, 0x8000, 0, 0, 0, 0))
+        self._call(self._addStream, funcId, (runNo, utcStart, _simEncodeWords(header), _simEncodeWords(words)))
+
+    def pushRxMessage(self, message: str) -> None:
+        """
+        Appends a message to the receive buffer of the serial port of the module,
+        as returned by rxmsg.json.
+
+        @param message : the message received
+        """
+        self._call(self._pushRxMessage, message)
+
+    def setQueryHandler(self, handler: Union[Callable[[str], Union[str, None]], None]) -> None:
+        """
+        Defines the function that answers queries sent to the serial port of the module
+        (queryLine, queryHex). The handler receives the query and returns the reply,
+        or None when there is no reply.
+
+        @param handler : the query handler, or None
+        """
+        self._queryHandler = handler
+
+    def registerSetCallback(self, callback: Union[Callable[[YSimModule, str, str, str], Any], None]) -> None:
+        """
+        Registers a callback invoked whenever a client changes an attribute of the module,
+        with the module, the function identifier, the attribute name and the new value
+        as arguments. The callback can be used to simulate the behaviour of the device,
+        for instance by calling setValue().
+
+        @param callback : the callback function, or None
+        """
+        self._setCallback = callback
+
+    @staticmethod
+    def _formatValue(value: float, resolution: float) -> str:
+        decimals: int = 0
+        while resolution < 0.999 and decimals < 6:
+            resolution *= 10
+            decimals += 1
+        return '%.*f' % (decimals, value)
+
+    def _call(self, fn: Callable, *args) -> None:
+        if self._sim is not None:
+            self._sim._call(fn, *args)
+        else:
+            fn(*args)
+
+    def _setValue(self, funcId: str, value: Union[str, float]) -> None:
+        node: dict = self._api[funcId]
+        if not isinstance(value, str):
+            raw: int = round(value * 65536)
+            if 'currentValue' in node:
+                node['currentValue'] = raw
+                node['currentRawValue'] = raw
+                node['lowestValue'] = min(node['lowestValue'], raw)
+                node['highestValue'] = max(node['highestValue'], raw)
+            value = self._formatValue(value, node.get('resolution', 655) / 65536)
+        node['advertisedValue'] = value
+        if self._sim is not None:
+            self._sim._notifyValue(self, funcId, value)
+
+    def _setAttribute(self, funcId: str, attrName: str, value: Union[str, int]) -> bool:
+        node: dict = self._api[funcId]
+        if attrName in _SIM_READONLY_ATTRS or attrName not in node:
+            return False
+        if isinstance(node[attrName], int) and not isinstance(value, int):
+            try:
+                value = int(value)
+            except ValueError:
+                pass
+        node[attrName] = value
+        if self._sim is not None:
+            self._sim._notifyChange(self, funcId, attrName)
+        return True
+
+    # Apply attribute changes requested by a client
+    def _applySettings(self, funcId: str, args: dict[str, str]) -> None:
+        if funcId not in self._api:
+            return
+        for attrName, value in args.items():
+            self._setAttribute(funcId, attrName, value)
+            if self._setCallback is not None:
+                self._setCallback(self, funcId, attrName, value)
+
+    def _addStream(self, funcId: str, stream: tuple[int, int, str, str]) -> None:
+        streams: list[tuple[int, int, str, str]] = self._streams.setdefault(funcId, [])
+        streams.append(stream)
+        streams.sort(key=lambda s: (s[0], s[1]))
+
+    def _pushRxMessage(self, message: str) -> None:
+        self._rxMessages.append(message)
+        if len(self._rxMessages) > _SIM_RXMSG_KEEP:
+            drop: int = len(self._rxMessages) - _SIM_RXMSG_KEEP
+            del self._rxMessages[:drop]
+            self._rxBase += drop
+        if self._sim is not None:
+            self._sim._signalRx()
+
+    def _whitePage(self, networkUrl: str) -> dict:
+        mod: dict = self._api['module']
+        return {'serialNumber': self._serial, 'logicalName': mod['logicalName'], 'productName': mod['productName'],
+                'productId': mod['productId'], 'networkUrl': networkUrl, 'beacon': mod['beacon'], 'index': self._devydx}
+
+    def _addYellowPages(self, yellowPages: dict[str, list]) -> None:
+        for funcId, (className, baseType) in self._classes.items():
+            node: dict = self._api[funcId]
+            yellowPages.setdefault(className, []).append({
+                'hardwareId': self._serial + '.' + funcId, 'logicalName': node['logicalName'],
+                'advertisedValue': node['advertisedValue'], 'index': self._funydx[funcId], 'baseType': baseType})
+
+    def _loggerJson(self, args: dict[str, str]) -> str:
+        funcId: str = args.get('id', '')
+        streams: list[tuple[int, int, str, str]] = self._streams.get(funcId, [])
+        if 'run' not in args:
+            node: dict = self._api.get(funcId, {})
+            return json.dumps({'id': funcId, 'unit': node.get('unit', ''), 'bulk': str(_SIM_LOGGER_BULK),
+                               'cal': '*', 'streams': [s[2] for s in streams]})
+        runNo: int = int(args['run'])
+        res: list[str] = []
+        for utc in args.get('utc', '').split(','):
+            sdata: str = ''
+            for stream in streams:
+                if stream[0] == runNo and str(stream[1]) == utc:
+                    sdata = stream[3]
+                    break
+            res.append(sdata)
+        if len(res) == 1:
+            return json.dumps(res[0])
+        return json.dumps(res)
+
+    async def _rxmsgJson(self, args: dict[str, str]) -> str:
+        sim: YHubSimulator = self._sim
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        deadline: float = loop.time() + int(args.get('maxw', '0')) / 1000
+        maxLen: int = int(args.get('len', '0'))
+        pattern: str = args.get('pat', '')
+        query: str = args.get('cmd', '')
+        if query:
+            pos: int = self._rxBase + len(self._rxMessages)
+            if self._queryHandler is not None:
+                reply: Union[str, None] = self._queryHandler(query[1:])
+                if reply is not None:
+                    self._pushRxMessage(reply)
+        else:
+            pos = int(args.get('pos', self._rxBase + len(self._rxMessages)))
+        while True:
+            res: list = []
+            idx: int = max(pos, self._rxBase)
+            endPos: int = self._rxBase + len(self._rxMessages)
+            while idx < endPos and (maxLen <= 0 or len(res) < maxLen):
+                msg: str = self._rxMessages[idx - self._rxBase]
+                idx += 1
+                if not pattern or re.search(pattern, msg):
+                    res.append(msg)
+            if res or loop.time() >= deadline:
+                res.append(idx)
+                return json.dumps(res)
+            await sim._waitRx(deadline - loop.time())
+
+
+class YSimLink:
+    """
+    Connection between a YHubSimulator and a client, either a plain HTTP connection
+    or a websocket. Outgoing data is delayed according to the simulated bandwidth.
+    """
+    _sim: YHubSimulator
+    _writer: asyncio.StreamWriter
+    _isWebSocket: bool
+    _masked: bool  # frames are masked when the simulator is the client side of the websocket
+    _txFreeAt: float  # time at which the simulated link becomes idle, towards the client
+    _rxFreeAt: float  # time at which the simulated link becomes idle, from the client
+    _notifBuff: bytearray  # notifications waiting to be sent
+    _flushTask: Union[asyncio.Task, None]
+    _tasks: set[asyncio.Task]  # requests being processed
+
+    def __init__(self, sim: YHubSimulator, writer: asyncio.StreamWriter):
+        self._sim = sim
+        self._writer = writer
+        self._isWebSocket = False
+        self._masked = False
+        self._txFreeAt = 0.0
+        self._rxFreeAt = 0.0
+        self._notifBuff = bytearray()
+        self._flushTask = None
+        self._tasks = set()
+
+    async def send(self, data: bytes) -> None:
+        bandwidth: int = self._sim._bandwidth
+        if bandwidth > 0:
+            now: float = asyncio.get_running_loop().time()
+            self._txFreeAt = max(now, self._txFreeAt) + len(data) / bandwidth
+            await asyncio.sleep(self._txFreeAt - now)
+        self._writer.write(data)
+        await self._writer.drain()
+
+    # Account for data received from the client, waiting as long as the simulated link needs to carry it
+    async def received(self, size: int) -> None:
+        bandwidth: int = self._sim._bandwidth
+        if bandwidth > 0:
+            now: float = asyncio.get_running_loop().time()
+            self._rxFreeAt = max(now, self._rxFreeAt) + size / bandwidth
+            await asyncio.sleep(self._rxFreeAt - now)
+
+    # Split data into websocket frames of a given stream, as done by YoctoHubs
+    @staticmethod
+    def wsFrames(ystream: int, tcpchan: int, data: bytes, masked: bool = False) -> bytes:
+        first: int = (ystream << 3) + tcpchan
+        if masked:
+            return b''.join([YSimLink.wsFrame(bytes((first,)) + data[pos:pos + _SIM_WS_FRAME_DATA], 2, True)
+                             for pos in range(0, max(len(data), 1), _SIM_WS_FRAME_DATA)])
+        if not data:
+            return bytes((0x82, 1, first))
+        parts: list[bytes] = []
+        for pos in range(0, len(data), _SIM_WS_FRAME_DATA):
+            chunk: bytes = data[pos:pos + _SIM_WS_FRAME_DATA]
+            parts.append(bytes((0x82, len(chunk) + 1, first)))
+            parts.append(chunk)
+        return b''.join(parts)
+
+    @staticmethod
+    def wsFrame(payload: Union[bytes, bytearray], opcode: int = 2, masked: bool = False) -> bytes:
+        size: int = len(payload)
+        if masked:
+            mask: bytes = random.getrandbits(32).to_bytes(4, 'little')
+            if size < 126:
+                return bytes((0x80 | opcode, 0x80 | size)) + mask + _wsMask(payload, mask)
+            return bytes((0x80 | opcode, 0xfe, size >> 8, size & 0xff)) + mask + _wsMask(payload, mask)
+        if size < 126:
+            return bytes((0x80 | opcode, size)) + payload
+        return bytes((0x80 | opcode, 126, size >> 8, size & 0xff)) + payload
+
+    # Receive a websocket frame from the client, and return its opcode and unmasked payload
+    @staticmethod
+    async def wsRecv(reader: asyncio.StreamReader) -> tuple[int, bytes]:
+        hdr: bytes = await reader.readexactly(2)
+        size: int = hdr[1] & 0x7f
+        if size == 126:
+            size = int.from_bytes(await reader.readexactly(2), 'big')
+        elif size == 127:
+            size = int.from_bytes(await reader.readexactly(8), 'big')
+        if not (hdr[1] & 0x80):
+            return hdr[0] & 0x0f, await reader.readexactly(size)
+        mask: bytes = await reader.readexactly(4)
+        return hdr[0] & 0x0f, _wsMask(await reader.readexactly(size), mask)
+
+    def pushNotification(self, notif: bytes) -> None:
+        self._notifBuff += notif
+        if self._flushTask is None:
+            # notifications pushed during the same loop iteration are sent together
+            self._flushTask = asyncio.create_task(self._flushNotifications())
+
+    async def _flushNotifications(self) -> None:
+        try:
+            while self._notifBuff:
+                data: bytes = bytes(self._notifBuff)
+                del self._notifBuff[:]
+                if self._isWebSocket:
+                    data = self.wsFrames(_YSTREAM_TCP_NOTIF, 0, data, self._masked)
+                await self.send(data)
+        except (OSError, RuntimeError):
+            pass
+        finally:
+            self._flushTask = None
+
+    def startRequest(self, coro: Coroutine) -> None:
+        task: asyncio.Task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def close(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        if self._flushTask is not None:
+            self._flushTask.cancel()
+        self._writer.close()
+
+
+class YHubSimulator:
+    """
+    Simulated hub, serving virtual modules to the library without any hardware.
+    The simulator listens on a local TCP port and implements the same protocols as
+    a VirtualHub: REST API of the hub and of each module, notification stream over
+    HTTP (/not.byn) or websocket, datalogger streams (logger.json) and serial port
+    messages (rxmsg.json). Latency and bandwidth of the network can be simulated.
+
+    A simulator is used by registering the URL sim://name, where name is the name
+    given to the simulator. When no simulator exists with that name, one is created
+    using the options given in the URL query, for instance
+    sim://bench?modules=200&rate=1000&latency=5&bandwidth=100000&proto=http
+    creates a simulator with 200 temperature modules, publishing 1000 values per
+    second over HTTP, with 5 ms of latency and a 100 KB/s link.
+
+    A simulator can also call back a library waiting for hubs in callback mode,
+    using connectTo(), to test HTTP and WebSocket callbacks.
+
+    All methods, except start() and stop(), can be invoked from any thread.
+    Changes are applied by the event loop of the simulator, in the order they
+    are made: a module is returned by getModule() as soon as addModule() returns,
+    but the notifications it publishes may still be on their way.
+    """
+    _count: int = 0  # number of simulators created so far
+    _name: str
+    _proto: str  # 'ws' or 'http'
+    _latency: float  # in seconds
+    _bandwidth: int  # in bytes per second, 0 for unlimited
+    _simNo: int
+    _hubModule: YSimModule
+    _modulesLock: threading.Lock
+    _modules: dict[str, YSimModule]  # plugged modules, by serial number, replaced on each change
+    _nextYdx: int
+    _populated: int  # number of modules created by populate()
+    _server: Union[asyncio.Server, None]
+    _loop: Union[asyncio.AbstractEventLoop, None]
+    _port: int
+    _users: int  # number of API contexts using the simulator
+    _conns: set[YSimLink]  # open connections
+    _links: list[YSimLink]  # connections receiving notifications
+    _pingTask: Union[asyncio.Task, None]
+    _activityTask: Union[asyncio.Task, None]
+    _activityRate: float
+    _rxEvent: Union[asyncio.Event, None]
+    _startTime: float
+    _requestCount: int
+    _notificationCount: int
+
+    def __init__(self, name: str, serial: str = '', proto: str = 'ws', latency: int = 0, bandwidth: int = 0):
+        """
+        Creates a simulator, to be used with the URL sim://name.
+
+        @param name : the name of the simulator
+        @param serial : the serial number of the simulated hub
+        @param proto : the protocol used by the library to connect, "ws" or "http"
+        @param latency : the delay added to each request, in milliseconds
+        @param bandwidth : the speed of the simulated link, in bytes per second (0 for unlimited)
+        """
+        if proto not in ('ws', 'http'):
+            raise YAPI_Exception(YAPI.INVALID_ARGUMENT, 'Unsupported protocol for hub simulator: ' + proto)
+        YHubSimulator._count += 1
+        self._simNo = YHubSimulator._count
+        self._name = name
+        self._proto = proto
+        self._latency = latency / 1000
+        self._bandwidth = bandwidth
+        if not serial:
+            serial = 'VIRTHUB0-SIM%05d' % self._simNo
+        self._hubModule = YSimModule(serial, 'VirtualHub')
+        self._hubModule._devydx = 0
+        self._modulesLock = threading.Lock()
+        self._modules = {}
+        self._nextYdx = 1
+        self._populated = 0
+        self._server = None
+        self._loop = None
+        self._port = 0
+        self._users = 0
+        self._conns = set()
+        self._links = []
+        self._pingTask = None
+        self._activityTask = None
+        self._activityRate = 0.0
+        self._rxEvent = None
+        self._startTime = time.time()
+        self._requestCount = 0
+        self._notificationCount = 0
+        _hubSimulators[name] = self
+
+    @classmethod
+    def FindSimulator(cls, name: str) -> Union[YHubSimulator, None]:
+        """
+        Retrieves a simulator by its name.
+
+        @param name : the name of the simulator
+
+        @return the YHubSimulator object, or None if there is no simulator with that name.
+        """
+        return _hubSimulators.get(name)
+
+    # Extract the simulator name from a sim://[user:pass@]name[?options] URL
+    @staticmethod
+    def _NameFromUrl(url: str) -> str:
+        return url[6:].partition('?')[0].rpartition('@')[2].rstrip('/')
+
+    # Find or create the simulator for a sim:// URL
+    @classmethod
+    def _FromUrl(cls, url: str) -> YHubSimulator:
+        name: str = cls._NameFromUrl(url)
+        query: str = url.partition('?')[2]
+        sim: Union[YHubSimulator, None] = _hubSimulators.get(name)
+        if sim is not None:
+            return sim
+        opts: dict[str, str] = YHubSimulator._parseQuery(query)
+        try:
+            sim = YHubSimulator(name, opts.get('serial', ''), opts.get('proto', 'ws'),
+                                int(opts.get('latency', '0')), int(opts.get('bandwidth', '0')))
+            sim.populate(int(opts.get('modules', '0')))
+            if 'rate' in opts:
+                sim.startActivity(float(opts['rate']))
+        except ValueError:
+            _hubSimulators.pop(name, None)
+            raise YAPI_Exception(YAPI.INVALID_ARGUMENT, 'Invalid hub simulator options: ' + query)
+        return sim
+
+    def get_name(self) -> str:
+        return self._name
+
+    def get_serialNumber(self) -> str:
+        return self._hubModule._serial
+
+    def get_hubModule(self) -> YSimModule:
+        """
+        Returns the module representing the hub itself.
+        """
+        return self._hubModule
+
+    def get_url(self) -> str:
+        """
+        Returns the local URL where the simulator is listening, or an empty string
+        if the simulator is not running.
+        """
+        if self._server is None:
+            return ''
+        return '%s://127.0.0.1:%d' % (self._proto, self._port)
+
+    def set_latency(self, latency: int) -> None:
+        """
+        Changes the delay added to each request, in milliseconds.
+        """
+        self._latency = latency / 1000
+
+    def get_latency(self) -> int:
+        return round(self._latency * 1000)
+
+    def set_bandwidth(self, bandwidth: int) -> None:
+        """
+        Changes the speed of the simulated link, in bytes per second (0 for unlimited).
+        """
+        self._bandwidth = bandwidth
+
+    def get_bandwidth(self) -> int:
+        return self._bandwidth
+
+    def get_requestCount(self) -> int:
+        """
+        Returns the number of requests served since the simulator was created.
+        """
+        return self._requestCount
+
+    def get_notificationCount(self) -> int:
+        """
+        Returns the number of notifications published since the simulator was created.
+        """
+        return self._notificationCount
+
+    def addModule(self, module: YSimModule) -> YSimModule:
+        """
+        Plugs a module into the simulated hub.
+
+        @param module : the module to add
+
+        @return the module
+        """
+        with self._modulesLock:
+            if module._sim is not None:
+                raise YAPI_Exception(YAPI.INVALID_ARGUMENT, 'Module %s is already in a simulator' % module._serial)
+            module._sim = self
+            module._devydx = self._nextYdx
+            self._nextYdx += 1
+            # the event loop may be iterating over the current dictionary
+            modules: dict[str, YSimModule] = dict(self._modules)
+            modules[module._serial] = module
+            self._modules = modules
+        self._call(self._broadcast, 'YN01%c%s,%s,1' % (_NOTIFY_NETPKT_CHILD, self._hubModule._serial, module._serial))
+        return module
+
+    def removeModule(self, serial: str) -> None:
+        """
+        Unplugs a module from the simulated hub.
+
+        @param serial : the serial number of the module
+        """
+        with self._modulesLock:
+            if serial not in self._modules:
+                return
+            modules: dict[str, YSimModule] = dict(self._modules)
+            modules.pop(serial)._sim = None
+            self._modules = modules
+        self._call(self._broadcast, 'YN01%c%s,%s,0' % (_NOTIFY_NETPKT_CHILD, self._hubModule._serial, serial))
+
+    def getModule(self, serial: str) -> Union[YSimModule, None]:
+        if serial == self._hubModule._serial:
+            return self._hubModule
+        return self._modules.get(serial)
+
+    def get_modules(self) -> list[YSimModule]:
+        return list(self._modules.values())
+
+    def populate(self, count: int, className: str = 'Temperature', unit: str = "'C") -> None:
+        """
+        Adds modules with a single sensor each, for load testing.
+
+        @param count : the number of modules to add
+        @param className : the class of the sensors
+        @param unit : the unit of the sensors
+        """
+        for _ in range(count):
+            self._populated += 1
+            serial: str = 'SIMTEMP1-%d%04d' % (self._simNo, self._populated)
+            module: YSimModule = YSimModule(serial, 'Yocto-Simulated-' + className, 0)
+            module.addSensor(className[0].lower() + className[1:] + '1', className, unit, 20.0)
+            self.addModule(module)
+
+    def startActivity(self, rate: float) -> None:
+        """
+        Starts publishing new values of all sensors, in turn, at the given rate.
+
+        @param rate : the total number of values published per second
+        """
+        self._activityRate = rate
+        if self._loop is not None:
+            self._call(self._startActivity)
+
+    def stopActivity(self) -> None:
+        """
+        Stops publishing new sensor values.
+        """
+        self._activityRate = 0.0
+        if self._loop is not None:
+            self._call(self._stopActivity)
+
+    async def start(self) -> None:
+        """
+        Starts listening for connections, on a random local TCP port.
+        """
+        self._users += 1
+        if self._server is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._accept, '127.0.0.1', 0)
+        self._port = self._server.sockets[0].getsockname()[1]
+        self._pingTask = asyncio.create_task(self._pingLoop())
+        self._startActivity()
+
+    async def stop(self) -> None:
+        """
+        Stops listening and closes all connections, once the last user has stopped the simulator.
+        """
+        self._users -= 1
+        if self._users > 0 or self._server is None:
+            return
+        server: asyncio.Server = self._server
+        self._server = None
+        server.close()
+        self._stopActivity()
+        self._pingTask.cancel()
+        self._pingTask = None
+        self._links = []
+        for link in list(self._conns):
+            link.close()
+        await server.wait_closed()
+        self._loop = None
+
+    async def connectTo(self, url: str) -> None:
+        """
+        Calls back a library waiting for hubs in callback mode, as a YoctoHub configured
+        for callbacks would do. With a ws:// URL, the simulator opens a WebSocket callback,
+        and serves the library through it until the connection is closed. With an http://
+        URL, it posts the REST API of all its modules once (HTTP callback), and applies
+        the changes returned by the library in its answer. The method returns when the
+        connection is closed.
+
+        @param url : the callback URL, for instance ws://user:pass@127.0.0.1:4444/callback
+        """
+        urlInfo: YUrl = YUrl(url)
+        if urlInfo.proto not in ('ws', 'http'):
+            raise YAPI_Exception(YAPI.INVALID_ARGUMENT, 'Unsupported callback URL: ' + url)
+        reader, writer = await asyncio.open_connection(urlInfo.host, urlInfo.port)
+        link: YSimLink = YSimLink(self, writer)
+        link._masked = True
+        self._conns.add(link)
+        path: str = urlInfo.subDomain or '/'
+        try:
+            if urlInfo.proto == 'ws':
+                key: str = binascii.b2a_base64(random.getrandbits(128).to_bytes(16, 'little')).decode('ascii').strip()
+                await link.send(('GET %s HTTP/1.1\r\nHost: %s:%d\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                                 'Sec-WebSocket-Key: %s\r\nSec-WebSocket-Version: 13\r\n\r\n'
+                                 % (path, urlInfo.host, urlInfo.port, key)).encode('ascii'))
+                status: str = (await YCallbackServer._readHeader(reader) or [''])[0]
+                if status.split(' ')[1:2] != ['101']:
+                    raise YAPI_Exception(YAPI.IO_ERROR, 'WebSocket callback refused: ' + status)
+                await self._runWebSocket(link, reader)
+            else:
+                await self._httpCallback(link, reader, urlInfo)
+        except (EOFError, OSError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if link in self._links:
+                self._links.remove(link)
+            self._conns.discard(link)
+            link.close()
+
+    # Post the REST API of all modules, and apply the changes returned by the library
+    async def _httpCallback(self, link: YSimLink, reader: asyncio.StreamReader, urlInfo: YUrl) -> None:
+        self._hubModule._api['module']['upTime'] = round((time.time() - self._startTime) * 1000)
+        content: dict = {'/api.json': self._hubApi()}
+        for module in self._modules.values():
+            content['/bySerial/%s/api.json' % module._serial] = module._api
+        body: bytes = json.dumps(content).encode('latin-1', 'replace')
+        auth: str = ''
+        if urlInfo.user:
+            credentials: bytes = ('%s:%s' % (urlInfo.user, urlInfo._pass)).encode('latin-1')
+            auth = 'Authorization: Basic %s\r\n' % binascii.b2a_base64(credentials).decode('ascii').strip()
+        await link.send(('POST %s HTTP/1.1\r\nHost: %s:%d\r\n%sContent-Type: application/json\r\n'
+                         'Content-Length: %d\r\nConnection: close\r\n\r\n'
+                         % (urlInfo.subDomain or '/', urlInfo.host, urlInfo.port, auth, len(body))).encode('ascii') + body)
+        lines: list[str] = await YCallbackServer._readHeader(reader) or ['']
+        size: int = self._contentLength(lines)
+        answer: bytes = await reader.readexactly(size) if size > 0 else b''
+        await link.received(len(answer))
+        if lines[0].split(' ')[1:2] != ['200']:
+            raise YAPI_Exception(YAPI.IO_ERROR, 'HTTP callback refused: ' + lines[0])
+        for line in answer.decode('latin-1').split('\n'):
+            if line.startswith('@YoctoAPI:'):
+                method, _, target = line[10:].strip().partition(' ')
+                await self._handle(method, target, b'')
+
+    # Run a function in the event loop of the simulator, from any thread
+    def _call(self, fn: Callable, *args) -> None:
+        loop: Union[asyncio.AbstractEventLoop, None] = self._loop
+        if loop is not None:
+            try:
+                running: Union[asyncio.AbstractEventLoop, None] = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is not loop:
+                loop.call_soon_threadsafe(fn, *args)
+                return
+        fn(*args)
+
+    def _broadcast(self, notif: str) -> None:
+        self._notificationCount += 1
+        data: bytes = notif.encode('latin-1', 'replace') + b'\n'
+        for link in self._links:
+            link.pushNotification(data)
+
+    # Publish a new advertised value, using a tiny notification whenever possible
+    def _notifyValue(self, module: YSimModule, funcId: str, value: str) -> None:
+        devydx: int = module._devydx
+        funydx: int = module._funydx[funcId]
+        if devydx < 256 and funydx < 64:
+            if devydx >= 128:
+                devydx -= 128
+                funydx += 64
+            self._broadcast('%c%c%c%s' % (_NOTIFY_NETPKT_FUNCVALYDX, 65 + devydx, 48 + funydx, value))
+        else:
+            self._broadcast('YN01%c%s,%s,%s' % (_NOTIFY_NETPKT_FUNCVAL, module._serial, funcId, value))
+
+    def _notifyChange(self, module: YSimModule, funcId: str, attrName: str) -> None:
+        if funcId == 'module':
+            if attrName in ('logicalName', 'beacon'):
+                mod: dict = module._api['module']
+                self._broadcast('YN01%c%s,%s,%d' % (_NOTIFY_NETPKT_NAME, module._serial, mod['logicalName'], mod['beacon']))
+        elif attrName == 'logicalName':
+            self._broadcast('YN01%c%s,%s,%s' % (_NOTIFY_NETPKT_FUNCNAME, module._serial, funcId, module._api[funcId]['logicalName']))
+        elif module._devydx < 256 and module._funydx[funcId] < 64:
+            devydx: int = module._devydx
+            funydx: int = module._funydx[funcId]
+            if devydx >= 128:
+                devydx -= 128
+                funydx += 64
+            self._broadcast('%c%c%c' % (_NOTIFY_NETPKT_CONFCHGYDX, 65 + devydx, 48 + funydx))
+
+    def _signalRx(self) -> None:
+        if self._rxEvent is not None:
+            self._rxEvent.set()
+            self._rxEvent = None
+
+    async def _waitRx(self, timeout: float) -> None:
+        if self._rxEvent is None:
+            self._rxEvent = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._rxEvent.wait(), max(timeout, 0.0))
+        except asyncio.TimeoutError:
+            pass
+
+    async def _pingLoop(self) -> None:
+        while True:
+            await asyncio.sleep(_SIM_PING_INTERVAL)
+            for link in self._links:
+                link.pushNotification(b'\n')
+
+    def _startActivity(self) -> None:
+        if self._activityTask is None and self._activityRate > 0 and self._server is not None:
+            self._activityTask = asyncio.create_task(self._activity())
+
+    def _stopActivity(self) -> None:
+        if self._activityTask is not None:
+            self._activityTask.cancel()
+            self._activityTask = None
+
+    # Publish sensor values in turn, following a sine wave
+    async def _activity(self) -> None:
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        last: float = loop.time()
+        credit: float = 0.0
+        step: int = 0
+        while self._activityRate > 0:
+            await asyncio.sleep(_SIM_ACTIVITY_TICK)
+            now: float = loop.time()
+            credit += (now - last) * self._activityRate
+            last = now
+            sensors: list[tuple[YSimModule, str]] = [(module, funcId) for module in self._modules.values()
+                                                     for funcId, cls in module._classes.items() if cls[1] == 1]
+            if not sensors:
+                credit = 0.0
+                continue
+            while credit >= 1.0:
+                module, funcId = sensors[step % len(sensors)]
+                module._setValue(funcId, 20.0 + 5.0 * math.sin(step / 100.0))
+                step += 1
+                credit -= 1.0
+        self._activityTask = None
+
+    @staticmethod
+    def _parseQuery(query: str) -> dict[str, str]:
+        args: dict[str, str] = {}
+        for item in query.split('&'):
+            key, sep, val = item.partition('=')
+            if sep:
+                args[key] = unquote(val, YAPI.DefaultEncoding)
+        return args
+
+    def _infoJson(self) -> str:
+        ports: list[str] = ['ws:%d' % self._port, 'http:%d' % self._port]
+        if self._proto == 'http':
+            ports.reverse()
+        return json.dumps({'serialNumber': self._hubModule._serial, 'port': ports})
+
+    def _hubApi(self) -> dict:
+        content: dict = dict(self._hubModule._api)
+        content['network'] = {'adminPassword': '', 'userPassword': ''}
+        whitePages: list[dict] = [self._hubModule._whitePage('/api')]
+        yellowPages: dict[str, list] = {}
+        self._hubModule._addYellowPages(yellowPages)
+        for module in self._modules.values():
+            whitePages.append(module._whitePage('/bySerial/%s/api' % module._serial))
+            module._addYellowPages(yellowPages)
+        content['services'] = {'whitePages': whitePages, 'yellowPages': yellowPages}
+        return content
+
+    # Serve a request, and return the HTTP status, content type and content
+    async def _handle(self, method: str, path: str, body: bytes) -> tuple[int, str, bytes]:
+        self._requestCount += 1
+        if self._latency > 0:
+            await asyncio.sleep(self._latency)
+        target, _, query = path.partition('?')
+        module: Union[YSimModule, None] = self._hubModule
+        if target.startswith('/bySerial/'):
+            serial, _, target = target[10:].partition('/')
+            module = self._modules.get(serial)
+            if module is None:
+                return 404, 'text/plain', b'Device not found'
+            target = '/' + target
+        module._api['module']['upTime'] = round((time.time() - self._startTime) * 1000)
+        args: dict[str, str] = self._parseQuery(query)
+        args.pop('.', None)
+        content: str
+        if target == '/api.json':
+            if module is self._hubModule:
+                content = json.dumps(self._hubApi())
+            else:
+                content = json.dumps(module._api)
+        elif target.startswith('/api/'):
+            funcId, _, attrName = target[5:].partition('/')
+            asJson: bool = funcId.endswith('.json')
+            if asJson:
+                funcId = funcId[:-5]
+            node: Union[dict, None] = module._api.get(funcId)
+            if node is None:
+                return 404, 'text/plain', b'Function not found'
+            module._applySettings(funcId, args)
+            if attrName:
+                if attrName.endswith('.json'):
+                    return 200, 'application/json', json.dumps(node.get(attrName[:-5])).encode('latin-1')
+                return 200, 'text/plain', str(node.get(attrName, '')).encode('latin-1', 'replace')
+            content = json.dumps(node)
+        elif target == '/logger.json':
+            content = module._loggerJson(args)
+        elif target == '/rxmsg.json':
+            content = await module._rxmsgJson(args)
+        elif target == '/info.json' and module is self._hubModule:
+            content = self._infoJson()
+        elif target == '/upload.html':
+            return 200, 'text/plain', b''
+        else:
+            return 404, 'text/plain', b'File not found'
+        return 200, 'application/json', content.encode('latin-1', 'replace')
+
+    @staticmethod
+    def _replyHeader(status: int, contentType: str) -> bytes:
+        return ('HTTP/1.1 %d %s\r\nContent-Type: %s\r\n' %
+                (status, 'OK' if status == 200 else 'Not Found', contentType)).encode('ascii')
+
+    # Parse the content length from request header lines (the last one applies,
+    # as uploads include their own headers after the ones of the request)
+    @staticmethod
+    def _contentLength(lines: list[str]) -> int:
+        size: int = 0
+        for line in lines[1:]:
+            key, _, val = line.partition(':')
+            if key.strip().lower() == 'content-length':
+                size = int(val)
+        return size
+
+    # Handle an incoming connection, until the client disconnects
+    async def _accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        link: YSimLink = YSimLink(self, writer)
+        self._conns.add(link)
+        try:
+            while True:
+                lines: list[str] = await YCallbackServer._readHeader(reader)
+                words: list[str] = lines[0].split(' ') if lines else ['']
+                path: str = words[1] if len(words) > 1 else '/'
+                key: str = ''
+                for line in lines[1:]:
+                    if line.lower().startswith('sec-websocket-key:'):
+                        key = line[18:].strip()
+                if key:
+                    await self._serveWebSocket(link, reader, key)
+                    return
+                size: int = self._contentLength(lines)
+                body: bytes = await reader.readexactly(size) if size > 0 else b''
+                await link.received(size)
+                if path.startswith('/not.byn'):
+                    await link.send(self._replyHeader(200, 'application/octet-stream') + b'\r\n')
+                    self._links.append(link)
+                    link.pushNotification(b'\n')
+                    # the client never sends anything more on this connection
+                    await reader.read()
+                    return
+                status, contentType, content = await self._handle(words[0], path, body)
+                await link.send(self._replyHeader(status, contentType) +
+                                b'Content-Length: %d\r\n\r\n' % len(content) + content)
+        except (EOFError, OSError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            if link in self._links:
+                self._links.remove(link)
+            self._conns.discard(link)
+            link.close()
+
+    async def _serveWebSocket(self, link: YSimLink, reader: asyncio.StreamReader, key: str) -> None:
+        accept: str = binascii.b2a_base64(hashlib.sha1((key + _WS_ACCEPT_GUID).encode('ascii')).digest()).decode('ascii').strip()
+        await link.send(('HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                         'Sec-WebSocket-Accept: %s\r\n\r\n' % accept).encode('ascii'))
+        await self._runWebSocket(link, reader)
+
+    # Act as a hub over an open websocket, until the library closes it
+    async def _runWebSocket(self, link: YSimLink, reader: asyncio.StreamReader) -> None:
+        link._isWebSocket = True
+        announce: bytearray = bytearray(1 + _USB_META_WS_ANNOUNCE_SIZE)
+        announce[0] = _YSTREAM_META << 3
+        announce[1] = _USB_META_WS_ANNOUNCE
+        announce[2] = _USB_META_WS_PROTO_V2
+        announce[3] = (_SIM_WS_WINDOW >> 4) & 0xff
+        announce[4] = _SIM_WS_WINDOW >> 12
+        announce[5:9] = random.getrandbits(32).to_bytes(4, 'little')
+        serial: bytes = self._hubModule._serial.encode('ascii')
+        announce[9:9 + len(serial)] = serial
+        await link.send(link.wsFrame(announce, 2, link._masked))
+        pending: list[bytearray] = [bytearray() for _ in range(_WS_MAX_TCPCHAN)]
+        # async id of the request being processed on each channel, as a mutable slot
+        running: list[Union[list, None]] = [None] * _WS_MAX_TCPCHAN
+        uploaded: int = 0
+        while True:
+            opcode, payload = await link.wsRecv(reader)
+            await link.received(len(payload))
+            if opcode == 8:
+                return
+            if opcode == 9:
+                await link.send(link.wsFrame(payload, 10, link._masked))
+                continue
+            if opcode != 2 or not payload:
+                continue
+            ystream: int = payload[0] >> 3
+            tcpchan: int = payload[0] & 7
+            if ystream == _YSTREAM_META:
+                if len(payload) > 1 and payload[1] == _USB_META_WS_AUTHENTICATION:
+                    # no password on simulated hubs, full access
+                    auth: bytearray = bytearray(1 + _USB_META_WS_AUTHENTICATION_SIZE)
+                    auth[0] = _YSTREAM_META << 3
+                    auth[1] = _USB_META_WS_AUTHENTICATION
+                    auth[2] = _USB_META_WS_PROTO_V2
+                    auth[3] = _USB_META_WS_AUTH_FLAGS_RW
+                    auth[5:9] = random.getrandbits(32).to_bytes(4, 'little')
+                    await link.send(link.wsFrame(auth, 2, link._masked))
+                    self._links.append(link)
+                    link.pushNotification(b'\n')
+                continue
+            if tcpchan >= _WS_MAX_TCPCHAN:
+                continue
+            buff: bytearray = pending[tcpchan]
+            if ystream == _YSTREAM_TCP:
+                if not buff:
+                    uploaded = 0
+                buff += memoryview(payload)[1:]
+                eoh: int = buff.find(b'\r\n\r\n')
+                if eoh < 0:
+                    continue
+                lines: list[str] = buff[:eoh].decode('latin-1').split('\r\n')
+                reqlen: int = eoh + 4 + self._contentLength(lines)
+                if tcpchan == 0 and len(buff) - uploaded >= _SIM_ACK_UPLOAD_STEP:
+                    uploaded = len(buff)
+                    ack: bytes = bytes((_YSTREAM_META << 3, _USB_META_ACK_UPLOAD, tcpchan)) + uploaded.to_bytes(4, 'little')
+                    await link.send(link.wsFrame(ack, 2, link._masked))
+                if len(buff) < reqlen:
+                    continue
+                body: bytes = bytes(buff[eoh + 4:reqlen])
+                del buff[:]
+                # an async request ending on a frame boundary is only flagged afterwards,
+                # by an empty async close frame: keep a slot for its async id
+                slot: list = [None]
+                running[tcpchan] = slot
+                link.startRequest(self._wsRequest(link, tcpchan, lines[0], body, slot))
+            elif ystream == _YSTREAM_TCP_ASYNCCLOSE:
+                slot = running[tcpchan]
+                if not buff and len(payload) == 2 and slot is not None:
+                    running[tcpchan] = None
+                    slot[0] = payload[-1]
+                    continue
+                buff += memoryview(payload)[1:-1]
+                eoh = buff.find(b'\r\n')
+                firstLine: str = buff[:eoh].decode('latin-1') if eoh >= 0 else ''
+                eoh = buff.find(b'\r\n\r\n')
+                body = bytes(buff[eoh + 4:]) if eoh >= 0 else b''
+                del buff[:]
+                running[tcpchan] = None
+                link.startRequest(self._wsRequest(link, tcpchan, firstLine, body, [payload[-1]]))
+            elif ystream == _YSTREAM_TCP_CLOSE:
+                running[tcpchan] = None
+
+    async def _wsRequest(self, link: YSimLink, tcpchan: int, firstLine: str, body: bytes, slot: list) -> None:
+        words: list[str] = firstLine.split(' ')
+        path: str = words[1] if len(words) > 1 else '/'
+        status, contentType, content = await self._handle(words[0], path, body)
+        try:
+            if slot[0] is not None:
+                await link.send(link.wsFrame(bytes(((_YSTREAM_TCP_ASYNCCLOSE << 3) + tcpchan, slot[0])), 2, link._masked))
+            else:
+                data: bytes = self._replyHeader(status, contentType) + b'\r\n' + content
+                await link.send(link.wsFrames(_YSTREAM_TCP, tcpchan, data, link._masked) +
+                                link.wsFrames(_YSTREAM_TCP_CLOSE, tcpchan, b'', link._masked))
+        except (OSError, RuntimeError):
+            pass